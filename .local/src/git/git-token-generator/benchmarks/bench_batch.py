@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Bench Batch - Time generate_batch serially and concurrently against the local mock provider.
+
+Mints the same manifest into throwaway vaults serially, concurrently without
+keep-alive, and concurrently over pooled keep-alive connections; checks every
+token was stored, and prints wall-clock times and per-request latencies.
+
+Usage:
+    ./benchmarks/bench_batch.py --tokens 200 --latency 0.1 --concurrency 32 --platform-limit gitlab=16
+    ./benchmarks/bench_batch.py --tokens 90 --limit 30 --window 2 --error-rate 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_provider import start_mock_server  # noqa: E402
+from http_client import format_latency_summary  # noqa: E402
+
+# Every built-in provider, so the batch dispatches through each generator class
+PLATFORMS = ["github", "github-enterprise", "gitlab", "bitbucket", "gitea", "forgejo"]
+CREDENTIALS = {
+    "username": "bench",
+    "password": "bench",
+    "client_id": "bench",
+    "client_secret": "bench",
+    "access_token": "bench",
+}
+
+
+def make_entries(count: int, base_urls: dict) -> list:
+    """Build manifest entries spread evenly across the platforms."""
+    entries = []
+    for i in range(count):
+        platform = PLATFORMS[i % len(PLATFORMS)]
+        entries.append({
+            "platform": platform,
+            "name": f"bench-{i}",
+            "scopes": ["repo"],
+            "expiration": 30,
+            "base_url": base_urls[platform],
+        })
+    return entries
+
+
+def run(label: str, entries: list, executor, client) -> float:
+    """Run one batch into a fresh vault and return the elapsed time."""
+    import git_token_generator
+    from token_store import TokenManager, JsonTokenStore
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        token_manager = TokenManager("json")
+        token_manager.store = JsonTokenStore(Path(config_dir) / "tokens.json")
+
+        start = time.perf_counter()
+        results = git_token_generator.generate_batch(entries, token_manager, CREDENTIALS, executor, client)
+        elapsed = time.perf_counter() - start
+        client.close()
+
+        failed = [r for r in results if "error" in r]
+        stored = sum(len(e) for e in token_manager.store.query().values())
+        print(f"{label:12} tokens={len(entries)} stored={stored} failed={len(failed)} "
+              f"retries={client.scheduler.retries} {elapsed:.2f}s  "
+              f"{format_latency_summary(client.latency_summary())}")
+        for result in failed:
+            print(f"  {result['platform']} {result['name']}: {result['error']}")
+        if failed or stored != len(entries):
+            sys.exit(1)
+        return elapsed
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark serial vs concurrent batch generation")
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens to mint per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight overall")
+    parser.add_argument("--platform-limit", action="append", metavar="PLATFORM=N",
+                        help="Per-platform cap (default: executor default)")
+    parser.add_argument("--limit", type=int, default=0,
+                        help="Mock provider rate limit in requests per window (0 for none)")
+    parser.add_argument("--window", type=float, default=1.0, help="Mock provider rate-limit window in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of mock requests answered with 503")
+    args = parser.parse_args()
+
+    # Keep the key and any default vault files out of the real config directory
+    os.environ.setdefault("GIT_TOKEN_CONFIG_DIR", tempfile.mkdtemp(prefix="git-token-bench-"))
+
+    import logging
+    logging.disable(logging.INFO)
+    from executor import BoundedExecutor, parse_limits
+    from http_client import HttpClient
+
+    server, base_urls = start_mock_server(args.latency, limit=args.limit, window=args.window,
+                                          error_rate=args.error_rate)
+    try:
+        entries = make_entries(args.tokens, base_urls)
+        limits = parse_limits(args.platform_limit)
+        serial = run("serial", entries, BoundedExecutor(1, default_limit=1), HttpClient(pool_size=1))
+        run("no-keepalive", entries, BoundedExecutor(args.concurrency, limits),
+            HttpClient(pool_size=args.concurrency, keep_alive=False))
+        concurrent = run("pooled", entries, BoundedExecutor(args.concurrency, limits),
+                         HttpClient(pool_size=args.concurrency))
+        print(f"speedup: {serial / concurrent:.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
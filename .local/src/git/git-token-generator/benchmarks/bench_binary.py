@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Bench Binary - Compare the binary vault (tokens.vault) with tokens.json in size and latency.
+
+Seeds a throwaway tokens.json with --tokens entries encrypted under the vault
+key, converts it to the binary format and back with migrate (checking the
+round trip gives back the same file), then times both formats, as the median
+of --repeat runs: loading the whole vault, reading one token from a fresh
+store (a full parse for JSON, an mmap index lookup for the binary vault),
+listing every entry's metadata, and saving one token. Finally times
+`view_tokens.py --platform P --name N --show-values` from a cold start on each.
+
+Usage:
+    ./benchmarks/bench_binary.py --tokens 100000
+    ./benchmarks/bench_binary.py --tokens 10000 --repeat 9
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOL_DIR))
+
+PLATFORMS = ["github", "gitlab", "bitbucket"]
+SCOPES = ["repo", "api", "read_user", "write:org", "workflow"]
+
+
+def median_ms(func, repeat: int) -> float:
+    """Run func repeat times and return the median milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark the binary vault against tokens.json")
+    parser.add_argument("--tokens", type=int, default=100000, help="Tokens in the vault")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per operation (the median is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        from token_store import (TOKENS_FILE, VAULT_FILE, BinaryTokenStore, JsonTokenStore, TokenManager, migrate,
+                                 write_snapshot)
+
+        cipher = TokenManager("json")._get_cipher()
+        rng = random.Random(0)
+        data = {}
+        for i in range(args.tokens):
+            data.setdefault(PLATFORMS[i % len(PLATFORMS)], []).append({
+                "name": f"ci-{i}",
+                "token": cipher.encrypt(f"ghp_bench{i:031d}".encode()).decode(),
+                "scopes": rng.sample(SCOPES, rng.randrange(1, 3)),
+                "created_at": f"2026-01-01T00:00:00.{i % 1000000:06d}",
+                "expires_at": None if i % 5 == 0 else f"2027-{i % 12 + 1:02d}-01T00:00:00",
+            })
+        write_snapshot(TOKENS_FILE, data)
+        del data
+
+        start = time.perf_counter()
+        migrate(JsonTokenStore(TOKENS_FILE), BinaryTokenStore(VAULT_FILE))
+        to_binary = time.perf_counter() - start
+        round_trip = Path(config_dir) / "round-trip.json"
+        start = time.perf_counter()
+        migrate(BinaryTokenStore(VAULT_FILE), JsonTokenStore(round_trip))
+        to_json = time.perf_counter() - start
+        if round_trip.read_bytes() != TOKENS_FILE.read_bytes():
+            sys.exit("converting to the binary vault and back changed tokens.json")
+        json_size, binary_size = TOKENS_FILE.stat().st_size, VAULT_FILE.stat().st_size
+        print(f"{args.tokens} tokens: tokens.json {json_size / 1024:,.0f}KiB, "
+              f"tokens.vault {binary_size / 1024:,.0f}KiB ({binary_size / json_size:.0%}); "
+              f"converted in {to_binary:.2f}s, back in {to_json:.2f}s, "
+              "round trip identical")
+
+        stores = {"json": lambda: JsonTokenStore(TOKENS_FILE), "binary": lambda: BinaryTokenStore(VAULT_FILE)}
+        names = [rng.randrange(args.tokens) for _ in range(args.repeat)]
+
+        def manager(storage):
+            token_manager = TokenManager("json")
+            token_manager.store = stores[storage]()
+            return token_manager
+
+        def get_one(storage):
+            i = names.pop()
+            names.insert(0, i)
+            if manager(storage).get_token(PLATFORMS[i % len(PLATFORMS)], f"ci-{i}") != f"ghp_bench{i:031d}":
+                sys.exit(f"{storage}: wrong value for ci-{i}")
+
+        def manager_save(store, storage, i):
+            token_manager = TokenManager("json")
+            token_manager.store = store
+            token_manager.save_token("github", "ghp_saved", f"saved-{storage}-{i}", ["repo"])
+
+        saved = {storage: iter(range(args.repeat)) for storage in stores}
+        loaded = {}
+        results = {}
+        for storage, open_store in stores.items():
+            loaded[storage] = open_store()
+            loaded[storage].count()
+            results[storage] = {
+                "load": median_ms(lambda: open_store().count(), args.repeat),
+                "get_token (fresh store)": median_ms(lambda: get_one(storage), args.repeat),
+                "list metadata": median_ms(lambda: sum(1 for _ in loaded[storage].iterate()), args.repeat),
+                "save_token": median_ms(lambda: manager_save(loaded[storage], storage, next(saved[storage])),
+                                        args.repeat),
+            }
+
+        for storage in stores:
+            i = args.tokens - 1
+            command = [sys.executable, str(TOOL_DIR / "view_tokens.py"), "--platform", PLATFORMS[i % len(PLATFORMS)],
+                       "--name", f"ci-{i}", "--show-values", "--format", "plain"]
+            env = dict(os.environ, GIT_TOKEN_STORAGE=storage)
+
+            def view():
+                proc = subprocess.run(command, env=env, capture_output=True, text=True)
+                if f"ghp_bench{i:031d}" not in proc.stdout:
+                    sys.exit(f"view_tokens.py found no value on {storage}:\n{proc.stderr[-2000:]}")
+
+            results[storage]["view_tokens.py --name (cold)"] = median_ms(view, args.repeat)
+
+        print(f"  {'':28} {'json':>10} {'binary':>10} {'speedup':>8}")
+        for operation in results["json"]:
+            before, after = results["json"][operation], results["binary"][operation]
+            print(f"  {operation:28} {before:8.2f}ms {after:8.2f}ms {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Bench Credential - Time credential helper lookups from the vault and from the cache daemon.
+
+Seeds a throwaway vault with tokens for many self-hosted hosts, then looks each
+host up the way an uncached helper call does (open the vault, pick the entry,
+decrypt it), through the cache daemon's socket, and end to end through the CLI
+with and without --cache.
+
+Usage:
+    ./benchmarks/bench_credential.py --hosts 300 --tokens 3000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOL_DIR))
+
+
+def summarize(label: str, samples: list) -> None:
+    """Print median and p95 of a list of seconds in milliseconds."""
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{label:24} n={len(samples):5}  median {statistics.median(samples) * 1000:8.3f}ms  "
+          f"p95 {p95 * 1000:8.3f}ms")
+
+
+def cli_lookup(host: str, env: dict, cache: bool) -> float:
+    """Run one `credential get` through the CLI and return its wall-clock time."""
+    command = [sys.executable, str(TOOL_DIR / "git_token_generator.py"), "credential", "get"]
+    if cache:
+        command.insert(-1, "--cache")
+    start = time.perf_counter()
+    proc = subprocess.run(command, input=f"protocol=https\nhost={host}\n\n", env=env,
+                          capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if "password=" not in proc.stdout:
+        sys.exit(f"credential get for {host} returned nothing:\n{proc.stderr}")
+    return elapsed
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark credential helper lookups")
+    parser.add_argument("--hosts", type=int, default=200, help="Distinct hosts to look up")
+    parser.add_argument("--tokens", type=int, default=2000, help="Tokens in the vault")
+    parser.add_argument("--cli-runs", type=int, default=10, help="End-to-end CLI calls per mode")
+    parser.add_argument("--storage", default="json", help="Vault storage backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        os.environ["GIT_TOKEN_STORAGE"] = args.storage
+        from token_store import TokenManager
+        from credential_helper import CACHE_SOCKET, lookup, query_cache, start_cache
+
+        hosts = [f"git{i}.example.com" for i in range(args.hosts)]
+        token_manager = TokenManager()
+        with token_manager.transaction():
+            for i in range(args.tokens):
+                token_manager.save_token("gitlab", f"token-{i}", f"bench-{i}", ["api"],
+                                         extra={"host": hosts[i % len(hosts)]})
+
+        vault = []
+        for host in hosts:
+            start = time.perf_counter()
+            credential = lookup(TokenManager(), host)
+            vault.append(time.perf_counter() - start)
+            assert credential, host
+        summarize("vault lookup", vault)
+
+        if not start_cache(CACHE_SOCKET, ttl=300):
+            sys.exit("cache daemon did not start")
+        try:
+            for host in hosts:
+                query_cache({"action": "store", "host": host, "credential": lookup(TokenManager(), host)})
+            cached = []
+            for _ in range(5):
+                for host in hosts:
+                    start = time.perf_counter()
+                    reply = query_cache({"action": "get", "host": host})
+                    cached.append(time.perf_counter() - start)
+                    assert reply and reply["credential"], host
+            summarize("cache daemon lookup", cached)
+
+            env = dict(os.environ)
+            sample = hosts[:args.cli_runs]
+            summarize("cli get", [cli_lookup(host, env, cache=False) for host in sample])
+            summarize("cli get --cache", [cli_lookup(host, env, cache=True) for host in sample])
+        finally:
+            query_cache({"action": "exit"})
+
+
+if __name__ == "__main__":
+    main()
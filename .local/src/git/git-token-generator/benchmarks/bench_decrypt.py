@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Bench Decrypt - Time full-vault decryption serially and on the process pool.
+
+Seeds a throwaway vault, corrupts every hundredth entry, then reads every value
+through TokenManager.iter_tokens with one worker and with --workers processes,
+checking that each run returns all the good tokens and skips exactly the
+corrupted ones. The parallel speedup depends on the cores available.
+
+Usage:
+    ./benchmarks/bench_decrypt.py --tokens 50000 --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel vault decryption")
+    parser.add_argument("--tokens", type=int, default=20000, help="Tokens in the vault")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes for the parallel run")
+    parser.add_argument("--storage", default="json", help="Vault storage backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        import logging
+        logging.disable(logging.WARNING)
+        from token_store import TokenManager
+
+        token_manager = TokenManager(args.storage)
+        cipher = token_manager._get_cipher()
+        corrupted = 0
+        with token_manager.transaction():
+            for i in range(args.tokens):
+                entry = {"name": f"bench-{i}", "token": cipher.encrypt(f"value-{i}".encode()).decode(),
+                         "scopes": ["repo"], "created_at": None, "expires_at": None}
+                if i % 100 == 0:
+                    entry["token"] = entry["token"][:-8] + "AAAAAAAA"
+                    corrupted += 1
+                token_manager.store.add("github", entry)
+
+        print(f"{args.storage}: {args.tokens} tokens, {corrupted} corrupted, {os.cpu_count()} CPUs")
+        for label, workers in [("serial", 1), (f"{args.workers} workers", args.workers)]:
+            reader = TokenManager(args.storage)
+            start = time.perf_counter()
+            tokens = list(reader.iter_tokens(with_values=True, workers=workers))
+            elapsed = time.perf_counter() - start
+            good = all(token["token"] == "value-" + token["name"].split("-")[1] for _, token in tokens)
+            print(f"{label:12} decrypted {len(tokens)} skipped {len(reader.undecryptable)} in {elapsed:.2f}s")
+            if not good or len(reader.undecryptable) != corrupted or len(tokens) != args.tokens - corrupted:
+                sys.exit("decryption results are wrong")
+
+
+if __name__ == "__main__":
+    main()
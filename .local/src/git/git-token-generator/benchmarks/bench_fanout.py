@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Bench Fan-out - Time minting the same tokens on many instances against local mock providers.
+
+Starts --hosts mock GitLab instances (the last --slow of them --slow-factor
+times slower than the rest) and mints --names tokens on every one of them:
+serially, concurrently with every instance under one per-platform cap as a
+manifest of base_url entries would be, and fanned out with a pooled client and
+concurrency cap per host. Checks that every token was stored with its host and
+that the credential helper answers each host with the token minted there.
+
+Usage:
+    ./benchmarks/bench_fanout.py --hosts 12 --names 8 --latency 0.05
+    ./benchmarks/bench_fanout.py --hosts 12 --slow 2 --slow-factor 20 --host-limit 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_provider import start_mock_server  # noqa: E402
+
+CREDENTIALS = {"access_token": "bench"}
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark fanning tokens out to many instances")
+    parser.add_argument("--hosts", type=int, default=12, help="Mock instances to fan out to")
+    parser.add_argument("--names", type=int, default=8, help="Tokens to mint on every instance")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock instance latency in seconds")
+    parser.add_argument("--slow", type=int, default=1, help="How many instances are slow")
+    parser.add_argument("--slow-factor", type=float, default=10, help="How much slower the slow instances are")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight overall")
+    parser.add_argument("--host-limit", type=int, default=4, help="Requests in flight per instance")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+
+        import logging
+        logging.disable(logging.ERROR)
+        import git_token_generator
+        from credential_helper import lookup
+        from executor import BoundedExecutor
+        from fanout import HostClients, fanout_entries, host_generators, host_summary
+        from http_client import HttpClient
+        from token_store import JsonTokenStore, TokenManager
+
+        servers = []
+        for i in range(args.hosts):
+            slow = i >= args.hosts - args.slow
+            servers.append(start_mock_server(args.latency * (args.slow_factor if slow else 1)))
+        try:
+            hosts = [(base_urls["gitlab"], None) for _, base_urls in servers]
+            names = [{"platform": "gitlab", "name": f"svc-{i}", "scopes": ["api"], "expiration": 30,
+                      "base_url": None} for i in range(args.names)]
+            entries = fanout_entries(names, hosts)
+
+            def run(label, executor, client=None, clients=None):
+                token_manager = TokenManager("json")
+                token_manager.store = JsonTokenStore(Path(config_dir) / f"{label}.json")
+                batch = [dict(entry) for entry in entries]
+                generators = host_generators(batch, CREDENTIALS, clients) if clients else {}
+                if clients is None:
+                    # A manifest of base_url entries: capped per platform, one shared client
+                    for entry in batch:
+                        del entry["host"]
+                start = time.perf_counter()
+                results = git_token_generator.generate_batch(batch, token_manager, CREDENTIALS, executor, client,
+                                                             generators)
+                elapsed = time.perf_counter() - start
+                failed = sum(1 for result in results if "error" in result)
+                print(f"{label:12} tokens={len(results)} failed={failed} {elapsed:6.2f}s")
+                if failed:
+                    sys.exit(1)
+                return elapsed, results, token_manager
+
+            serial, _, _ = run("serial", BoundedExecutor(1, default_limit=1), HttpClient(pool_size=1))
+            shared, _, _ = run("per-platform", BoundedExecutor(args.concurrency, default_limit=args.host_limit),
+                               HttpClient(pool_size=args.concurrency))
+            clients = HostClients(lambda: HttpClient(pool_size=args.host_limit))
+            executor = BoundedExecutor(args.concurrency, {entry["host"]: args.host_limit for entry in entries})
+            fanned, results, token_manager = run("per-host", executor, HttpClient(pool_size=1), clients)
+            print(f"speedup: {serial / fanned:.1f}x over serial, {shared / fanned:.1f}x over one platform cap")
+
+            for row in host_summary(results, clients):
+                print(f"  {row['host']:18} created={row['created']} slowest={row['slowest']:.2f}s "
+                      f"requests={row['requests']} p95={row['p95_ms']:.1f}ms")
+            clients.close()
+
+            # Every host must get back the token minted on it, not one minted elsewhere under the same name
+            stored = [entry for _, entry in token_manager.iter_tokens()]
+            if len(stored) != len(entries) or any(not entry.get("host") for entry in stored):
+                sys.exit("tokens were not stored with their hosts")
+            for server, base_urls in servers:
+                host = base_urls["gitlab"].split("/")[2]
+                credential = lookup(token_manager, host)
+                handler = server.RequestHandlerClass
+                if credential is None or credential["password"] not in handler.by_value:
+                    sys.exit(f"credential lookup for {host} returned another host's token")
+            print(f"stored {len(stored)} tokens with their hosts; credential lookups match their hosts")
+        finally:
+            for server, _ in servers:
+                server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
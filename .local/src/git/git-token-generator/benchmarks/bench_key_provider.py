@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Bench Key Provider - Time per-token encryption with a cached cipher against re-reading the key.
+
+Encrypts --tokens values the old way (open key.key, read it and build a Fernet
+for every value) and through the process-wide KeyProvider, which reads the key
+once and only stats the file before each encryption. Also times a command key
+source, which runs its command once per process rather than once per value.
+
+Usage:
+    ./benchmarks/bench_key_provider.py --tokens 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark cached key providers against reading the key per value")
+    parser.add_argument("--tokens", type=int, default=20000, help="Values to encrypt")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        from cryptography.fernet import Fernet
+        from key_provider import open_key_provider
+        from token_store import KEY_FILE
+
+        provider = open_key_provider("file", KEY_FILE)
+        provider.keys()
+
+        def per_value():
+            for i in range(args.tokens):
+                with open(KEY_FILE, "rb") as key_file:
+                    Fernet(key_file.read().strip()).encrypt(f"value-{i}".encode())
+
+        def cached(source):
+            def run():
+                for i in range(args.tokens):
+                    source.cipher(check=True).encrypt(f"value-{i}".encode())
+            return run
+
+        command = open_key_provider(f"command:cat {KEY_FILE}", KEY_FILE)
+        runs = [
+            ("read key.key per value", per_value),
+            ("file provider (cached)", cached(provider)),
+            ("command provider (cached)", cached(command)),
+        ]
+        print(f"{args.tokens} encryptions")
+        for label, run in runs:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"{label:28} {elapsed:6.2f}s  {elapsed / args.tokens * 1e6:6.1f}us per value")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Bench Listing - Time and measure memory of view_tokens.py output formats on a large vault.
+
+Seeds a throwaway vault, then runs view_tokens.py once per output format,
+reading its stdout through a pipe. Reports the time to the first byte, the
+total time and the child's peak RSS, so the rich tables can be compared with
+the streamed jsonl/csv/plain formats.
+
+Usage:
+    ./benchmarks/bench_listing.py --tokens 50000 --storage sqlite
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOL_DIR))
+
+# Runs a script and reports its own peak RSS (KiB on Linux) on stderr once it exits
+RSS_WRAPPER = """
+import sys, runpy, resource
+script = sys.argv[1]
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(script, run_name="__main__")
+finally:
+    sys.stderr.write(f"\\nmaxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}\\n")
+"""
+
+
+def run(arguments: list, env: dict) -> tuple:
+    """Run view_tokens.py with arguments; return (first byte s, total s, output bytes, peak RSS MiB)."""
+    command = [sys.executable, "-c", RSS_WRAPPER, str(TOOL_DIR / "view_tokens.py"), *arguments]
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    first = proc.stdout.read(1)
+    first_byte = time.perf_counter() - start
+    size = len(first)
+    while True:
+        chunk = proc.stdout.read(1 << 16)
+        if not chunk:
+            break
+        size += len(chunk)
+    stderr = proc.stderr.read().decode()
+    proc.wait()
+    total = time.perf_counter() - start
+    rss = [line for line in stderr.splitlines() if line.startswith("maxrss=")]
+    if proc.returncode or not rss:
+        sys.exit(f"view_tokens.py {' '.join(arguments)} failed:\n{stderr}")
+    return first_byte, total, size, int(rss[-1].split("=")[1]) / 1024
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark streamed vs table token listings")
+    parser.add_argument("--tokens", type=int, default=20000, help="Tokens in the vault")
+    parser.add_argument("--storage", default="json", help="Vault storage backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        from token_store import TokenManager
+
+        token_manager = TokenManager(args.storage)
+        with token_manager.transaction():
+            for i in range(args.tokens):
+                token_manager.save_token(("github", "gitlab", "bitbucket")[i % 3], f"token-{i}", f"bench-{i}",
+                                         ["repo", "read:user"], "2030-01-01T00:00:00")
+
+        env = dict(os.environ, GIT_TOKEN_STORAGE=args.storage)
+        print(f"{args.storage}: {args.tokens} tokens")
+        for label, arguments in [
+            ("table", []),
+            ("jsonl", ["--format", "jsonl"]),
+            ("csv", ["--format", "csv"]),
+            ("plain", ["--format", "plain"]),
+            ("plain --sort expires", ["--format", "plain", "--sort", "expires"]),
+            ("plain --limit 100", ["--format", "plain", "--sort", "name", "--limit", "100"]),
+        ]:
+            first_byte, total, size, rss = run(arguments, env)
+            print(f"{label:22} first byte {first_byte * 1000:8.1f}ms  total {total * 1000:8.1f}ms  "
+                  f"output {size / 1024:8.0f}KiB  peak RSS {rss:6.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Bench Memory - Measure a loaded JSON vault as plain dicts against TokenRecords.
+
+Writes a throwaway tokens.json, then loads it with plain json.load (one dict,
+one scopes list and fresh scope strings per entry) and with read_vault (slots
+records with interned scopes), reporting the memory each holds (tracemalloc),
+the peak while loading, and the time and peak extra memory of writing the
+snapshot back: json.dump(indent=2) of the dicts against write_snapshot's one
+entry per line. Checks that both loads hold the same entries.
+
+Usage:
+    ./benchmarks/bench_memory.py --tokens 100000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SCOPES = ["repo", "api", "read_user", "write:org", "workflow"]
+
+
+def measured(func):
+    """Time func, then run it again under tracemalloc; return (result, bytes still held, peak bytes, seconds)."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark vault memory as dicts vs TokenRecords")
+    parser.add_argument("--tokens", type=int, default=100000, help="Tokens in the vault")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        from cryptography.fernet import Fernet
+        from token_store import read_vault, write_snapshot
+
+        tokens_file = Path(config_dir) / "tokens.json"
+        cipher = Fernet(Fernet.generate_key())
+        ciphertext = cipher.encrypt(b"ghp_" + b"x" * 36).decode()
+        rng = random.Random(0)
+        data = {}
+        for i in range(args.tokens):
+            data.setdefault(rng.choice(["github", "gitlab", "bitbucket"]), []).append({
+                "name": f"ci-{i}", "token": ciphertext[:-8] + f"{i:08d}",
+                "scopes": rng.sample(SCOPES, rng.randrange(1, 3)),
+                "created_at": f"2026-01-01T00:00:00.{i % 1000000:06d}",
+                "expires_at": None if i % 5 == 0 else f"2027-01-01T00:00:00.{i % 1000000:06d}",
+            })
+        with open(tokens_file, "w") as f:
+            json.dump(data, f, indent=2)
+        del data
+
+        def load_dicts():
+            with open(tokens_file) as f:
+                return json.load(f)
+
+        dicts, dict_bytes, dict_peak, dict_time = measured(load_dicts)
+        records, record_bytes, record_peak, record_time = measured(lambda: read_vault(tokens_file)[0])
+
+        same = records.keys() == dicts.keys() and all(
+            [record.to_dict() for record in records[platform]] == entries for platform, entries in dicts.items()
+        )
+        if not same:
+            sys.exit("records and dicts disagree")
+
+        def dump_dicts():
+            with open(Path(config_dir) / "dicts.json", "w") as f:
+                json.dump(dicts, f, indent=2)
+
+        _, _, dump_peak, dump_time = measured(dump_dicts)
+        _, _, write_peak, write_time = measured(lambda: write_snapshot(tokens_file, records))
+
+        print(f"{args.tokens} tokens")
+        print(f"{'dicts (json.load)':28} held {dict_bytes / 2**20:7.1f} MiB ({dict_bytes / args.tokens:5.0f} B/token)  "
+              f"peak {dict_peak / 2**20:7.1f} MiB  load {dict_time:5.2f}s")
+        print(f"{'TokenRecords (read_vault)':28} held {record_bytes / 2**20:7.1f} MiB "
+              f"({record_bytes / args.tokens:5.0f} B/token)  peak {record_peak / 2**20:7.1f} MiB  "
+              f"load {record_time:5.2f}s")
+        print(f"{'json.dump(indent=2) dicts':28} write {dump_time:5.2f}s  peak extra {dump_peak / 2**20:7.1f} MiB")
+        print(f"{'write_snapshot records':28} write {write_time:5.2f}s  peak extra {write_peak / 2**20:7.1f} MiB")
+        print(f"records hold {1 - record_bytes / dict_bytes:.0%} less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Bench Query - Time TokenQuery selections through the store indexes against a full scan.
+
+Seeds a throwaway vault with tokens spread over names, scopes and dates, then
+runs a set of queries through TokenStore.iterate and through a scan that checks
+every entry with TokenQuery.matches, and checks that both return the same
+tokens in the same order.
+
+Usage:
+    ./benchmarks/bench_query.py --tokens 50000 --storage sqlite
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SCOPES = ["repo", "api", "read_user", "write:org", "pullrequest"]
+
+
+def timed(func, runs: int) -> tuple:
+    """Run func runs times and return (best seconds, last result)."""
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark indexed vault queries against a full scan")
+    parser.add_argument("--tokens", type=int, default=50000, help="Tokens in the vault")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per query (best is reported)")
+    parser.add_argument("--storage", default="json", help="Vault storage backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        from token_store import open_store
+        from query import TokenQuery
+
+        rng = random.Random(0)
+        start = datetime(2026, 1, 1)
+        store = open_store(args.storage)
+        with store.transaction():
+            for i in range(args.tokens):
+                store.add(rng.choice(["github", "gitlab", "bitbucket"]), {
+                    "name": f"{rng.choice(['ci', 'dev', 'prod'])}-{rng.randrange(5000)}",
+                    "token": "",
+                    "scopes": rng.sample(SCOPES, rng.randrange(3)),
+                    "created_at": (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+                    "expires_at": (start + timedelta(days=rng.randrange(30, 730))).isoformat(),
+                })
+
+        store = open_store(args.storage)
+        everything = list(store.iterate())
+        queries = [
+            ("--name ci-42", TokenQuery(name="ci-42")),
+            ("--glob --name 'ci-12*'", TokenQuery(pattern="ci-12*")),
+            ("--scope write:org --platform gitlab", TokenQuery(platform="gitlab", scopes=["write:org"])),
+            ("--expires-before (1 week)", TokenQuery(expires_before="2026-02-07")),
+            ("--created-after/-before (1 day)", TokenQuery(created_after="2026-06-01", created_before="2026-06-02")),
+            ("--glob --name 'prod-*' --scope repo", TokenQuery(pattern="prod-*", scopes=["repo"])),
+        ]
+        print(f"{args.storage}: {args.tokens} tokens")
+        for label, selection in queries:
+            # The first run builds any in-memory indexes
+            list(store.iterate(selection))
+            indexed, found = timed(lambda: list(store.iterate(selection)), args.runs)
+            scanned, expected = timed(lambda: [row for row in everything if selection.matches(*row)], args.runs)
+            if [(p, e["name"], e["created_at"]) for p, e in found] != \
+                    [(p, e["name"], e["created_at"]) for p, e in expected]:
+                sys.exit(f"{label}: index and full scan disagree")
+            print(f"{label:38} {len(found):6} matches  indexed {indexed * 1000:7.2f}ms  "
+                  f"full scan {scanned * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
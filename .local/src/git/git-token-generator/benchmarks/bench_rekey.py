@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Bench Rekey - Time a full vault rekey, killed part way and resumed, while reads go on.
+
+Seeds a throwaway vault, starts `git_token_generator.py rekey` in a child
+process, reads random tokens the whole time it runs, kills it with SIGKILL once
+it has committed --kill-at of the vault, then runs it again to finish. Checks
+that no read failed, that every token decrypts with the new key alone and not
+with the old one, and reports the time and peak RSS of each run.
+
+Usage:
+    ./benchmarks/bench_rekey.py --tokens 100000 --storage sqlite
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import resource
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Prints the child's peak RSS after the wrapped command exits
+RSS_WRAPPER = """
+import resource, runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    print("peak-rss", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+"""
+
+
+def run_rekey(args, config_dir: str, reader, kill_at: float = None) -> tuple:
+    """Run the rekey command, reading tokens until it exits; return (seconds, peak RSS KiB, reads, killed)."""
+    command = [sys.executable, "-c", RSS_WRAPPER, str(ROOT / "git_token_generator.py"),
+               "--storage", args.storage, "rekey"]
+    if args.chunk_size:
+        command += ["--chunk-size", str(args.chunk_size)]
+    state_file = Path(config_dir) / "rekey.json"
+    start = time.perf_counter()
+    child = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    reads = killed = 0
+    while child.poll() is None:
+        reads += reader()
+        if kill_at is not None and state_file.exists():
+            try:
+                position = json.loads(state_file.read_text())["position"]
+            except (ValueError, KeyError):
+                continue
+            if position >= kill_at * args.tokens:
+                child.send_signal(signal.SIGKILL)
+                killed = 1
+    _, stderr = child.communicate()
+    elapsed = time.perf_counter() - start
+    rss = next((int(line.split()[1]) for line in stderr.splitlines() if line.startswith("peak-rss")), 0)
+    if not killed and child.returncode != 0:
+        sys.exit(f"rekey failed:\n{stderr}")
+    return elapsed, rss, reads, killed
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark an interrupted and resumed vault rekey")
+    parser.add_argument("--tokens", type=int, default=100000, help="Tokens in the vault")
+    parser.add_argument("--storage", default="sqlite", help="Vault storage backend")
+    parser.add_argument("--chunk-size", type=int, help="Tokens per vault write (default: the rekey default)")
+    parser.add_argument("--kill-at", type=float, default=0.4,
+                        help="Fraction of the vault to re-encrypt before killing the first run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        import logging
+        logging.disable(logging.WARNING)
+        from cryptography.fernet import Fernet, InvalidToken
+        from key_provider import read_keys
+        from token_store import KEY_FILE, TokenManager
+
+        token_manager = TokenManager(args.storage)
+        cipher = token_manager._get_cipher()
+        old_key = read_keys(KEY_FILE)[0]
+        start = time.perf_counter()
+        with token_manager.transaction():
+            for i in range(args.tokens):
+                token_manager.store.add("github", {
+                    "name": f"bench-{i}", "token": cipher.encrypt(f"value-{i}".encode()).decode(),
+                    "scopes": ["repo"], "created_at": f"2026-01-01T00:00:00.{i:06d}", "expires_at": None,
+                })
+        print(f"{args.storage}: seeded {args.tokens} tokens in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(0)
+        failures = []
+
+        def reader() -> int:
+            """Read a few random tokens the way a credential lookup does."""
+            reads = TokenManager(args.storage)
+            for _ in range(5):
+                i = rng.randrange(args.tokens)
+                if reads.get_token("github", f"bench-{i}") != f"value-{i}":
+                    failures.append(i)
+            reads.store.close()
+            return 5
+
+        for label, kill_at in [("killed run", args.kill_at), ("resumed run", None)]:
+            elapsed, rss, reads, killed = run_rekey(args, config_dir, reader, kill_at)
+            state = Path(config_dir) / "rekey.json"
+            note = f"killed at {json.loads(state.read_text())['position']} tokens" if killed else "finished"
+            peak = f"{rss / 1024:6.1f} MiB" if rss else "     -    "
+            print(f"{label:12} {elapsed:6.1f}s  peak RSS {peak}  {reads:5} reads meanwhile  {note}")
+            if kill_at is not None and not killed:
+                print("  (finished before it could be killed; lower --kill-at or raise --tokens)")
+
+        keys = read_keys(KEY_FILE)
+        new_cipher, old_cipher = Fernet(keys[0]), Fernet(old_key)
+        store = TokenManager(args.storage).store
+        wrong, readable_with_old = 0, 0
+        for _, entry in store.iterate():
+            if new_cipher.decrypt(entry["token"].encode()).decode() != "value-" + entry["name"].split("-")[1]:
+                wrong += 1
+            try:
+                old_cipher.decrypt(entry["token"].encode())
+                readable_with_old += 1
+            except InvalidToken:
+                pass
+        print(f"{len(keys)} key left, {wrong} wrong values, {readable_with_old} still under the old key, "
+              f"{len(failures)} failed reads; peak RSS of this process "
+              f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+        if len(keys) != 1 or keys[0] == old_key or wrong or readable_with_old or failures:
+            sys.exit("rekey results are wrong")
+
+
+if __name__ == "__main__":
+    main()
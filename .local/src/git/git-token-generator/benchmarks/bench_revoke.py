@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Bench Revoke - Time bulk revocation serially and concurrently against the local mock provider.
+
+Mints GitHub and GitLab tokens into a throwaway vault (every tenth one named
+"pinned", which the mock refuses to revoke), revokes them all through
+delete_tokens.revoke_and_delete, and checks that exactly the pinned tokens are
+left in the vault and at the provider.
+
+Usage:
+    ./benchmarks/bench_revoke.py --tokens 200 --latency 0.05 --concurrency 32
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_provider import start_mock_server  # noqa: E402
+
+CREDENTIALS = {
+    "username": "bench",
+    "password": "bench",
+    "client_id": "bench",
+    "client_secret": "bench",
+    "access_token": "bench",
+}
+
+
+def run(label: str, count: int, base_urls: dict, handler, executor, client) -> float:
+    """Mint count tokens into a fresh vault, revoke them all, and return the revocation time."""
+    import git_token_generator
+    import delete_tokens
+    from token_store import TokenManager, JsonTokenStore
+
+    entries = []
+    for i in range(count):
+        platform = ("github", "gitlab")[i % 2]
+        entries.append({
+            "platform": platform,
+            "name": f"pinned-{i}" if i % 10 == 0 else f"bench-{i}",
+            "scopes": ["repo"],
+            "expiration": 30,
+            "base_url": base_urls[platform],
+        })
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        token_manager = TokenManager("json")
+        token_manager.store = JsonTokenStore(Path(config_dir) / "tokens.json")
+        git_token_generator.generate_batch(entries, token_manager, CREDENTIALS, executor, client)
+
+        start = time.perf_counter()
+        delete_tokens.revoke_and_delete(token_manager, credentials=CREDENTIALS, executor=executor, client=client)
+        elapsed = time.perf_counter() - start
+
+        pinned = sum(1 for entry in entries if entry["name"].startswith("pinned"))
+        left = sum(len(e) for e in token_manager.store.query().values())
+        live = len(handler.issued)
+        print(f"{label:10} tokens={count} kept={left} live_at_provider={live} expected={pinned} {elapsed:.2f}s")
+        if left != pinned or live != pinned:
+            sys.exit(1)
+        handler.issued.clear()
+        return elapsed
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark serial vs concurrent token revocation")
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens to mint and revoke per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Revocations in flight overall")
+    args = parser.parse_args()
+
+    # Keep the key and any default vault files out of the real config directory
+    os.environ.setdefault("GIT_TOKEN_CONFIG_DIR", tempfile.mkdtemp(prefix="git-token-bench-"))
+
+    import logging
+    logging.disable(logging.INFO)
+    import delete_tokens
+    from rich.console import Console
+    delete_tokens.console = Console(quiet=True)
+    from executor import BoundedExecutor
+    from http_client import HttpClient
+
+    server, base_urls = start_mock_server(args.latency)
+    handler = server.RequestHandlerClass
+    try:
+        serial = run("serial", args.tokens, base_urls, handler, BoundedExecutor(1, default_limit=1),
+                     HttpClient(pool_size=1))
+        concurrent = run("concurrent", args.tokens, base_urls, handler,
+                         BoundedExecutor(args.concurrency, default_limit=args.concurrency),
+                         HttpClient(pool_size=args.concurrency))
+        print(f"speedup: {serial / concurrent:.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
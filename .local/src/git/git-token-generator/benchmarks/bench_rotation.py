@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Bench Rotation - Time finding due tokens through the expiry index against a full scan.
+
+Seeds a throwaway vault with tokens expiring at random points over the next
+year, then looks up the tokens due within a window both through
+rotation.due_tokens (the store's expiry index) and by parsing every entry's
+expires_at, and checks that both find the same tokens.
+
+Usage:
+    ./benchmarks/bench_rotation.py --tokens 100000 --within 7 --storage sqlite
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def full_scan(store, cutoff: datetime) -> list:
+    """Find due tokens the way the tool did before the index: parse every date."""
+    due = []
+    for platform, entries in store.query().items():
+        for entry in entries:
+            if entry.get("expires_at") and datetime.fromisoformat(entry["expires_at"]) <= cutoff:
+                due.append((platform, entry))
+    due.sort(key=lambda item: item[1]["expires_at"])
+    return due
+
+
+def timed(func, runs: int) -> tuple:
+    """Run func runs times and return (best seconds, last result)."""
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark expiry index lookups against a full scan")
+    parser.add_argument("--tokens", type=int, default=20000, help="Tokens in the vault")
+    parser.add_argument("--within", type=int, default=7, help="Rotation window in days")
+    parser.add_argument("--runs", type=int, default=5, help="Lookups per method (best is reported)")
+    parser.add_argument("--storage", default="json", help="Vault storage backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        from token_store import TokenManager
+        from rotation import due_tokens
+
+        rng = random.Random(0)
+        now = datetime.now()
+        token_manager = TokenManager(args.storage)
+        with token_manager.transaction():
+            for i in range(args.tokens):
+                expires = now + timedelta(seconds=rng.randrange(365 * 86400))
+                # Every twentieth token never expires
+                token_manager.save_token(("github", "gitlab")[i % 2], f"token-{i}", f"bench-{i}", ["repo"],
+                                         None if i % 20 == 0 else expires.isoformat())
+
+        within = timedelta(days=args.within)
+        store = TokenManager(args.storage).store
+        # The first lookup builds the index; later ones reuse it until the vault changes
+        start = time.perf_counter()
+        due_tokens(store, within, now=now)
+        first = time.perf_counter() - start
+        indexed, found = timed(lambda: due_tokens(store, within, now=now), args.runs)
+        scanned, expected = timed(lambda: full_scan(store, now + within), args.runs)
+
+        if [e["name"] for _, e in found] != [e["name"] for _, e in expected]:
+            sys.exit("index and full scan disagree")
+        print(f"{args.storage}: {len(found)} of {args.tokens} tokens due within {args.within} days")
+        print(f"first lookup (builds index) {first * 1000:9.2f}ms")
+        print(f"indexed lookup              {indexed * 1000:9.2f}ms")
+        print(f"full scan                   {scanned * 1000:9.2f}ms")
+        print(f"speedup: {scanned / indexed:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
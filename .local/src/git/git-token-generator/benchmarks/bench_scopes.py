@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Bench Scopes - Time rejecting mistyped scopes locally against finding out from the provider.
+
+Builds a manifest with a mistyped scope in every --typo-every'th entry and
+sends it to the local mock provider, which answers unknown scopes with 422 as
+GitHub does: the batch spends the full network time, mints every other token,
+and only then reports the typos. The same manifest is then checked with the
+scope catalog, which finds the same entries without a single request. Finally
+refreshes the GitHub and GitLab scopes from the mock (X-OAuth-Scopes and the
+GitLab version) twice, to show the second refresh is served from the cache.
+
+Usage:
+    ./benchmarks/bench_scopes.py --tokens 300 --latency 0.1 --typo-every 50
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_provider import start_mock_server  # noqa: E402
+
+PLATFORMS = ["github", "gitlab", "bitbucket"]
+CREDENTIALS = {
+    "username": "bench",
+    "password": "bench",
+    "client_id": "bench",
+    "client_secret": "bench",
+    "access_token": "bench",
+}
+# (valid scope, mistyped scope) per platform
+SCOPES = {
+    "github": ("repo", "reop"),
+    "gitlab": ("api", "read_repo"),
+    "bitbucket": ("repository", "pullrequests"),
+}
+
+
+def make_entries(count: int, typo_every: int, base_urls: dict) -> list:
+    """Build manifest entries spread across the platforms, every typo_every'th with a mistyped scope."""
+    entries = []
+    for i in range(count):
+        platform = PLATFORMS[i % len(PLATFORMS)]
+        valid, typo = SCOPES[platform]
+        entries.append({
+            "platform": platform,
+            "name": f"bench-{i}",
+            "scopes": [valid, typo] if typo_every and i % typo_every == 0 else [valid],
+            "expiration": 30,
+            "base_url": base_urls[platform],
+        })
+    return entries
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark local scope validation against provider rejections")
+    parser.add_argument("--tokens", type=int, default=300, help="Entries in the manifest")
+    parser.add_argument("--typo-every", type=int, default=50, help="Put a mistyped scope in every N'th entry")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight overall")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+
+        import logging
+        logging.disable(logging.ERROR)
+        import git_token_generator
+        from executor import BoundedExecutor
+        from http_client import HttpClient
+        from providers import load_provider
+        from scope_catalog import ScopeCatalog
+        from token_store import TokenManager
+
+        builtin = {platform: load_provider(platform).SCOPES for platform in PLATFORMS}
+        server, base_urls = start_mock_server(args.latency, scopes=builtin)
+        try:
+            entries = make_entries(args.tokens, args.typo_every, base_urls)
+            typos = sum(1 for entry in entries if len(entry["scopes"]) > 1)
+
+            client = HttpClient(pool_size=args.concurrency)
+            start = time.perf_counter()
+            results = git_token_generator.generate_batch(entries, TokenManager("json"), CREDENTIALS,
+                                                         BoundedExecutor(args.concurrency), client)
+            provider_time = time.perf_counter() - start
+            rejected = sum(1 for result in results if "error" in result)
+            print(f"{'provider rejects':18} {provider_time * 1000:9.1f}ms  {len(entries)} requests, "
+                  f"{rejected} rejected, {len(results) - rejected} tokens minted anyway")
+
+            catalog = ScopeCatalog(Path(config_dir) / "scopes.json")
+            start = time.perf_counter()
+            problems = catalog.check_entries(entries)
+            catalog_time = time.perf_counter() - start
+            print(f"{'catalog rejects':18} {catalog_time * 1000:9.1f}ms  0 requests, {len(problems)} rejected")
+            print(f"  e.g. {problems[0]}" if problems else "  (no typos)")
+            if rejected != typos or len(problems) != typos:
+                sys.exit(f"expected {typos} rejections, provider found {rejected} and catalog {len(problems)}")
+
+            for platform in ("github", "gitlab"):
+                generator = git_token_generator.create_generator(platform, base_urls[platform], client=client,
+                                                                 **CREDENTIALS)
+                for attempt in ("fetched", "cached"):
+                    start = time.perf_counter()
+                    scopes = catalog.refresh(platform, base_urls[platform], generator.fetch_scopes)
+                    elapsed = time.perf_counter() - start
+                    added = len(scopes) - len(builtin[platform])
+                    print(f"{platform + ' refresh':18} {elapsed * 1000:9.1f}ms  {attempt}, "
+                          f"{added} scopes beyond the built-in list")
+            if catalog.check("github", ["copilot"], base_urls["github"]) or \
+                    catalog.check("gitlab", ["k8s_proxy"], base_urls["gitlab"]):
+                sys.exit("refreshed scopes were not picked up")
+            client.close()
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
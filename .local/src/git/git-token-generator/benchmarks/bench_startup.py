@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Bench Startup - Measure cold-start time of quick CLI commands.
+
+Runs each command in a fresh interpreter with `python -X importtime`, against a
+throwaway vault seeded with tokens, and reports the median wall-clock time, the
+total import time, the heaviest top-level imports and which provider modules
+were loaded (list-scopes should load only the one it was asked about). With
+--against, the same commands are run from another git revision of this tool
+for comparison.
+
+Usage:
+    ./benchmarks/bench_startup.py --runs 10
+    ./benchmarks/bench_startup.py --against HEAD~1 --tokens 500
+"""
+
+import os
+import sys
+import time
+import tarfile
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOL_DIR))
+
+COMMANDS = [
+    ["git_token_generator.py", "list-scopes", "github"],
+    ["git_token_generator.py", "list-scopes", "gitea"],
+    ["git_token_generator.py", "list"],
+    ["view_tokens.py"],
+]
+
+
+def seed_vault(config_dir: str, count: int) -> None:
+    """Store count tokens in a fresh vault under config_dir."""
+    os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+    from token_store import TokenManager
+
+    token_manager = TokenManager("json")
+    with token_manager.transaction():
+        for i in range(count):
+            platform = ("github", "gitlab", "bitbucket")[i % 3]
+            token_manager.save_token(platform, f"token-{i}", f"bench-{i}", ["repo"])
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Return total import milliseconds and (module, ms) for each top-level import."""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level
+        if not name[1:].startswith(" "):
+            top_level.append((name.strip(), int(cumulative) / 1000))
+    return sum(ms for _, ms in top_level), top_level
+
+
+def loaded_providers(tool_dir: Path, command: List[str], env: Dict[str, str]) -> List[str]:
+    """Run a command once with python -v and return the provider modules (providers.*) it loaded."""
+    # -X importtime misses modules loaded through importlib.import_module, as the registry does
+    proc = subprocess.run([sys.executable, "-v", *command], cwd=tool_dir, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    names = (line.split("'")[1] for line in proc.stderr.splitlines() if line.startswith("import '"))
+    return sorted(name for name in names if name.startswith("providers."))
+
+
+def measure(tool_dir: Path, command: List[str], runs: int, env: Dict[str, str],
+            required: bool = True) -> Optional[Dict]:
+    """Run a command runs times and summarize wall-clock and import times (None if it failed and isn't required)."""
+    walls, imports, heaviest = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *command], cwd=tool_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        walls.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0 and not required:
+            return None
+        if proc.returncode != 0:
+            sys.exit(f"{' '.join(command)} failed in {tool_dir}:\n{proc.stderr[-2000:]}")
+        total, top_level = parse_importtime(proc.stderr)
+        imports.append(total)
+        heaviest = sorted(top_level, key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "wall_ms": statistics.median(walls),
+        "import_ms": statistics.median(imports),
+        "heaviest": heaviest,
+        "providers": loaded_providers(tool_dir, command, env),
+    }
+
+
+def export_revision(revision: str, dest: Path) -> Path:
+    """Extract this tool's files at a git revision into dest and return the tool directory."""
+    prefix = subprocess.run(["git", "rev-parse", "--show-prefix"], cwd=TOOL_DIR, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    archive = dest / "tool.tar"
+    with open(archive, "wb") as f:
+        subprocess.run(["git", "archive", revision, "--", "."], cwd=TOOL_DIR, check=True, stdout=f)
+    with tarfile.open(archive) as tar:
+        tar.extractall(dest / "tool", filter="data")
+    tool_dir = dest / "tool" / prefix
+    return tool_dir if tool_dir.exists() else dest / "tool"
+
+
+def report(label: str, results: Dict[str, Dict]) -> None:
+    """Print one line per command, plus its heaviest imports."""
+    print(f"{label}:")
+    for command, result in results.items():
+        if result is None:
+            print(f"  {command:40} failed (not supported at this revision?)")
+            continue
+        print(f"  {command:40} wall {result['wall_ms']:7.1f}ms  imports {result['import_ms']:7.1f}ms")
+        print("    " + ", ".join(f"{name} {ms:.1f}ms" for name, ms in result["heaviest"]))
+        print(f"    provider modules: {', '.join(result['providers']) or 'none'}")
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark CLI cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command (the median is reported)")
+    parser.add_argument("--tokens", type=int, default=100, help="Tokens to seed the vault with")
+    parser.add_argument("--against", metavar="REVISION", help="Also time the tool as of this git revision")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as tmp:
+        config_dir = str(Path(tmp) / "config")
+        seed_vault(config_dir, args.tokens)
+        env = dict(os.environ, GIT_TOKEN_CONFIG_DIR=config_dir, HOME=tmp)
+
+        current = {" ".join(c): measure(TOOL_DIR, c, args.runs, env) for c in COMMANDS}
+        report("current", current)
+
+        if args.against:
+            old_dir = export_revision(args.against, Path(tmp))
+            baseline = {" ".join(c): measure(old_dir, c, args.runs, env, required=False) for c in COMMANDS}
+            report(args.against, baseline)
+            print("speedup:")
+            for command in current:
+                if baseline[command] is None:
+                    continue
+                print(f"  {command:40} {baseline[command]['wall_ms'] / current[command]['wall_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
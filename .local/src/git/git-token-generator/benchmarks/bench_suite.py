@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Bench Suite - Time the vault and CLI hot paths on synthetic vaults and report them as JSON.
+
+For each --sizes vault size, writes a synthetic tokens.json in the current
+on-disk format (entries encrypted under the vault key) and times, as the
+median of --repeat runs:
+
+    load               a fresh TokenManager reading the whole vault
+    save_token         one token saved into the loaded vault (a full rewrite)
+    get_token          one token from a fresh TokenManager (load + decrypt)
+    get_token_warm     one token from an already loaded vault (mean of --lookups)
+    list_tokens        every token's metadata
+    load_tokens        view_tokens.load_tokens, metadata only
+    load_tokens_values view_tokens.load_tokens --show-values on one platform
+    delete_tokens      delete_tokens.delete_tokens of 100 tokens (--force)
+    startup_*          cold CLI commands in a fresh interpreter
+
+Then mints --generate tokens through generate_batch against the local mock
+provider for generator throughput (generate_per_token and tokens_per_sec). Every time is in seconds. --json writes the
+results to a file, and --compare reads an earlier one and flags every time
+that got more than --threshold times slower, exiting 1 if any did, so runs
+before and after a change can be compared.
+
+Usage:
+    ./benchmarks/bench_suite.py --json before.json
+    ./benchmarks/bench_suite.py --sizes 1000 10000 --compare before.json --threshold 1.2
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOL_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_provider import start_mock_server  # noqa: E402
+
+PLATFORMS = ["github", "gitlab", "bitbucket"]
+SCOPES = ["repo", "api", "read_user", "write:org", "workflow"]
+GENERATE_PLATFORMS = ["github", "gitlab", "gitea"]
+CREDENTIALS = {"username": "bench", "password": "bench", "access_token": "bench"}
+
+
+def startup_commands(size: int) -> Dict[str, List[str]]:
+    """The cold CLI commands timed on a vault, by metric name."""
+    return {
+        "startup_list_scopes": ["git_token_generator.py", "list-scopes", "github"],
+        "startup_list": ["git_token_generator.py", "list", "--platform", "github", "--name", "ci-0"],
+        "startup_view": ["view_tokens.py", "--format", "plain", "--name", f"ci-{size - 1}"],
+    }
+
+
+def write_vault(tokens_file: Path, size: int, cipher) -> None:
+    """Write a synthetic vault of size entries, as save_token and generate would have stored them."""
+    from token_store import write_snapshot
+
+    rng = random.Random(size)
+    data = {}
+    for i in range(size):
+        entry = {
+            "name": f"ci-{i}",
+            "token": cipher.encrypt(f"ghp_bench{i:031d}".encode()).decode(),
+            "scopes": rng.sample(SCOPES, rng.randrange(1, 3)),
+            "created_at": f"2026-01-01T00:00:00.{i % 1000000:06d}",
+            "expires_at": None if i % 5 == 0 else f"2027-{i % 12 + 1:02d}-01T00:00:00",
+        }
+        if i % 2:
+            entry["token_id"] = i
+        data.setdefault(PLATFORMS[i % len(PLATFORMS)], []).append(entry)
+    write_snapshot(tokens_file, data)
+
+
+def median_time(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] = None) -> float:
+    """Run func repeat times (after setup, untimed) and return the median seconds."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def cli_time(command: List[str], runs: int, env: Dict[str, str]) -> float:
+    """Run a command in a fresh interpreter runs times and return the median wall-clock seconds."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, *command], cwd=TOOL_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        times.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            sys.exit(f"{' '.join(command)} failed:\n{proc.stderr[-2000:]}")
+    return statistics.median(times)
+
+
+def bench_vault(tokens_file: Path, size: int, args: argparse.Namespace) -> Dict[str, float]:
+    """Time the vault operations and cold CLI commands on a synthetic vault of size entries."""
+    import delete_tokens
+    import view_tokens
+    from query import TokenQuery
+    from token_store import TokenManager
+
+    token_manager = TokenManager("json")
+    write_vault(tokens_file, size, token_manager._get_cipher())
+    pristine = tokens_file.with_name("pristine.json")
+    shutil.copyfile(tokens_file, pristine)
+
+    def restore():
+        shutil.copyfile(pristine, tokens_file)
+
+    results = {}
+    results["load"] = median_time(lambda: TokenManager("json").store.count(), args.repeat)
+
+    loaded = TokenManager("json")
+    loaded.store.count()
+    saved = iter(range(args.repeat))
+    results["save_token"] = median_time(
+        lambda: loaded.save_token("github", "ghp_saved", f"bench-save-{next(saved)}", ["repo"]), args.repeat)
+    restore()
+
+    names = [f"ci-{i}" for i in random.Random(0).sample(range(size), min(args.lookups, size))]
+    results["get_token"] = median_time(
+        lambda: TokenManager("json").get_token(PLATFORMS[int(names[0][3:]) % len(PLATFORMS)], names[0]),
+        args.repeat)
+    loaded = TokenManager("json")
+    loaded.store.count()
+    start = time.perf_counter()
+    for name in names:
+        if loaded.get_token(PLATFORMS[int(name[3:]) % len(PLATFORMS)], name) is None:
+            sys.exit(f"get_token found no value for {name}")
+    results["get_token_warm"] = (time.perf_counter() - start) / len(names)
+
+    results["list_tokens"] = median_time(loaded.list_tokens, args.repeat)
+    results["load_tokens"] = median_time(view_tokens.load_tokens, args.repeat)
+    results["load_tokens_values"] = median_time(
+        lambda: view_tokens.load_tokens(TokenQuery(platform="gitlab"), show_values=True), args.repeat)
+
+    # The matches are shown in a table before deleting, so keep rich's output off the report
+    selection = TokenQuery(pattern="ci-1??")
+
+    def delete():
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not delete_tokens.delete_tokens(TokenManager("json"), selection, force=True):
+                sys.exit("delete_tokens deleted nothing")
+
+    results["delete_tokens"] = median_time(delete, args.repeat, setup=restore)
+    restore()
+
+    env = dict(os.environ, GIT_TOKEN_STORAGE="json")
+    for metric, command in startup_commands(size).items():
+        results[metric] = cli_time(command, args.startup_runs, env)
+    return results
+
+
+def bench_generate(args: argparse.Namespace) -> Dict[str, float]:
+    """Mint --generate tokens with generate_batch against the mock provider and time the run."""
+    import git_token_generator
+    from executor import BoundedExecutor
+    from http_client import HttpClient
+    from token_store import JsonTokenStore, TokenManager
+
+    server, base_urls = start_mock_server(args.latency)
+    try:
+        entries = [{
+            "platform": GENERATE_PLATFORMS[i % len(GENERATE_PLATFORMS)],
+            "name": f"bench-{i}",
+            "scopes": ["repo"],
+            "expiration": 30,
+            "base_url": base_urls[GENERATE_PLATFORMS[i % len(GENERATE_PLATFORMS)]],
+        } for i in range(args.generate)]
+        with tempfile.TemporaryDirectory(prefix="git-token-bench-") as vault_dir:
+            token_manager = TokenManager("json")
+            token_manager.store = JsonTokenStore(Path(vault_dir) / "tokens.json")
+            client = HttpClient(pool_size=args.concurrency)
+            start = time.perf_counter()
+            results = git_token_generator.generate_batch(entries, token_manager, CREDENTIALS,
+                                                         BoundedExecutor(args.concurrency), client)
+            elapsed = time.perf_counter() - start
+            client.close()
+    finally:
+        server.shutdown()
+
+    failed = [result for result in results if "error" in result]
+    if failed:
+        sys.exit(f"{len(failed)} tokens failed to generate, e.g. {failed[0]['error']}")
+    summary = client.latency_summary()
+    return {
+        # Per token, so runs minting different numbers of tokens compare
+        "generate_per_token": elapsed / len(entries),
+        "tokens_per_sec": len(entries) / elapsed,
+        "request_p95": summary.get("p95_ms", 0.0) / 1000,
+    }
+
+
+def revision() -> str:
+    """The git revision of this tool, with a + if it has uncommitted changes ("" outside git)."""
+    try:
+        head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=TOOL_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=TOOL_DIR, capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return head + ("+" if dirty else "")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """Print each time against the baseline's and return how many got more than threshold times slower."""
+    regressions = 0
+    meta = baseline["meta"]
+    print(f"against {meta.get('revision') or 'baseline'} ({meta.get('date', '?')}):", file=sys.stderr)
+    for section, metrics in results["results"].items():
+        for metric, seconds in metrics.items():
+            before = baseline["results"].get(section, {}).get(metric)
+            # Throughput is the one metric where bigger is better
+            if before is None or metric == "tokens_per_sec":
+                continue
+            ratio = seconds / before if before else float("inf")
+            flag = "  REGRESSION" if ratio > threshold else ""
+            regressions += bool(flag)
+            print(f"  {section:9} {metric:20} {before * 1000:10.3f}ms -> {seconds * 1000:10.3f}ms  "
+                  f"{ratio:5.2f}x{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark the vault and CLI hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Vault sizes to benchmark (default: 1000 10000 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per operation (the median is reported)")
+    parser.add_argument("--lookups", type=int, default=1000, help="Lookups timed for get_token_warm")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Runs per cold CLI command")
+    parser.add_argument("--generate", type=int, default=300, help="Tokens to mint for generator throughput")
+    parser.add_argument("--latency", type=float, default=0.01, help="Mock provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight while generating")
+    parser.add_argument("--json", metavar="FILE", help="Write the results to FILE as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="FILE", help="Compare with results written earlier by --json")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown against --compare that counts as a regression (default: 1.25)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        # Set before the tool is imported, so every TokenManager and CLI run uses this vault
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+        import logging
+        logging.disable(logging.WARNING)
+        from token_store import TOKENS_FILE
+
+        results = {}
+        for size in args.sizes:
+            results[str(size)] = bench_vault(TOKENS_FILE, size, args)
+            print(f"{size} tokens:", file=sys.stderr)
+            for metric, seconds in results[str(size)].items():
+                print(f"  {metric:20} {seconds * 1000:10.3f}ms", file=sys.stderr)
+        results["generate"] = bench_generate(args)
+        generate = results["generate"]
+        print(f"generate: {args.generate} tokens in {generate['generate_per_token'] * args.generate:.2f}s "
+              f"({generate['tokens_per_sec']:.0f}/s, p95 request {generate['request_p95'] * 1000:.1f}ms)",
+              file=sys.stderr)
+
+    report = {
+        "meta": {
+            "revision": revision(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "latency": args.latency,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
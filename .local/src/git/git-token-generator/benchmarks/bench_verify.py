@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bench Verify - Time a verify sweep serially and concurrently against the local mock provider.
+
+Mints --tokens tokens at the mock provider into a throwaway vault, revokes a
+--revoked fraction of the GitHub and GitLab ones behind the vault's back, then
+checks a sample serially (extrapolated to the whole vault) and the whole vault
+concurrently over pooled connections. Checks that exactly the revoked tokens
+were found, and that the status, check time and provider expiry were written
+back to the vault.
+
+Usage:
+    ./benchmarks/bench_verify.py --tokens 3000 --latency 0.05 --concurrency 64
+    ./benchmarks/bench_verify.py --tokens 3000 --storage sqlite
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_provider import start_mock_server  # noqa: E402
+
+PLATFORMS = ["github", "gitlab", "bitbucket"]
+SCOPES = {"github": ["repo"], "gitlab": ["api"], "bitbucket": ["repository"]}
+CREDENTIALS = {
+    "username": "bench",
+    "password": "bench",
+    "client_id": "bench",
+    "client_secret": "bench",
+    "access_token": "bench",
+}
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark serial vs concurrent token verification")
+    parser.add_argument("--tokens", type=int, default=3000, help="Tokens in the vault")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight")
+    parser.add_argument("--revoked", type=float, default=0.05,
+                        help="Fraction of GitHub and GitLab tokens to revoke before the sweep")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json", help="Vault storage backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="git-token-bench-") as config_dir:
+        os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+
+        import logging
+        logging.disable(logging.ERROR)
+        import git_token_generator
+        from executor import BoundedExecutor
+        from http_client import HttpClient, format_latency_summary
+        from query import TokenQuery
+        from token_store import TokenManager
+        from verify import record_results, verify_tokens
+
+        server, base_urls = start_mock_server(args.latency)
+        try:
+            token_manager = TokenManager(args.storage)
+            mint_client = HttpClient(pool_size=args.concurrency)
+            executor = BoundedExecutor(args.concurrency, default_limit=args.concurrency)
+            entries = [{
+                "platform": PLATFORMS[i % len(PLATFORMS)],
+                "name": f"bench-{i}",
+                "scopes": SCOPES[PLATFORMS[i % len(PLATFORMS)]],
+                "expiration": 30,
+                "base_url": base_urls[PLATFORMS[i % len(PLATFORMS)]],
+            } for i in range(args.tokens)]
+            start = time.perf_counter()
+            results = git_token_generator.generate_batch(entries, token_manager, CREDENTIALS, executor, mint_client)
+            mint_client.close()
+            if any("error" in result for result in results):
+                sys.exit("minting failed")
+            print(f"minted {args.tokens} tokens in {time.perf_counter() - start:.1f}s")
+
+            # Revoke some tokens at the provider only, so the vault still holds them
+            handler = server.RequestHandlerClass
+            revocable = [r for r in results if r["platform"] != "bitbucket"]
+            revoked = {r["name"] for r in random.Random(0).sample(revocable, int(len(revocable) * args.revoked))}
+            with handler.limit_lock:
+                for result in results:
+                    if result["name"] in revoked:
+                        del handler.issued[handler.by_value.pop(result["token"])]
+
+            def generators(client):
+                return lambda platform, base_url: git_token_generator.create_generator(platform, base_url,
+                                                                                       client=client)
+
+            serial_client = HttpClient(pool_size=1)
+            start = time.perf_counter()
+            serial = verify_tokens(token_manager, generators(serial_client), TokenQuery(pattern="bench-??"),
+                                   BoundedExecutor(1, default_limit=1))
+            serial_time = (time.perf_counter() - start) / len(serial) * args.tokens
+            serial_client.close()
+            print(f"{'serial':12} {serial_time:7.1f}s for {args.tokens} tokens (extrapolated from {len(serial)})")
+
+            client = HttpClient(pool_size=args.concurrency)
+            start = time.perf_counter()
+            results = verify_tokens(token_manager, generators(client), executor=executor)
+            sweep_time = time.perf_counter() - start
+            start = time.perf_counter()
+            recorded = record_results(token_manager, results)
+            record_time = time.perf_counter() - start
+            print(f"{'concurrent':12} {sweep_time:7.1f}s for {len(results)} tokens, recorded in {record_time:.2f}s  "
+                  f"{format_latency_summary(client.latency_summary())}")
+            print(f"speedup: {serial_time / sweep_time:.1f}x")
+
+            found = {r["entry"]["name"] for r in results if r.get("status") == "revoked"}
+            failed = [r for r in results if "error" in r]
+            if failed or found != revoked or recorded != len(results):
+                sys.exit(f"expected {len(revoked)} revoked, found {len(found)}; {len(failed)} failed checks, "
+                         f"{recorded} recorded")
+
+            checked = [entry for _, entry in token_manager.iter_tokens() if entry.get("verified_at")]
+            if len(checked) != args.tokens:
+                sys.exit("verification results were not written back")
+            print(f"found all {len(revoked)} revoked tokens; status written back for {len(checked)}")
+            client.close()
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
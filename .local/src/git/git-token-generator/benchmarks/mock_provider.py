@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Mock Provider - A local HTTP server that answers the GitHub, GitLab, Bitbucket and Gitea token endpoints.
+
+Used to exercise the generator classes and the concurrent batch path without
+touching a real provider. Every request sleeps for a configurable latency to
+stand in for the network round-trip.
+
+Endpoints:
+    POST   /github/authorizations                       -> 201 {"id": ..., "token": ...}
+    GET    /github/authorizations                       -> 200 [{"id": ..., "note": ...}]
+    GET    /github/user                                 -> 200, scopes in X-OAuth-Scopes; with a token,
+                                                           200 + its expiry header, or 401 if unknown
+    DELETE /github/authorizations/:id                   -> 204, or 404 if unknown
+    POST   /gitlab/api/v4/personal_access_tokens        -> 201 {"id": ..., "token": ...}
+    DELETE /gitlab/api/v4/personal_access_tokens/:id    -> 204, or 404 if unknown
+    DELETE /gitlab/api/v4/personal_access_tokens/self   -> 204, or 401 if the token is unknown
+    GET    /gitlab/api/v4/personal_access_tokens/self   -> 200 {"active": ..., "expires_at": ...}, or 401
+    GET    /gitlab/api/v4/version                       -> 200 {"version": ...}
+    GET    /bitbucket/2.0/user                          -> 200 {"username": ...}, or 401 if the token is unknown
+    POST   /bitbucket/site/oauth2/access_token          -> 200 {"access_token": ...}
+    POST   /gitea/api/v1/users/:user/tokens             -> 201 {"id": ..., "sha1": ...}
+    DELETE /gitea/api/v1/users/:user/tokens/:id|:name   -> 204, or 404 if unknown
+    GET    /gitea/api/v1/user                           -> 200 {"login": ...}, or 401 if the token is unknown
+
+/ghe/api/v3/... answers as /github/... does, standing in for a GitHub
+Enterprise host, and Forgejo is served by the /gitea endpoints.
+
+A token name containing "fail" gets a 400 (for Bitbucket, which never sees the
+name, a scope containing "fail"), and revoking a token whose name contains
+"pinned" gets a 403, so failure paths can be exercised too. Started with a
+scope list per platform, the server also answers requests for any other scope
+with 422, as GitHub does.
+
+Optionally the server enforces a rate limit of --limit requests per --window
+seconds, advertised GitHub-style (X-RateLimit-*) on /github and GitLab-style
+(RateLimit-*) elsewhere and answered with 429 + Retry-After once exceeded, and
+fails a random --error-rate fraction of requests with 503 + Retry-After. It also records the
+most requests in flight at once per provider, so tests can check concurrency caps.
+
+Usage:
+    ./benchmarks/mock_provider.py --port 8765 --latency 0.2 --limit 100 --window 10
+"""
+
+import json
+import math
+import time
+import random
+import argparse
+import itertools
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """Answer token requests for every mocked provider."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY every
+    # keep-alive response would stall on the client's delayed ACK
+    disable_nagle_algorithm = True
+    latency = 0.0
+    limit = 0
+    window = 1.0
+    error_rate = 0.0
+    counter = itertools.count(1)
+    # Shared rate-limit window: [window start, requests seen], guarded by limit_lock
+    limit_state = None
+    limit_lock = None
+    # Live tokens by ID: {"platform", "name", "token", "expires_at"}, and their IDs by value, guarded by limit_lock
+    issued = None
+    by_value = None
+    # Requests in flight and the most seen at once, by first path segment ("github", "ghe", ...),
+    # guarded by limit_lock
+    in_flight = None
+    peaks = None
+    # Accepted scopes by platform (None accepts any)
+    scopes = None
+    # What /github/user reports in X-OAuth-Scopes and /gitlab/api/v4/version as the version
+    oauth_scopes = "repo, read:org, workflow, copilot"
+    gitlab_version = "16.5.0-ee"
+
+    def _rate_limit(self) -> Tuple[Dict[str, str], bool]:
+        """Count this request against the window; return headers and whether it's allowed."""
+        if not self.limit:
+            return {}, True
+
+        with self.limit_lock:
+            now = time.time()
+            if now - self.limit_state[0] >= self.window:
+                self.limit_state[:] = [now, 0]
+            self.limit_state[1] += 1
+            used = self.limit_state[1]
+            reset = self.limit_state[0] + self.window
+
+        prefix = "X-RateLimit-" if self.path.startswith("/github/") else "RateLimit-"
+        headers = {
+            prefix + "Limit": str(self.limit),
+            prefix + "Remaining": str(max(0, self.limit - used)),
+            prefix + "Reset": str(int(math.ceil(reset))),
+        }
+        if used > self.limit:
+            headers["Retry-After"] = str(max(1, int(math.ceil(reset - now))))
+            return headers, False
+        return headers, True
+
+    def _reply(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        """Send a JSON response."""
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _admit(self) -> Optional[Dict[str, str]]:
+        """Apply latency, rate limiting and error injection; returns None if the request was refused."""
+        prefix = self.path.split("/")[1]
+        if self.path.startswith("/ghe/api/v3/"):
+            self.path = "/github/" + self.path[len("/ghe/api/v3/"):]
+        with self.limit_lock:
+            self.in_flight[prefix] = self.in_flight.get(prefix, 0) + 1
+            self.peaks[prefix] = max(self.peaks.get(prefix, 0), self.in_flight[prefix])
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self.limit_lock:
+                self.in_flight[prefix] -= 1
+
+        headers, allowed = self._rate_limit()
+        if not allowed:
+            self._reply(429, {"message": "rate limit exceeded"}, headers)
+            return None
+        if self.error_rate and random.random() < self.error_rate:
+            # Shedding load before doing anything, as it says with Retry-After, so even a POST can be retried
+            self._reply(503, {"message": "service unavailable"}, dict(headers, **{"Retry-After": "1"}))
+            return None
+        return headers
+
+    def _issue(self, platform: str, name: str, token_format: str, expires_at: Optional[str] = None) -> Dict:
+        """Record a new live token and return its ID and value."""
+        token_id = next(self.counter)
+        token = token_format.format(token_id)
+        with self.limit_lock:
+            self.issued[token_id] = {"platform": platform, "name": name, "token": token, "expires_at": expires_at}
+            self.by_value[token] = token_id
+        return {"id": token_id, "token": token}
+
+    def _live(self, platform: str, token: Optional[str]) -> Optional[Dict]:
+        """Return a live token by value, or None if it was never issued or has been revoked."""
+        with self.limit_lock:
+            item = self.issued.get(self.by_value.get(token))
+        return item if item is not None and item["platform"] == platform else None
+
+    def _revoke(self, platform: str, token_id: Optional[int] = None, token: Optional[str] = None,
+                name: Optional[str] = None) -> int:
+        """Revoke a live token by ID, value or name and return the status to answer with."""
+        with self.limit_lock:
+            if name is not None:
+                token_id = next((key for key, item in self.issued.items()
+                                 if item["platform"] == platform and item["name"] == name), None)
+            key = token_id if token_id is not None else self.by_value.get(token)
+            item = self.issued.get(key)
+            if item is None or item["platform"] != platform:
+                return 404
+            if "pinned" in item["name"]:
+                return 403
+            del self.issued[key]
+            del self.by_value[item["token"]]
+            return 204
+
+    def do_GET(self) -> None:
+        """List live GitHub authorizations, or answer a scope lookup or token check."""
+        headers = self._admit()
+        if headers is None:
+            return
+        scheme, _, token = self.headers.get("Authorization", "").partition(" ")
+        if self.path == "/github/user" and scheme in ("token", "Bearer"):
+            item = self._live("github", token)
+            if item is None:
+                self._reply(401, {"message": "Bad credentials"}, headers)
+            elif item["expires_at"]:
+                expiry = {"GitHub-Authentication-Token-Expiration": f"{item['expires_at']} 00:00:00 UTC"}
+                self._reply(200, {"login": "mock"}, dict(headers, **expiry))
+            else:
+                self._reply(200, {"login": "mock"}, headers)
+            return
+        if self.path == "/github/user":
+            self._reply(200, {"login": "mock"}, dict(headers, **{"X-OAuth-Scopes": self.oauth_scopes}))
+            return
+        if self.path == "/gitlab/api/v4/personal_access_tokens/self":
+            item = self._live("gitlab", self.headers.get("PRIVATE-TOKEN"))
+            if item is None:
+                self._reply(401, {"message": "401 Unauthorized"}, headers)
+            else:
+                self._reply(200, {"name": item["name"], "active": True, "revoked": False,
+                                  "expires_at": item["expires_at"]}, headers)
+            return
+        if self.path == "/bitbucket/2.0/user":
+            if self._live("bitbucket", token if scheme == "Bearer" else None) is None:
+                self._reply(401, {"type": "error", "error": {"message": "Access token expired."}}, headers)
+            else:
+                self._reply(200, {"username": "mock"}, headers)
+            return
+        if self.path == "/gitea/api/v1/user":
+            if scheme != "token" or self._live("gitea", token) is None:
+                self._reply(401, {"message": "user does not exist"}, headers)
+            else:
+                self._reply(200, {"login": "mock"}, headers)
+            return
+        if self.path == "/gitlab/api/v4/version":
+            self._reply(200, {"version": self.gitlab_version, "revision": "mock"}, headers)
+            return
+        if self.path != "/github/authorizations":
+            self._reply(404, {"message": "not found"}, headers)
+            return
+        with self.limit_lock:
+            listing = [{"id": key, "note": item["name"]} for key, item in self.issued.items()
+                       if item["platform"] == "github"]
+        self._reply(200, listing, headers)
+
+    def do_DELETE(self) -> None:
+        """Revoke a GitHub authorization, a GitLab personal access token or a Gitea access token."""
+        headers = self._admit()
+        if headers is None:
+            return
+
+        path, _, last = self.path.rpartition("/")
+        if path == "/github/authorizations" and last.isdigit():
+            status = self._revoke("github", token_id=int(last))
+        elif path == "/gitlab/api/v4/personal_access_tokens" and last == "self":
+            status = self._revoke("gitlab", token=self.headers.get("PRIVATE-TOKEN"))
+            status = 401 if status == 404 else status
+        elif path == "/gitlab/api/v4/personal_access_tokens" and last.isdigit():
+            status = self._revoke("gitlab", token_id=int(last))
+        elif path.startswith("/gitea/api/v1/users/") and path.endswith("/tokens"):
+            status = self._revoke("gitea", token_id=int(last)) if last.isdigit() else self._revoke("gitea", name=last)
+        else:
+            status = 404
+
+        if status == 204:
+            self.send_response(204)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+        else:
+            self._reply(status, {"message": "revocation refused" if status == 403 else "not found"}, headers)
+
+    def do_POST(self) -> None:
+        """Mint a fake token after the configured latency."""
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length).decode()
+        headers = self._admit()
+        if headers is None:
+            return
+
+        if self.path.startswith("/bitbucket/"):
+            platform = "bitbucket"
+            name = " ".join(parse_qs(raw).get("scope", [""]))
+            requested = name.split()
+        else:
+            platform = self.path.split("/")[1]
+            data = json.loads(raw or "{}")
+            name = data.get("note") or data.get("name") or ""
+            requested = data.get("scopes") or []
+
+        if "fail" in name:
+            self._reply(400, {"message": f"refusing to create {name}"}, headers)
+            return
+        if self.scopes is not None:
+            unknown = [scope for scope in requested if scope not in self.scopes.get(platform, ())]
+            if unknown:
+                self._reply(422, {"message": f"invalid scopes: {', '.join(unknown)}"}, headers)
+                return
+
+        if self.path == "/github/authorizations":
+            self._reply(201, self._issue("github", name, "ghp_mock{}", data.get("expires_at")), headers)
+        elif self.path == "/gitlab/api/v4/personal_access_tokens":
+            self._reply(201, self._issue("gitlab", name, "glpat-mock{}", data.get("expires_at")), headers)
+        elif self.path == "/bitbucket/site/oauth2/access_token":
+            issued = self._issue("bitbucket", name, "bb-mock{}")
+            self._reply(200, {"access_token": issued["token"], "refresh_token": "unused",
+                              "expires_in": 7200}, headers)
+        elif self.path.startswith("/gitea/api/v1/users/") and self.path.endswith("/tokens"):
+            issued = self._issue("gitea", name, "{:040x}")
+            self._reply(201, {"id": issued["id"], "name": name, "sha1": issued["token"]}, headers)
+        else:
+            self._reply(404, {"message": "not found"}, headers)
+
+    def log_message(self, format: str, *args) -> None:
+        """Keep the console quiet."""
+
+
+def start_mock_server(latency: float = 0.0, port: int = 0, limit: int = 0, window: float = 1.0,
+                      error_rate: float = 0.0, scopes: Optional[Dict[str, List[str]]] = None
+                      ) -> Tuple[ThreadingHTTPServer, Dict[str, str]]:
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        latency: Seconds to sleep per request
+        port: Port to listen on (0 picks a free one)
+        limit: Requests allowed per window across all endpoints (0 for no limit)
+        window: Rate-limit window in seconds
+        error_rate: Fraction of requests answered with 503
+        scopes: Scopes accepted per platform; others get 422 (None accepts any)
+
+    Returns:
+        The server (call shutdown() when done) and the base_url to pass to each platform's generator.
+        server.RequestHandlerClass.peaks holds the most requests seen in flight at once per
+        first path segment ("github", "ghe", "gitlab", "bitbucket", "gitea").
+    """
+    handler = type("Handler", (MockProviderHandler,), {
+        "latency": latency,
+        "limit": limit,
+        "window": window,
+        "error_rate": error_rate,
+        "limit_state": [time.time(), 0],
+        "limit_lock": threading.Lock(),
+        "issued": {},
+        "by_value": {},
+        "in_flight": {},
+        "peaks": {},
+        "scopes": scopes,
+    })
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 128})
+    server = server_class(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    root = f"http://127.0.0.1:{server.server_address[1]}"
+    base_urls = {
+        "github": f"{root}/github",
+        "gitlab": f"{root}/gitlab",
+        "bitbucket": f"{root}/bitbucket/site/oauth2/access_token",
+        "github-enterprise": f"{root}/ghe/api/v3",
+        "gitea": f"{root}/gitea",
+        "forgejo": f"{root}/gitea",
+    }
+    return server, base_urls
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Run a mock Git provider token API")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument("--limit", type=int, default=0, help="Requests allowed per window (0 for no limit)")
+    parser.add_argument("--window", type=float, default=1.0, help="Rate-limit window in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server, base_urls = start_mock_server(args.latency, args.port, args.limit, args.window, args.error_rate)
+    for platform, url in base_urls.items():
+        print(f"{platform:17} base_url: {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
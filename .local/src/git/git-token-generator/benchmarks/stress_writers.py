@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Stress Writers - Spawn many concurrent writer processes against one vault and verify no token is lost.
+
+Each writer saves its tokens through TokenManager, alternating between single
+saves and multi-token transactions. The vault lives in a throwaway config
+directory, so this never touches ~/.config/git-token-generator.
+tests/test_token_store.py runs a small round of it on every backend.
+
+Usage:
+    ./benchmarks/stress_writers.py --writers 16 --tokens 25 --storage json journal sqlite binary
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def writer(config_dir: str, storage: str, writer_id: int, count: int) -> None:
+    """Save count tokens from one process."""
+    os.environ["GIT_TOKEN_CONFIG_DIR"] = config_dir
+    from token_store import TokenManager
+
+    token_manager = TokenManager(storage)
+    i = 0
+    while i < count:
+        if i % 2:
+            token_manager.save_token("github", f"value-{writer_id}-{i}", f"w{writer_id}-t{i}", ["repo"])
+            i += 1
+        else:
+            with token_manager.transaction():
+                for j in range(i, min(i + 3, count)):
+                    token_manager.save_token("gitlab", f"value-{writer_id}-{j}", f"w{writer_id}-t{j}", ["api"])
+            i = min(i + 3, count)
+
+
+def run(storage: str, writers: int, count: int) -> bool:
+    """Run one stress round and report whether every token survived."""
+    with tempfile.TemporaryDirectory(prefix="git-token-stress-") as config_dir:
+        # Writers also race to create the encryption key, which must end up shared
+        ctx = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        processes = [ctx.Process(target=writer, args=(config_dir, storage, w, count)) for w in range(writers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [p for p in processes if p.exitcode != 0]
+
+        import token_store
+        from cryptography.fernet import Fernet, InvalidToken
+
+        if storage == "sqlite":
+            store = token_store.SqliteTokenStore(Path(config_dir) / "tokens.db")
+        elif storage == "binary":
+            store = token_store.BinaryTokenStore(Path(config_dir) / "tokens.vault")
+        else:
+            store = token_store.JsonTokenStore(Path(config_dir) / "tokens.json", journal=storage == "journal")
+        entries = [entry for platform_entries in store.query().values() for entry in platform_entries]
+        store.close()
+
+        # Every value must decrypt with the one key that won the creation race
+        cipher = Fernet((Path(config_dir) / "key.key").read_bytes())
+        undecryptable = 0
+        for entry in entries:
+            try:
+                cipher.decrypt(entry["token"].encode())
+            except InvalidToken:
+                undecryptable += 1
+
+        stored = {entry["name"] for entry in entries}
+        expected = {f"w{w}-t{i}" for w in range(writers) for i in range(count)}
+        missing = expected - stored
+        ok = not missing and not failed and not undecryptable
+        print(f"{storage:8} writers={writers} tokens={len(expected)} stored={len(stored)} "
+              f"missing={len(missing)} undecryptable={undecryptable} failed_writers={len(failed)} {elapsed:.2f}s "
+              f"{'OK' if ok else 'LOST TOKENS'}")
+        return ok
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description="Stress-test concurrent vault writers")
+    parser.add_argument("--writers", type=int, default=16, help="Number of writer processes")
+    parser.add_argument("--tokens", type=int, default=25, help="Tokens saved by each writer")
+    parser.add_argument("--storage", nargs="+", default=["json", "journal", "sqlite", "binary"],
+                        choices=["json", "journal", "sqlite", "binary"], help="Backends to test")
+    args = parser.parse_args()
+
+    results = [run(storage, args.writers, args.tokens) for storage in args.storage]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Binary Vault - A compact on-disk vault format that can look up one token without parsing the rest.
+
+tokens.json is parsed in full on every load, and stores every Fernet
+ciphertext as base64 text. A binary vault (tokens.vault) holds the same
+entries as:
+
+    header   fixed HEADER: magic, version, entry count, and where the
+             indexes and the key blob start
+    records  one per entry, in storage order, each length-prefixed:
+             u32 metadata length, metadata (a JSON array: platform, name,
+             scopes, created_at, expires_at and the other fields or null),
+             u8 ciphertext kind, u32 ciphertext length, ciphertext
+    index    one fixed-size SLOT per entry, sorted by (platform, name):
+             where its key is in the key blob, and where its record is
+    hosts    one SLOT per entry with a "host" field, sorted by host
+    keys     "platform\\0name" for every index slot and the host of every
+             host slot, UTF-8
+
+Ciphertexts are stored as the raw bytes behind their base64 (a quarter
+smaller), unless that would not give back exactly the same text, as for an
+entry that cannot be decrypted anyway; those are kept as they are, so a
+round trip through this format never changes an entry.
+
+lookup() memory-maps the file and binary-searches the index, so finding a
+token touches the header, about log2(entries) index slots and keys, and its
+record; given only a platform, it reads that platform's records. lookup_host()
+does the same with the host index, for the credential helper. Ties come back
+in storage order. read_vault_file() reads every record, in storage order, for
+the operations that need the whole vault. Files are written to a temporary file
+and renamed into place, so a reader sees either the old vault or the new one.
+"""
+
+import os
+import json
+import mmap
+import base64
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import tracing
+from token_record import TokenRecord
+
+MAGIC = b"GTVAULT\x00"
+VERSION = 1
+
+# magic, version, flags, entry count, index offset, key blob offset, key blob length,
+# host slot count, host index offset
+HEADER = struct.Struct("<8sHHIQQQIQ")
+# key offset in the blob, key length, record offset, record length
+SLOT = struct.Struct("<IHQI")
+LENGTH = struct.Struct("<I")
+KIND = struct.Struct("<B")
+
+# How a record's ciphertext is stored
+RAW_CIPHERTEXT = 0   # the bytes behind the base64 text
+TEXT_CIPHERTEXT = 1  # the text itself, UTF-8
+META_CIPHERTEXT = 2  # not a string (e.g. missing); the value ends the metadata array
+
+Vault = Dict[str, List[TokenRecord]]
+
+# Shared, as json.dumps() builds a new encoder on every call made with separators
+_META_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def index_key(platform: str, name: str) -> bytes:
+    """The key an entry is indexed under."""
+    return f"{platform}\0{name}".encode()
+
+
+def encode_ciphertext(token: Any) -> Tuple[int, bytes]:
+    """Pick the smallest exact form of a ciphertext: its raw bytes if base64 gives back the same text."""
+    if not isinstance(token, str):
+        return META_CIPHERTEXT, b""
+    try:
+        raw = base64.urlsafe_b64decode(token)
+    except (ValueError, TypeError):
+        return TEXT_CIPHERTEXT, token.encode()
+    if base64.urlsafe_b64encode(raw).decode() == token:
+        return RAW_CIPHERTEXT, raw
+    return TEXT_CIPHERTEXT, token.encode()
+
+
+def encode_record(platform: str, entry: Dict[str, Any]) -> bytes:
+    """Serialize one entry as a length-prefixed record."""
+    record = TokenRecord.from_dict(entry)
+    kind, ciphertext = encode_ciphertext(record.token)
+    meta = [platform, record.name, record.scopes, record.created_at, record.expires_at, record.extra]
+    if kind == META_CIPHERTEXT:
+        meta.append(record.token)
+    meta_bytes = _META_ENCODER.encode(meta).encode()
+    return b"".join((LENGTH.pack(len(meta_bytes)), meta_bytes, KIND.pack(kind),
+                     LENGTH.pack(len(ciphertext)), ciphertext))
+
+
+def split_record(buffer: Any, offset: int) -> Tuple[bytes, int, bytes, int]:
+    """Split the record at offset; returns its metadata, ciphertext kind, ciphertext and the offset after it."""
+    (meta_length,) = LENGTH.unpack_from(buffer, offset)
+    offset += LENGTH.size
+    meta = bytes(buffer[offset:offset + meta_length])
+    offset += meta_length
+    (kind,) = KIND.unpack_from(buffer, offset)
+    (length,) = LENGTH.unpack_from(buffer, offset + KIND.size)
+    offset += KIND.size + LENGTH.size
+    return meta, kind, bytes(buffer[offset:offset + length]), offset + length
+
+
+def build_record(meta: List[Any], kind: int, ciphertext: bytes) -> Tuple[str, TokenRecord]:
+    """Turn a record's parsed metadata and its ciphertext back into its platform and entry."""
+    platform, name, scopes, created_at, expires_at, extra, *token = meta
+    if kind == RAW_CIPHERTEXT:
+        value = base64.urlsafe_b64encode(ciphertext).decode()
+    elif kind == TEXT_CIPHERTEXT:
+        value = ciphertext.decode()
+    else:
+        value = token[0] if token else None
+    return platform, TokenRecord(name, value, scopes, created_at, expires_at, extra)
+
+
+def decode_records(buffer: Any, offsets: Iterable[int]) -> List[Tuple[str, TokenRecord]]:
+    """Read the records at these offsets; returns (platform, entry) for each, in the same order."""
+    records = [split_record(buffer, offset)[:3] for offset in offsets]
+    # One parse for every record's metadata is much faster than one each
+    metas = json.loads(b"[" + b",".join(meta for meta, _, _ in records) + b"]")
+    return [build_record(meta, kind, ciphertext) for meta, (_, kind, ciphertext) in zip(metas, records)]
+
+
+def read_header(buffer: Any, path: Path) -> Tuple[int, int, int, int, int, int]:
+    """
+    Check the header.
+
+    Returns:
+        Where the records start, the entry count, the index offset, the host slot
+        count, the host index offset and the key blob offset
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError(f"{path} is not a binary vault (too short)")
+    (magic, version, _, count, index_offset, keys_offset, _,
+     host_count, host_index_offset) = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary vault")
+    if version > VERSION:
+        raise ValueError(f"{path} is a version {version} binary vault; this tool reads up to version {VERSION}")
+    return HEADER.size, count, index_offset, host_count, host_index_offset, keys_offset
+
+
+def write_vault_file(path: Path, data: Vault) -> None:
+    """Write a vault in the binary format, replacing the file atomically."""
+    with tracing.span("vault.save"):
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tokens-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"\0" * HEADER.size)
+                slots, host_slots = [], []
+                offset = HEADER.size
+                for platform, entries in data.items():
+                    for entry in entries:
+                        record = encode_record(platform, entry)
+                        f.write(record)
+                        # Sorted by key, ties in storage order, so a lookup finds the first entry
+                        slots.append((index_key(platform, entry["name"]), len(slots), offset, len(record)))
+                        host = entry.get("host")
+                        if isinstance(host, str) and host:
+                            host_slots.append((host.encode(), len(slots), offset, len(record)))
+                        offset += len(record)
+                slots.sort()
+                host_slots.sort()
+
+                index_offset = offset
+                host_index_offset = index_offset + len(slots) * SLOT.size
+                keys = []
+                key_offset = 0
+                for key, _, record_offset, record_length in slots + host_slots:
+                    f.write(SLOT.pack(key_offset, len(key), record_offset, record_length))
+                    keys.append(key)
+                    key_offset += len(key)
+                keys_offset = host_index_offset + len(host_slots) * SLOT.size
+                f.write(b"".join(keys))
+
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, 0, len(slots), index_offset, keys_offset, key_offset,
+                                    len(host_slots), host_index_offset))
+                f.flush()
+                os.fsync(f.fileno())
+                tracing.count("bytes_written", keys_offset + key_offset)
+            os.chmod(tmp_name, 0o600)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+
+def read_vault_file(path: Path) -> Vault:
+    """Read every entry, grouped by platform in storage order ({} if the file doesn't exist)."""
+    with tracing.span("vault.load"):
+        try:
+            with open(path, "rb") as f:
+                buffer = f.read()
+        except FileNotFoundError:
+            return {}
+        tracing.count("bytes_read", len(buffer))
+        offset, count, index_offset, _, _, _ = read_header(buffer, path)
+        view = memoryview(buffer)
+        offsets = []
+        for _ in range(count):
+            offsets.append(offset)
+            offset = split_record(view, offset)[3]
+        if offset != index_offset:
+            raise ValueError(f"{path} is corrupted: its records end at {offset}, its index starts at {index_offset}")
+        data = {}
+        for platform, entry in decode_records(view, offsets):
+            data.setdefault(platform, []).append(entry)
+    return data
+
+
+def map_vault(f: Any, path: Path) -> mmap.mmap:
+    """Memory-map an open vault file, which must be at least a header long (mmap refuses empty files)."""
+    if os.fstat(f.fileno()).st_size < HEADER.size:
+        raise ValueError(f"{path} is not a binary vault (too short)")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _search(buffer: Any, index_offset: int, count: int, keys_offset: int, key: bytes,
+            prefix: bool = False) -> List[int]:
+    """Binary-search an index for the slots whose key is key (or starts with it); returns their record offsets."""
+    def slot_key(position: int) -> Tuple[bytes, int]:
+        key_offset, key_length, record_offset, _ = SLOT.unpack_from(buffer, index_offset + position * SLOT.size)
+        start = keys_offset + key_offset
+        return buffer[start:start + key_length], record_offset
+
+    # The first slot with the key; the slots sharing it follow
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if slot_key(middle)[0] < key:
+            low = middle + 1
+        else:
+            high = middle
+    offsets = []
+    while low < count:
+        found, record_offset = slot_key(low)
+        if found != key and not (prefix and found.startswith(key)):
+            break
+        offsets.append(record_offset)
+        low += 1
+    # Records are laid out in storage order
+    return sorted(offsets) if prefix else offsets
+
+
+def lookup(path: Path, platform: str, name: Optional[str] = None) -> List[TokenRecord]:
+    """Find the entries with this platform and name (every entry of the platform if name is None), in storage order."""
+    with tracing.span("vault.lookup"):
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f, map_vault(f, path) as buffer:
+            _, count, index_offset, _, _, keys_offset = read_header(buffer, path)
+            if name is None:
+                offsets = _search(buffer, index_offset, count, keys_offset, f"{platform}\0".encode(), prefix=True)
+            else:
+                offsets = _search(buffer, index_offset, count, keys_offset, index_key(platform, name))
+            return [entry for _, entry in decode_records(buffer, offsets)]
+
+
+def lookup_host(path: Path, host: str) -> List[Tuple[str, TokenRecord]]:
+    """Find the entries with this host through the host index; returns (platform, entry) for each, in storage order."""
+    with tracing.span("vault.lookup"):
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f, map_vault(f, path) as buffer:
+            _, _, _, host_count, host_index_offset, keys_offset = read_header(buffer, path)
+            offsets = _search(buffer, host_index_offset, host_count, keys_offset, host.encode())
+            return decode_records(buffer, offsets)
@@ -0,0 +1,67 @@
+"""
+CLI Common - The options and setup shared by git_token_generator.py and delete_tokens.py.
+
+Kept apart from git_token_generator.py so delete_tokens.py can take the
+authentication and connection options without importing every command.
+"""
+
+import logging
+import argparse
+from typing import Dict, Optional
+
+from http_client import HttpClient, DEFAULT_POOL_SIZE
+from rate_limit import RequestScheduler, DEFAULT_MAX_RETRIES
+
+
+def configure_logging(rich: bool = True) -> None:
+    """Send log records to the console, through rich unless the command should start fast."""
+    handlers = None
+    if rich:
+        from rich.logging import RichHandler
+        handlers = [RichHandler(rich_tracebacks=True)]
+    logging.basicConfig(level=logging.INFO, format="%(message)s", datefmt="[%X]", handlers=handlers)
+
+
+def add_auth_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the authentication options shared by the commands that authenticate to providers."""
+    parser.add_argument("--username", help="Username for authentication")
+    parser.add_argument("--password", help="Password for authentication")
+    parser.add_argument("--client-id", help="OAuth client ID (Bitbucket)")
+    parser.add_argument("--client-secret", help="OAuth client secret (Bitbucket)")
+    parser.add_argument("--access-token", help="Access token for authentication (GitLab)")
+
+
+def auth_credentials(args: argparse.Namespace) -> Dict[str, Optional[str]]:
+    """Collect the authentication options into keyword arguments for create_generator."""
+    return {
+        "username": args.username,
+        "password": args.password,
+        "client_id": args.client_id,
+        "client_secret": args.client_secret,
+        "access_token": args.access_token,
+    }
+
+
+def add_http_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the connection options shared by commands that call provider APIs."""
+    parser.add_argument("--pool-size", type=int,
+                        help=f"Connections kept open per host (default: {DEFAULT_POOL_SIZE}, "
+                             "or --concurrency for batches)")
+    parser.add_argument("--timeout", type=float, help="Request timeout in seconds (default: 10 connect, 30 read)")
+    parser.add_argument("--no-keep-alive", action="store_true", help="Open a new connection for every request")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f"Retries for rate-limited or transient failures (default: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument("--rate-limit", type=float, metavar="PER_SECOND",
+                        help="Cap requests per second per host (default: paced from provider headers)")
+
+
+def create_client(args: argparse.Namespace, pool_size: int = DEFAULT_POOL_SIZE) -> HttpClient:
+    """Create the pooled HTTP client described by the connection options."""
+    options = {
+        "pool_size": args.pool_size or pool_size,
+        "keep_alive": not args.no_keep_alive,
+        "scheduler": RequestScheduler(max_retries=args.max_retries, rate=args.rate_limit),
+    }
+    if args.timeout:
+        options["timeout"] = args.timeout
+    return HttpClient(**options)
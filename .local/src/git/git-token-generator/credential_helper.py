@@ -0,0 +1,404 @@
+"""
+Credential Helper - Serve vault tokens to git through the credential helper protocol.
+
+git runs the helper with an action (get, store or erase) and writes key=value
+attributes (protocol, host, path, username, password) to its stdin, ending with
+a blank line. For get, the helper answers with the username and password to use:
+
+    git config --global credential.helper "!/path/to/git_token_generator.py credential --cache"
+
+A token is chosen by host: entries saved with a matching "host" field win, then
+tokens for the provider serving the host (see HOSTS in providers/). Expired
+tokens are skipped, as are credentials stored for another username than the
+one in the remote URL, and the most recently created one is used. Both steps
+are indexed queries (by host, then by platform), so a lookup doesn't read the
+whole vault on backends that can avoid it.
+
+Since git calls the helper on every fetch and push, --cache keeps decrypted
+credentials in a small daemon listening on a Unix socket, keyed by protocol,
+host and username. The daemon is started on demand, evicts entries after their
+TTL and exits once it is empty; a lock file next to the socket keeps a second
+one from starting. Only the daemon holds plaintext tokens; the socket lives in
+a directory only the owner can open.
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import socket
+import threading
+import subprocess
+import socketserver
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, TextIO, Tuple
+
+from providers import platform_for_host, token_username
+from query import TokenQuery
+from token_store import CONFIG_DIR, TokenManager
+
+DEFAULT_CACHE_TTL = 900
+CACHE_SOCKET = CONFIG_DIR / "cache" / "socket"
+
+# Name prefix for credentials git asked the helper to store
+STORED_PREFIX = "git-credential:"
+
+Credential = Dict[str, str]
+# (protocol, host, username) as git sends them, "" where it sent nothing
+CacheKey = Tuple[str, str, str]
+
+
+def read_request(stream: TextIO) -> Dict[str, str]:
+    """Read key=value attributes from git until a blank line or end of input."""
+    request = {}
+    for line in stream:
+        line = line.rstrip("\n")
+        if not line:
+            break
+        key, sep, value = line.partition("=")
+        if sep:
+            request[key] = value
+    return request
+
+
+def write_credential(stream: TextIO, credential: Credential) -> None:
+    """Write a credential back to git."""
+    for key in ("username", "password"):
+        if credential.get(key):
+            stream.write(f"{key}={credential[key]}\n")
+    stream.flush()
+
+
+def _is_expired(entry: Dict[str, Any], now: datetime) -> bool:
+    """Whether an entry's expires_at has passed."""
+    try:
+        return bool(entry.get("expires_at")) and datetime.fromisoformat(entry["expires_at"]) <= now
+    except ValueError:
+        return False
+
+
+def _newest(rows: Iterable[Tuple[str, Dict[str, Any]]], username: Optional[str],
+            now: datetime) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """The newest unexpired (platform, entry) usable by username, preferring one stored for that username."""
+    best = None
+    for platform, entry in rows:
+        stored_for = entry.get("username")
+        # A credential stored for one user is never handed to another
+        if (username and stored_for and stored_for != username) or _is_expired(entry, now):
+            continue
+        key = (bool(username) and stored_for == username, entry.get("created_at") or "")
+        if best is None or key > best[0]:
+            best = (key, platform, entry)
+    return best and best[1:]
+
+
+def lookup(token_manager: TokenManager, host: str, username: Optional[str] = None) -> Optional[Credential]:
+    """
+    Find the credential for a host in the vault.
+
+    Only the chosen entry is decrypted.
+
+    Args:
+        token_manager: Vault to search
+        host: Host as git sends it (may include a port)
+        username: Username from the remote URL, if any; it is kept in the answer
+
+    Returns:
+        The username and password to give git, or None if no token applies
+    """
+    store = token_manager.store
+    now = datetime.now()
+    best = _newest(store.iterate(TokenQuery(host=host)), username, now)
+    platform = platform_for_host(host)
+    if best is None and platform:
+        rows = ((plat, entry) for plat, entry in store.iterate(TokenQuery(platform=platform))
+                if not entry.get("host"))
+        best = _newest(rows, username, now)
+
+    if best is None:
+        return None
+    plat, entry = best
+    # The entry itself, not the first one with its name: fan-out tokens share a name across hosts
+    password = token_manager.entry_value(plat, entry)
+    if password is None:
+        return None
+    return {
+        "username": username or entry.get("username") or token_username(plat),
+        "password": password,
+    }
+
+
+def stored_name(host: str, username: Optional[str] = None) -> str:
+    """The vault name of a credential git asked the helper to store."""
+    return f"{STORED_PREFIX}{username}@{host}" if username else STORED_PREFIX + host
+
+
+def store_credential(token_manager: TokenManager, request: Dict[str, str]) -> bool:
+    """
+    Save a credential git reports as working, unless the vault already supplied it.
+
+    Returns:
+        Whether anything was written
+    """
+    host, password = request.get("host"), request.get("password")
+    platform = platform_for_host(host) if host else None
+    if not host or not password or not platform:
+        return False
+
+    username = request.get("username")
+    name = stored_name(host, username)
+    with token_manager.transaction():
+        current = lookup(token_manager, host, username)
+        if current and current["password"] == password:
+            return False
+        token_manager.delete_tokens(platform, name)
+        extra = {"host": host}
+        if username:
+            extra["username"] = username
+        token_manager.save_token(platform, password, name, [], extra=extra)
+    return True
+
+
+def erase_credential(token_manager: TokenManager, request: Dict[str, str]) -> int:
+    """
+    Forget a credential git reports as rejected.
+
+    Only credentials stored through the helper are removed; tokens created by
+    the generator stay in the vault until deleted explicitly. The credential
+    stored for the request's username is tried first, then the one stored for
+    the host without a username.
+
+    Returns:
+        The number of vault entries removed
+    """
+    host = request.get("host")
+    platform = platform_for_host(host) if host else None
+    if not host or not platform:
+        return 0
+
+    names = [stored_name(host, request.get("username")), stored_name(host)]
+    with token_manager.transaction():
+        for name in dict.fromkeys(names):
+            password = token_manager.get_token(platform, name)
+            if password is not None and (not request.get("password") or request["password"] == password):
+                return token_manager.delete_tokens(platform, name)
+        return 0
+
+
+class CredentialCache:
+    """Decrypted credentials by (protocol, host, username), each evicted once its TTL has passed."""
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL):
+        """Initialize an empty cache whose entries live for ttl seconds."""
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Optional[Credential]:
+        """Return the cached credential for a key, if it hasn't expired."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return item[0]
+
+    def put(self, key: CacheKey, credential: Credential) -> None:
+        """Cache a credential for a key."""
+        with self._lock:
+            self._entries[key] = (credential, time.monotonic() + self.ttl)
+
+    def erase(self, key: CacheKey) -> None:
+        """Drop the credential for a key; without a username, every user's for the protocol and host."""
+        with self._lock:
+            for cached in [k for k in self._entries if k == key or (not key[2] and k[:2] == key[:2])]:
+                del self._entries[cached]
+
+    def sweep(self) -> int:
+        """Evict expired entries and return how many remain."""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (_, deadline) in self._entries.items() if deadline <= now]:
+                del self._entries[key]
+            return len(self._entries)
+
+
+def cache_key(request: Dict[str, Any]) -> CacheKey:
+    """The cache key for a request from git (or a message to the daemon)."""
+    return request.get("protocol") or "", request.get("host") or "", request.get("username") or ""
+
+
+class CacheRequestHandler(socketserver.StreamRequestHandler):
+    """Answer one JSON request per connection: get, store, erase or exit."""
+
+    def handle(self) -> None:
+        """Read the request line, act on the cache, and reply with a JSON line."""
+        try:
+            message = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        cache = self.server.cache
+        action, key = message.get("action"), cache_key(message)
+        reply = {}
+        if action == "get":
+            reply["credential"] = cache.get(key)
+        elif action == "store":
+            cache.put(key, message["credential"])
+        elif action == "erase":
+            cache.erase(key)
+        elif action == "exit":
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+class CacheServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server holding a CredentialCache."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, ttl: float):
+        """Bind the socket; the cache starts empty."""
+        self.cache = CredentialCache(ttl)
+        super().__init__(str(socket_path), CacheRequestHandler)
+
+
+def serve_cache(socket_path: Path = CACHE_SOCKET, ttl: float = DEFAULT_CACHE_TTL) -> None:
+    """
+    Run the cache daemon until it is told to exit or its cache empties.
+
+    Returns at once if another daemon already holds the socket's lock file, so
+    two helpers starting one at the same time never leave a daemon running
+    without its socket.
+
+    Args:
+        socket_path: Unix socket to listen on; its directory is made private
+        ttl: Seconds a credential is kept
+    """
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    os.chmod(socket_path.parent, 0o700)
+    lock_fd = os.open(socket_path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(lock_fd)
+        return
+    try:
+        _serve_locked(socket_path, ttl)
+    finally:
+        # Released once the socket is gone, so a successor never loses its own socket
+        os.close(lock_fd)
+
+
+def _serve_locked(socket_path: Path, ttl: float) -> None:
+    """Serve the cache on socket_path; the caller holds its lock file."""
+    # Holding the lock, any socket left over is a dead daemon's
+    if socket_path.exists():
+        socket_path.unlink()
+
+    server = CacheServer(socket_path, ttl)
+    os.chmod(socket_path, 0o600)
+
+    def sweep() -> None:
+        # Credentials are stored right after the daemon starts, so an empty cache means it's idle
+        while True:
+            time.sleep(max(1.0, min(ttl, 60.0)))
+            if not server.cache.sweep():
+                server.shutdown()
+                return
+
+    threading.Thread(target=sweep, daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+
+
+def query_cache(message: Dict[str, Any], socket_path: Path = CACHE_SOCKET,
+                timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+    """Send one request to the cache daemon; returns None if it isn't running."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall((json.dumps(message) + "\n").encode())
+            with sock.makefile("r") as reader:
+                return json.loads(reader.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def start_cache(socket_path: Path = CACHE_SOCKET, ttl: float = DEFAULT_CACHE_TTL, wait: float = 2.0) -> bool:
+    """
+    Start the cache daemon in the background and wait for its socket.
+
+    Returns:
+        Whether the daemon is answering
+    """
+    script = Path(__file__).resolve().with_name("git_token_generator.py")
+    subprocess.Popen(
+        [sys.executable, str(script), "credential-cache", "--ttl", str(ttl), "--socket", str(socket_path)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if query_cache({"action": "ping"}, socket_path) is not None:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def run_helper(action: str, storage: Optional[str] = None, cache_ttl: Optional[float] = None,
+               socket_path: Path = CACHE_SOCKET, stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout,
+               key_source: Optional[str] = None) -> None:
+    """
+    Handle one git credential helper call.
+
+    Args:
+        action: get, store or erase (anything else is ignored, as git expects)
+        storage: Vault storage backend
+        cache_ttl: Use the cache daemon, keeping credentials this many seconds; None to read the vault every time
+        socket_path: Cache daemon socket
+        stdin: Stream git writes the request to
+        stdout: Stream the credential is written to
+        key_source: Key source spec (see key_provider.py)
+    """
+    request = read_request(stdin)
+    host = request.get("host")
+    if not host or action not in ("get", "store", "erase"):
+        return
+
+    key = dict(zip(("protocol", "host", "username"), cache_key(request)))
+    if action == "get":
+        if cache_ttl is not None:
+            reply = query_cache(dict(key, action="get"), socket_path)
+            if reply and reply.get("credential"):
+                write_credential(stdout, reply["credential"])
+                return
+
+        token_manager = TokenManager(storage, key_source)
+        if not token_manager.store.exists():
+            return
+        credential = lookup(token_manager, host, request.get("username"))
+        if credential is None:
+            return
+        write_credential(stdout, credential)
+
+        if cache_ttl is not None:
+            message = dict(key, action="store", credential=credential)
+            if query_cache(message, socket_path) is None and start_cache(socket_path, cache_ttl):
+                query_cache(message, socket_path)
+
+    elif action == "store":
+        store_credential(TokenManager(storage, key_source), request)
+
+    elif action == "erase":
+        erase_credential(TokenManager(storage, key_source), request)
+        if cache_ttl is not None:
+            query_cache(dict(key, action="erase"), socket_path)
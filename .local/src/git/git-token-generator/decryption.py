@@ -0,0 +1,118 @@
+"""
+Decryption - Decrypt token values one entry at a time, on a process pool for large batches.
+
+Every value is decrypted on its own: an entry that fails (wrong key, truncated
+or tampered ciphertext, missing token field) yields an error for that entry
+alone, so one bad record never costs the rest of the vault.
+
+The key file may hold several keys while the vault is being re-keyed (see
+rekey.py); build_cipher() then returns a MultiFernet that encrypts with the
+first key and decrypts with any of them.
+
+Fernet decryption is CPU-bound and holds the GIL, so batches that reach
+PARALLEL_THRESHOLD values are split into chunks and decrypted by worker
+processes, each with its own Fernet instance. Smaller batches (the common case:
+one token, or a filtered listing) never pay for starting the pool. Results are
+yielded in input order, with a bounded number of chunks in flight, so callers
+can keep streaming.
+"""
+
+import os
+import itertools
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet, MultiFernet
+
+# Values to see before switching from serial to parallel decryption
+PARALLEL_THRESHOLD = 2000
+# Values sent to a worker at a time
+CHUNK_SIZE = 500
+
+# (value, error): exactly one of them is set
+Result = Tuple[Optional[str], Optional[str]]
+
+_worker_cipher = None
+
+
+def build_cipher(keys: List[bytes]) -> Union["Fernet", "MultiFernet"]:
+    """Build the cipher for a list of keys: encrypts with the first, decrypts with any."""
+    from cryptography.fernet import Fernet, MultiFernet
+
+    ciphers = [Fernet(key) for key in keys]
+    return ciphers[0] if len(ciphers) == 1 else MultiFernet(ciphers)
+
+
+def decrypt_value(cipher: Union["Fernet", "MultiFernet"], ciphertext: Any) -> Result:
+    """Decrypt one value, returning the error instead of raising it."""
+    return _apply(cipher.decrypt, ciphertext)
+
+
+def rotate_value(cipher: "MultiFernet", ciphertext: Any) -> Result:
+    """Re-encrypt one value under the cipher's first key, returning the error instead of raising it."""
+    return _apply(cipher.rotate, ciphertext)
+
+
+def _apply(operation: Callable[[bytes], bytes], ciphertext: Any) -> Result:
+    """Run a Fernet operation on one ciphertext, mapping its failures to an error message."""
+    from cryptography.fernet import InvalidToken
+
+    if not isinstance(ciphertext, str) or not ciphertext:
+        return None, "missing ciphertext"
+    try:
+        return operation(ciphertext.encode()).decode(), None
+    except InvalidToken:
+        return None, "cannot be decrypted (wrong key, or corrupted ciphertext)"
+    except (TypeError, ValueError) as e:
+        return None, f"malformed ciphertext: {e}"
+
+
+def _init_worker(keys: List[bytes]) -> None:
+    """Create the worker process's cipher once."""
+    global _worker_cipher
+    _worker_cipher = build_cipher(keys)
+
+
+def _decrypt_chunk(ciphertexts: List[Any]) -> List[Result]:
+    """Decrypt a chunk in a worker process."""
+    return [decrypt_value(_worker_cipher, ciphertext) for ciphertext in ciphertexts]
+
+
+def decrypt_stream(keys: List[bytes], items: Iterable[Tuple[Any, Any]],
+                   workers: Optional[int] = None) -> Iterator[Tuple[Any, Optional[str], Optional[str]]]:
+    """
+    Decrypt a stream of values, in order.
+
+    Args:
+        keys: Fernet keys, any of which may have encrypted a value
+        items: (item, ciphertext) pairs; item is passed through untouched
+        workers: Worker processes for large batches (default: CPU count; 1 never starts a pool)
+
+    Yields:
+        (item, value, error) for every input pair, with error set and value None if it failed
+    """
+    items = iter(items)
+    workers = workers or os.cpu_count() or 1
+    head = list(itertools.islice(items, PARALLEL_THRESHOLD))
+    if workers <= 1 or len(head) < PARALLEL_THRESHOLD:
+        cipher = build_cipher(keys)
+        for item, ciphertext in itertools.chain(head, items):
+            yield (item, *decrypt_value(cipher, ciphertext))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = iter(lambda: list(itertools.islice(items, CHUNK_SIZE)), [])
+    chunks = itertools.chain((head[i:i + CHUNK_SIZE] for i in range(0, len(head), CHUNK_SIZE)), chunks)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(keys,)) as pool:
+        def submit(chunk):
+            return chunk, pool.submit(_decrypt_chunk, [ciphertext for _, ciphertext in chunk])
+
+        # A couple of chunks per worker keeps every process busy without reading the whole input
+        pending = deque(submit(chunk) for chunk in itertools.islice(chunks, workers * 2))
+        while pending:
+            chunk, future = pending.popleft()
+            pending.extend(submit(more) for more in itertools.islice(chunks, 1))
+            for (item, _), (value, error) in zip(chunk, future.result()):
+                yield item, value, error
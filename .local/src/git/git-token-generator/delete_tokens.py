@@ -1,97 +1,59 @@
 #!/usr/bin/env python3
 """
 Delete Git Tokens - A tool to delete stored tokens from the git-token-generator.
+
+Tokens are selected by platform, name glob, scope and date range (see
+query.py) from metadata alone. With --revoke, they are first revoked at their
+providers, concurrently, and only the ones whose revocation succeeded are
+removed from the vault. --timings, --profile and --metrics report where the
+time went (see tracing.py).
 """
 
+import tracing  # First, so the import phase covers every import below
+
 import sys
-import json
 import argparse
-from pathlib import Path
 
 from rich.console import Console
 from rich.prompt import Confirm
-from cryptography.fernet import Fernet
-
-# Token storage configuration
-CONFIG_DIR = Path.home() / ".config" / "git-token-generator"
-TOKENS_FILE = CONFIG_DIR / "tokens.json"
-KEY_FILE = CONFIG_DIR / "key.key"
-
-console = Console()
 
+from cli_common import add_auth_arguments, add_http_arguments, auth_credentials, configure_logging, create_client
+from executor import BoundedExecutor, DEFAULT_CONCURRENCY, DEFAULT_KEY_LIMIT, parse_limits
+from fanout import DEFAULT_HOST_LIMIT, HostClients, host_generators
+from http_client import HttpClient
+from providers import add_platform_argument, create_generator
+from query import add_query_arguments, query_from_args
+from token_store import STORAGE_BACKENDS, TokenManager
 
-def load_key():
-    """Load the encryption key."""
-    if not KEY_FILE.exists():
-        console.print("No encryption key found. No tokens have been generated yet.", style="yellow")
-        sys.exit(1)
-    
-    with open(KEY_FILE, "rb") as key_file:
-        return key_file.read()
-
+tracing.imported()
 
-def load_tokens():
-    """Load tokens from storage."""
-    if not TOKENS_FILE.exists():
-        console.print("No tokens file found. No tokens have been generated yet.", style="yellow")
-        return {}
-    
-    try:
-        with open(TOKENS_FILE, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        console.print(f"Error loading tokens: {e}", style="red")
-        return {}
+console = Console()
 
 
-def save_tokens(tokens):
-    """Save tokens to storage."""
+def load_manager(storage=None, key_source=None):
+    """Open the token manager, or return None if no tokens have been stored yet."""
     try:
-        with open(TOKENS_FILE, "w") as f:
-            json.dump(tokens, f, indent=2)
-        return True
-    except Exception as e:
-        console.print(f"Error saving tokens: {e}", style="red")
-        return False
+        token_manager = TokenManager(storage, key_source)
+    except ValueError as e:
+        console.print(str(e), style="red")
+        return None
+    if not token_manager.store.exists():
+        console.print("No tokens file found. No tokens have been generated yet.", style="yellow")
+        return None
+    return token_manager
 
 
-def decrypt_tokens(encrypted_tokens):
-    """Decrypt tokens for display."""
-    key = load_key()
-    cipher = Fernet(key)
-    
+def select_tokens(token_manager, selection=None, with_values=False):
+    """Collect the tokens matching a TokenQuery, grouped by platform."""
     tokens = {}
-    for platform, entries in encrypted_tokens.items():
-        tokens[platform] = []
-        for entry in entries:
-            try:
-                decrypted_token = cipher.decrypt(entry["token"].encode()).decode()
-                entry_copy = entry.copy()
-                entry_copy["token"] = decrypted_token
-                tokens[platform].append(entry_copy)
-            except Exception as e:
-                console.print(f"Error decrypting token {entry.get('name', 'unknown')}: {e}", style="red")
-    
+    for plat, token in token_manager.iter_tokens(selection, with_values):
+        tokens.setdefault(plat, []).append(token)
     return tokens
 
 
-def display_token_summary(tokens, platform=None, name=None):
+def display_token_summary(tokens):
     """Display a summary of tokens that will be deleted."""
-    filtered_tokens = {}
-    
-    # Apply filters
-    for plat, platform_tokens in tokens.items():
-        if platform and platform != plat:
-            continue
-            
-        filtered_plat_tokens = []
-        for token in platform_tokens:
-            if name and token.get("name") != name:
-                continue
-            filtered_plat_tokens.append(token)
-            
-        if filtered_plat_tokens:
-            filtered_tokens[plat] = filtered_plat_tokens
+    filtered_tokens = {plat: platform_tokens for plat, platform_tokens in tokens.items() if platform_tokens}
     
     if not filtered_tokens:
         console.print("No tokens match the specified criteria.", style="yellow")
@@ -109,91 +71,229 @@ def display_token_summary(tokens, platform=None, name=None):
     return filtered_tokens
 
 
-def delete_tokens(all_tokens, platform=None, name=None, force=False):
-    """Delete tokens based on filters."""
-    # Get a decrypted copy for display
-    decrypted_tokens = decrypt_tokens(all_tokens)
+def revoke_tokens(tokens, credentials, executor=None, client=None, clients=None):
+    """
+    Revoke tokens at their providers concurrently.
+
+    One generator is created per (platform, base_url) and, where revoking needs
+    them, its credentials are asked for up front rather than from a worker thread.
+    A token fanned out to a host is revoked on that host's own client, with the
+    credential its "secret_env" names (see fanout.host_generators), and capped
+    by its host in the executor.
+
+    Args:
+        tokens: Tokens with their values, as returned by select_tokens(with_values=True)
+        credentials: Authentication options passed to create_generator
+        executor: Concurrency limits to run the provider calls under
+            (defaults to BoundedExecutor())
+        client: Pooled HTTP client shared by every generator
+            (defaults to one sized to the executor)
+        clients: Per-host clients for fanned-out tokens
+            (defaults to one client per host of DEFAULT_HOST_LIMIT connections)
+
+    Returns:
+        One result per token with its "platform", vault "entry" and "elapsed"
+        seconds, plus an "error" if the revocation failed
+
+    Raises:
+        ValueError: If a host's "secret_env" variable is not set
+    """
+    executor = executor or BoundedExecutor()
+    client = client or HttpClient(pool_size=executor.max_workers)
+    clients = clients or HostClients(lambda: HttpClient(pool_size=DEFAULT_HOST_LIMIT))
+
+    host_entries = [dict(entry, platform=platform) for platform, entries in tokens.items() for entry in entries]
+    generators = host_generators(host_entries, credentials, clients, revoking=True)
+    results = []
+    jobs = []
+    for platform, entries in tokens.items():
+        for entry in entries:
+            key = (platform, entry.get("base_url"))
+            if key not in generators:
+                generator = create_generator(platform, entry.get("base_url"), client=client, **credentials)
+                if generator.REVOKE_NEEDS_CREDENTIALS:
+                    generator._authenticate()
+                generators[key] = generator
+            generator = generators[key]
+            results.append({"platform": platform, "entry": entry})
+            jobs.append((entry.get("host") or platform,
+                         lambda generator=generator, entry=entry: generator.revoke_token(entry["token"], entry)))
+
+    for result, (_, error, elapsed) in zip(results, executor.run(jobs)):
+        result["elapsed"] = elapsed
+        if error is not None:
+            result["error"] = str(error)
+    return results
+
+
+def display_revoke_results(results):
+    """Display the outcome of a revocation run."""
+    from rich.table import Table
+
+    table = Table(title="Revocation Results")
+    table.add_column("Platform")
+    table.add_column("Name")
+    table.add_column("Status")
+    table.add_column("Time", justify="right")
+
+    for result in results:
+        status = f"[red]failed: {result['error']}[/red]" if "error" in result else "[green]revoked[/green]"
+        table.add_row(result["platform"], result["entry"]["name"], status, f"{result['elapsed']:.2f}s")
+
+    console.print(table)
+
+
+def revoke_and_delete(token_manager, selection=None, credentials=None, executor=None, client=None, clients=None):
+    """Revoke tokens matching a TokenQuery upstream, then delete the revoked ones from the vault in one write."""
+    try:
+        tokens = select_tokens(token_manager, selection, with_values=True)
+    except Exception as e:
+        console.print(f"Error loading tokens: {e}", style="red")
+        return False
+
+    if token_manager.undecryptable:
+        console.print(f"{len(token_manager.undecryptable)} tokens could not be decrypted, so they are neither "
+                      "revoked nor deleted.", style="yellow")
+
+    try:
+        results = revoke_tokens(tokens, credentials or {}, executor, client, clients)
+    except ValueError as e:
+        console.print(str(e), style="red")
+        return False
+    display_revoke_results(results)
+
+    revoked = {}
+    for result in results:
+        if "error" not in result:
+            entry = {key: value for key, value in result["entry"].items() if key != "token"}
+            revoked.setdefault(result["platform"], []).append(entry)
+
+    try:
+        deleted = token_manager.remove_tokens(revoked) if revoked else 0
+    except Exception as e:
+        console.print(f"Error saving tokens: {e}", style="red")
+        return False
+
+    failed = sum(1 for result in results if "error" in result)
+    console.print(f"Revoked and deleted {deleted} of {len(results)} tokens.", style="red" if failed else "green")
+    if failed:
+        console.print(f"{failed} tokens could not be revoked and were kept in the vault.", style="yellow")
+    return not failed
+
+
+def delete_tokens(token_manager, selection, force=False, revoke=False, credentials=None,
+                  executor=None, client=None, clients=None):
+    """Delete tokens matching a TokenQuery, revoking them at their providers first if asked."""
+    # Only metadata is needed for the summary, so nothing is decrypted
+    try:
+        matching_tokens = select_tokens(token_manager, selection)
+    except Exception as e:
+        console.print(f"Error loading tokens: {e}", style="red")
+        return False
     
     # Display summary and confirm
-    filtered_tokens = display_token_summary(decrypted_tokens, platform, name)
+    filtered_tokens = display_token_summary(matching_tokens)
     if not filtered_tokens:
         return False
     
-    if not force and not Confirm.ask("\nAre you sure you want to delete these tokens?"):
+    question = "revoke and delete" if revoke else "delete"
+    if not force and not Confirm.ask(f"\nAre you sure you want to {question} these tokens?"):
         console.print("Operation cancelled.", style="yellow")
         return False
     
-    # Perform deletion
-    modified = False
-    for plat in list(all_tokens.keys()):
-        if platform and platform != plat:
-            continue
-            
-        if name:
-            # Delete specific tokens by name
-            all_tokens[plat] = [t for t in all_tokens[plat] if t.get("name") != name]
-            modified = True
-        else:
-            # Delete all tokens for this platform
-            del all_tokens[plat]
-            modified = True
+    if revoke:
+        return revoke_and_delete(token_manager, selection, credentials, executor, client, clients)
     
-    # Remove empty platform entries
-    for plat in list(all_tokens.keys()):
-        if not all_tokens[plat]:
-            del all_tokens[plat]
+    # Perform deletion as a single targeted delete in the storage backend
+    try:
+        deleted = token_manager.delete_matching(selection)
+    except Exception as e:
+        console.print(f"Error saving tokens: {e}", style="red")
+        return False
     
-    if modified:
-        if save_tokens(all_tokens):
-            console.print("Tokens deleted successfully.", style="green")
-            return True
-    else:
-        console.print("No changes made.", style="yellow")
+    if deleted:
+        console.print("Tokens deleted successfully.", style="green")
+        return True
     
+    console.print("No changes made.", style="yellow")
     return False
 
 
 def main():
     """Main entry point for the script."""
     parser = argparse.ArgumentParser(description="Delete stored Git tokens")
-    parser.add_argument("--platform", choices=["github", "gitlab", "bitbucket"], 
-                      help="Platform to delete tokens for")
-    parser.add_argument("--name", help="Delete tokens with this name")
+    add_platform_argument(parser, "--platform", help="Platform to delete tokens for")
+    parser.add_argument("--name", help="Delete tokens with this name (a glob with --glob)")
     parser.add_argument("--all", action="store_true", 
                       help="Delete all tokens (must be used with --force)")
     parser.add_argument("--force", action="store_true", 
                       help="Force deletion without confirmation")
+    parser.add_argument("--storage", choices=STORAGE_BACKENDS,
+                      help="Vault storage backend (default: $GIT_TOKEN_STORAGE or json)")
+    parser.add_argument("--key-source", metavar="SOURCE",
+                      help="Where the vault key comes from: file[:PATH], env[:VAR], keyring[:SERVICE] or "
+                           "command:CMD (default: $GIT_TOKEN_KEY_SOURCE or file)")
+    parser.add_argument("--revoke", action="store_true",
+                      help="Revoke tokens at their providers; only revoked tokens are deleted")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                      help=f"Revocations in flight across all platforms (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--platform-limit", action="append", metavar="PLATFORM=N",
+                      help=f"Cap revocations in flight for one platform (default: {DEFAULT_KEY_LIMIT} each)")
+    add_query_arguments(parser)
+    add_auth_arguments(parser)
+    add_http_arguments(parser)
+    tracing.add_tracing_arguments(parser)
     
     args = parser.parse_args()
+    tracing.start(args, "delete_tokens.py")
+    selection = query_from_args(args)
     
     # Validate arguments
-    if args.all and not (args.force and not args.name and not args.platform):
-        console.print("When using --all, you must use --force and cannot specify --name or --platform", 
+    if args.all and not (args.force and selection.is_empty()):
+        console.print("When using --all, you must use --force and cannot specify any filters", 
                     style="red")
         sys.exit(1)
     
-    if not args.platform and not args.name and not args.all:
-        console.print("You must specify at least one filter: --platform, --name, or --all", 
-                    style="yellow")
+    if selection.is_empty() and not args.all:
+        console.print("You must specify at least one filter (--platform, --name, --scope, "
+                      "--expires-before, ...) or --all", style="yellow")
         parser.print_help()
         sys.exit(1)
     
-    # Load tokens
-    all_tokens = load_tokens()
-    if not all_tokens:
+    credentials = executor = client = clients = None
+    if args.revoke:
+        try:
+            executor = BoundedExecutor(args.concurrency, parse_limits(args.platform_limit))
+        except ValueError as e:
+            console.print(f"Invalid --platform-limit: {e}", style="red")
+            sys.exit(1)
+        configure_logging()
+        credentials = auth_credentials(args)
+        client = create_client(args, pool_size=args.concurrency)
+        clients = HostClients(lambda: create_client(args, pool_size=DEFAULT_HOST_LIMIT))
+    
+    # Open the vault
+    token_manager = load_manager(args.storage, args.key_source)
+    if not token_manager:
         sys.exit(1)
     
     if args.all:
         # Delete all tokens
-        if Confirm.ask("Are you sure you want to delete ALL tokens? This cannot be undone.", 
-                      default=False):
-            save_tokens({})
-            console.print("All tokens deleted successfully.", style="green")
-        else:
+        if not Confirm.ask("Are you sure you want to delete ALL tokens? This cannot be undone.", 
+                           default=False):
             console.print("Operation cancelled.", style="yellow")
+        elif args.revoke:
+            if not revoke_and_delete(token_manager, None, credentials, executor, client, clients):
+                sys.exit(1)
+        else:
+            token_manager.store.replace_all({})
+            console.print("All tokens deleted successfully.", style="green")
     else:
         # Delete filtered tokens
-        delete_tokens(all_tokens, args.platform, args.name, args.force)
+        succeeded = delete_tokens(token_manager, selection, args.force,
+                                  args.revoke, credentials, executor, client, clients)
+        if args.revoke and not succeeded:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+"""
+Executor - Bounded-concurrency execution of blocking provider API calls.
+
+The generator classes make blocking HTTP calls, so concurrency comes from a
+thread pool. Each job carries a key (the platform) and at most limit(key) jobs
+with the same key run at once, so a large batch can't flood one provider while
+the others sit idle.
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import tracing
+
+# Total worker threads and the per-key cap used when none is configured
+DEFAULT_CONCURRENCY = 8
+DEFAULT_KEY_LIMIT = 4
+
+Job = Tuple[str, Callable[[], Any]]
+Outcome = Tuple[Any, Optional[Exception], float]
+
+
+class BoundedExecutor:
+    """Run blocking calls on a thread pool, capping how many run at once per key."""
+
+    def __init__(self, max_workers: int = DEFAULT_CONCURRENCY, limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = DEFAULT_KEY_LIMIT):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Total number of calls in flight across all keys
+            limits: Per-key caps, e.g. {"github": 2, "gitlab": 8}
+            default_limit: Cap for keys without an explicit limit
+        """
+        self.max_workers = max(1, max_workers)
+        self.limits = limits or {}
+        self.default_limit = max(1, default_limit)
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, key: str) -> threading.BoundedSemaphore:
+        """Return the semaphore guarding a key, creating it on first use."""
+        with self._lock:
+            if key not in self._semaphores:
+                limit = max(1, self.limits.get(key, self.default_limit))
+                self._semaphores[key] = threading.BoundedSemaphore(limit)
+            return self._semaphores[key]
+
+    def _run(self, key: str, func: Callable[[], Any]) -> Outcome:
+        """Run one job under its key's semaphore, capturing the result or error."""
+        with self._semaphore(key):
+            start = time.perf_counter()
+            try:
+                return func(), None, time.perf_counter() - start
+            except Exception as e:
+                return None, e, time.perf_counter() - start
+
+    @staticmethod
+    def _interleave(jobs: List[Job]) -> List[int]:
+        """
+        Order job indices round-robin across keys.
+
+        Workers block while their key is at its cap, so submitting all jobs for
+        one key first would park every worker on that key's semaphore.
+        """
+        queues = OrderedDict()
+        for index, (key, _) in enumerate(jobs):
+            queues.setdefault(key, deque()).append(index)
+
+        order = []
+        while queues:
+            for key in list(queues):
+                order.append(queues[key].popleft())
+                if not queues[key]:
+                    del queues[key]
+        return order
+
+    def run(self, jobs: List[Job]) -> List[Outcome]:
+        """
+        Run (key, func) jobs concurrently.
+
+        Returns:
+            (result, error, seconds) for each job, in the order the jobs were given
+        """
+        if not jobs:
+            return []
+
+        outcomes = [None] * len(jobs)
+        with tracing.span("provider.batch"), ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+            futures = {pool.submit(self._run, *jobs[index]): index for index in self._interleave(jobs)}
+            for future, index in futures.items():
+                outcomes[index] = future.result()
+        return outcomes
+
+
+def parse_limits(values: Optional[List[str]]) -> Dict[str, int]:
+    """Parse KEY=N strings (e.g. from a repeated CLI flag) into a limits mapping."""
+    limits = {}
+    for value in values or []:
+        key, sep, limit = value.partition("=")
+        if not sep or not limit.isdigit() or int(limit) < 1:
+            raise ValueError(f"Expected KEY=N with N >= 1, got {value!r}")
+        limits[key] = int(limit)
+    return limits
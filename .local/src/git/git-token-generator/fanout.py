@@ -0,0 +1,182 @@
+"""
+Fan-out - Generate the same tokens on many self-hosted instances at once.
+
+Each host is an instance URL (a GitLab or GitHub Enterprise server, say),
+optionally followed by the name of an environment variable holding that
+instance's own access token (GitLab) or password (GitHub Enterprise), since
+each instance has its own admin credentials:
+
+    https://gitlab.example.com      GITLAB_EXAMPLE_TOKEN
+    https://github.example.com/api/v3
+
+Every host gets its own generator, its own pooled HTTP client and its own
+concurrency cap in the BoundedExecutor (keyed by host instead of platform), so
+one slow instance holds up only its own requests. Tokens are stored with a
+"host" field (the URL's host[:port]), which --host selects on and which the
+credential helper matches against the host git asks for.
+"""
+
+import os
+import logging
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from executor import DEFAULT_KEY_LIMIT
+from http_client import HttpClient
+from providers import create_generator, load_provider
+
+logger = logging.getLogger("git_token_generator")
+
+# Requests in flight per host unless --host-limit says otherwise
+DEFAULT_HOST_LIMIT = DEFAULT_KEY_LIMIT
+
+Host = Tuple[str, Optional[str]]
+
+
+def host_of(base_url: str) -> str:
+    """The host[:port] of an instance URL, as git names it."""
+    host = urlparse(base_url).netloc.lower()
+    if not host:
+        raise ValueError(f"Not an instance URL: {base_url!r} (expected e.g. https://gitlab.example.com)")
+    return host
+
+
+def parse_host(value: str) -> Host:
+    """Parse "URL [ENV_VAR]" into the URL and the variable holding its credential (None if not given)."""
+    fields = value.split()
+    if not fields or len(fields) > 2:
+        raise ValueError(f"Expected 'URL [ENV_VAR]', got {value!r}")
+    host_of(fields[0])
+    return fields[0].rstrip("/"), fields[1] if len(fields) > 1 else None
+
+
+def read_hosts(path: Path) -> List[Host]:
+    """Read hosts from a file, one "URL [ENV_VAR]" per line; blank lines and # comments are skipped."""
+    hosts = []
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            try:
+                hosts.append(parse_host(line))
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}")
+    return hosts
+
+
+def fanout_entries(entries: List[Dict[str, Any]], hosts: List[Host]) -> List[Dict[str, Any]]:
+    """
+    Repeat every entry once per host.
+
+    Args:
+        entries: generate_batch entries (their base_url is replaced)
+        hosts: (URL, ENV_VAR) pairs as returned by parse_host
+
+    Returns:
+        One entry per entry and host, with "base_url", "host" and "secret_env"
+        (the variable holding the host's credential, or None) set
+    """
+    if len({host_of(url) for url, _ in hosts}) != len(hosts):
+        raise ValueError("Each host can only be listed once")
+    return [
+        dict(entry, base_url=url, host=host_of(url), secret_env=secret_env)
+        for entry in entries
+        for url, secret_env in hosts
+    ]
+
+
+def secret_option(platform: str) -> str:
+    """The authentication option a per-host credential stands for: the access token, else the password."""
+    return "access_token" if "access_token" in load_provider(platform).CREDENTIALS else "password"
+
+
+class HostClients:
+    """One pooled HTTP client per host, created on first use."""
+
+    def __init__(self, factory: Callable[[], HttpClient]):
+        """
+        Initialize the pool set.
+
+        Args:
+            factory: Creates a client; called once per host
+        """
+        self.factory = factory
+        self.clients: Dict[str, HttpClient] = {}
+
+    def get(self, host: str) -> HttpClient:
+        """Return the host's client."""
+        if host not in self.clients:
+            self.clients[host] = self.factory()
+        return self.clients[host]
+
+    def close(self) -> None:
+        """Close every client's connections."""
+        for client in self.clients.values():
+            client.close()
+
+
+def host_generators(entries: List[Dict[str, Any]], credentials: Dict[str, Optional[str]], clients: HostClients,
+                    generators: Optional[Dict[Tuple[str, Optional[str]], Any]] = None,
+                    revoking: bool = False) -> Dict[Tuple[str, Optional[str]], Any]:
+    """
+    Create and authenticate one generator per host entry, each on its host's own client.
+
+    Credentials are asked for here, one host at a time on the calling thread,
+    so prompts never interleave with the concurrent provider calls.
+
+    Args:
+        entries: Entries as returned by fanout_entries, or vault entries with their
+            "platform" (ones without a "host" are skipped)
+        credentials: Shared authentication options; a host's "secret_env"
+            variable overrides its access token or password
+        clients: Per-host clients
+        generators: Generators by (platform, base_url) to fill in (a new dict if None)
+        revoking: Only authenticate the generators whose revoke_token needs credentials
+
+    Returns:
+        The generators, for generate_batch or revoke_tokens to reuse
+    """
+    generators = {} if generators is None else generators
+    for entry in entries:
+        key = (entry["platform"], entry["base_url"])
+        if not entry.get("host") or key in generators:
+            continue
+        options = dict(credentials)
+        if entry.get("secret_env"):
+            secret = os.environ.get(entry["secret_env"])
+            if not secret:
+                raise ValueError(f"{entry['host']}: ${entry['secret_env']} is not set")
+            options[secret_option(entry["platform"])] = secret
+        generator = create_generator(entry["platform"], entry["base_url"], client=clients.get(entry["host"]),
+                                     **options)
+        if not revoking or generator.REVOKE_NEEDS_CREDENTIALS:
+            generator._authenticate()
+        generators[key] = generator
+    return generators
+
+
+def host_summary(results: List[Dict[str, Any]], clients: HostClients) -> List[Dict[str, Any]]:
+    """
+    Summarize a fan-out per host.
+
+    Returns:
+        One row per host in first-seen order: "host", "platform", "created",
+        "failed", "slowest" (seconds of its slowest token), and "requests" and
+        "p95_ms" over every request sent to it, retries included
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        if not result.get("host"):
+            continue
+        row = rows.setdefault(result["host"], {"host": result["host"], "platform": result["platform"],
+                                               "created": 0, "failed": 0, "slowest": 0.0})
+        row["failed" if "error" in result else "created"] += 1
+        row["slowest"] = max(row["slowest"], result["elapsed"])
+    for host, row in rows.items():
+        client = clients.clients.get(host)
+        summary = client.latency_summary() if client else {"count": 0}
+        row["requests"] = summary["count"]
+        row["p95_ms"] = summary.get("p95_ms", 0.0)
+    return list(rows.values())
@@ -1,377 +1,68 @@
 #!/usr/bin/env python3
 """
 Git Token Generator - A tool to programmatically generate tokens for various Git platforms.
+
+Heavy dependencies (requests, yaml, rich, dotenv, cryptography) are imported
+inside the commands that use them, so quick commands like list-scopes and list
+start fast enough to call from shell prompts and git hooks. --timings,
+--profile and --metrics report where a command spent its time (see tracing.py).
 """
 
-import os
+import tracing  # First, so the import phase covers every import below
+
 import sys
 import json
 import argparse
-import getpass
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 
-import requests
-import yaml
-from rich.console import Console
-from rich.table import Table
-from rich.logging import RichHandler
-from dotenv import load_dotenv
-from cryptography.fernet import Fernet
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
-logger = logging.getLogger("git_token_generator")
-console = Console()
+from http_client import HttpClient, format_latency_summary
+from cli_common import add_auth_arguments, add_http_arguments, auth_credentials, configure_logging, create_client
+from executor import BoundedExecutor, DEFAULT_CONCURRENCY, DEFAULT_KEY_LIMIT, parse_limits
+from output import add_output_arguments, iter_arguments, stream_tokens
+from query import TokenQuery, add_query_arguments, query_from_args
+from token_store import CONFIG_DIR, QUARANTINE_FILE, STORAGE_BACKENDS, TokenManager, open_store, migrate
+from rotation import DEFAULT_MAX_SLEEP, DEFAULT_WINDOW_DAYS, due_tokens, rotation_entries, run_schedule
+from scope_catalog import ScopeCatalog
+from verify import DEFAULT_VERIFY_CONCURRENCY, VERIFY_STATUSES, record_results, verify_tokens
+from providers import add_platform_argument, create_generator, get_provider, load_provider
+from fanout import (DEFAULT_HOST_LIMIT, HostClients, fanout_entries, host_generators, host_summary, parse_host,
+                    read_hosts)
+
+tracing.imported()
 
-# Token storage configuration
-CONFIG_DIR = Path.home() / ".config" / "git-token-generator"
-TOKENS_FILE = CONFIG_DIR / "tokens.json"
-KEY_FILE = CONFIG_DIR / "key.key"
+logger = logging.getLogger("git_token_generator")
+_console = None
 
 # Ensure configuration directory exists
 CONFIG_DIR.mkdir(parents=True, exist_ok=True)
 
 
-class TokenManager:
-    """Manages secure storage and retrieval of tokens."""
-    
-    def __init__(self):
-        """Initialize the token manager."""
-        self._ensure_key_exists()
-        self._load_tokens()
-    
-    def _ensure_key_exists(self) -> None:
-        """Ensure encryption key exists, create if it doesn't."""
-        if not KEY_FILE.exists():
-            key = Fernet.generate_key()
-            with open(KEY_FILE, "wb") as key_file:
-                key_file.write(key)
-            # Set restrictive permissions
-            os.chmod(KEY_FILE, 0o600)
-    
-    def _get_key(self) -> bytes:
-        """Get the encryption key."""
-        with open(KEY_FILE, "rb") as key_file:
-            return key_file.read()
-    
-    def _get_cipher(self) -> Fernet:
-        """Get the cipher for encryption/decryption."""
-        return Fernet(self._get_key())
-    
-    def _load_tokens(self) -> None:
-        """Load tokens from storage."""
-        self.tokens = {}
-        if TOKENS_FILE.exists():
-            try:
-                with open(TOKENS_FILE, "r") as f:
-                    encrypted_data = json.load(f)
-                    
-                cipher = self._get_cipher()
-                for platform, entries in encrypted_data.items():
-                    self.tokens[platform] = []
-                    for entry in entries:
-                        decrypted_token = cipher.decrypt(entry["token"].encode()).decode()
-                        entry["token"] = decrypted_token
-                        self.tokens[platform].append(entry)
-            except Exception as e:
-                logger.error(f"Error loading tokens: {e}")
-                self.tokens = {}
-    
-    def save_token(self, platform: str, token: str, name: str, scopes: List[str], 
-                  expires_at: Optional[str] = None) -> None:
-        """Save a token securely."""
-        if platform not in self.tokens:
-            self.tokens[platform] = []
-        
-        # Encrypt the token
-        cipher = self._get_cipher()
-        encrypted_token = cipher.encrypt(token.encode()).decode()
-        
-        token_data = {
-            "name": name,
-            "token": token,  # Store unencrypted in memory
-            "encrypted_token": encrypted_token,
-            "scopes": scopes,
-            "created_at": datetime.now().isoformat(),
-            "expires_at": expires_at
-        }
-        
-        self.tokens[platform].append(token_data)
-        self._save_tokens()
-        
-    def _save_tokens(self) -> None:
-        """Save tokens to disk."""
-        # Convert to format for saving (with encrypted tokens)
-        save_data = {}
-        for platform, entries in self.tokens.items():
-            save_data[platform] = []
-            for entry in entries:
-                save_entry = entry.copy()
-                save_entry["token"] = entry["encrypted_token"]
-                del save_entry["encrypted_token"]
-                save_data[platform].append(save_entry)
-        
-        with open(TOKENS_FILE, "w") as f:
-            json.dump(save_data, f, indent=2)
-        
-        # Set restrictive permissions
-        os.chmod(TOKENS_FILE, 0o600)
-    
-    def list_tokens(self, platform: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
-        """List all tokens or tokens for a specific platform."""
-        if platform:
-            return {platform: self.tokens.get(platform, [])}
-        return self.tokens
-    
-    def get_token(self, platform: str, name: str) -> Optional[str]:
-        """Get a specific token by platform and name."""
-        if platform not in self.tokens:
-            return None
-        
-        for entry in self.tokens[platform]:
-            if entry["name"] == name:
-                return entry["token"]
-        return None
-
-
-class GitHubTokenGenerator:
-    """Generate GitHub personal access tokens."""
-    
-    BASE_URL = "https://api.github.com"
-    
-    def __init__(self, username: Optional[str] = None, password: Optional[str] = None):
-        """Initialize with GitHub credentials."""
-        self.username = username
-        self.password = password
-    
-    def _authenticate(self) -> None:
-        """Authenticate with GitHub."""
-        if not self.username:
-            self.username = input("GitHub Username: ")
-        
-        if not self.password:
-            self.password = getpass.getpass("GitHub Password: ")
-    
-    def generate_token(self, name: str, scopes: List[str], expiration: int = 30) -> str:
-        """
-        Generate a new GitHub personal access token.
-        
-        Args:
-            name: Name of the token
-            scopes: List of permission scopes
-            expiration: Days until expiration (0 for no expiration)
-            
-        Returns:
-            The generated token
-        """
-        self._authenticate()
-        
-        expiration_date = None
-        if expiration > 0:
-            expiration_date = (datetime.now() + timedelta(days=expiration)).strftime("%Y-%m-%d")
-        
-        # Create the authorization
-        headers = {"Accept": "application/vnd.github+json"}
-        auth = (self.username, self.password)
-        data = {
-            "note": name,
-            "scopes": scopes
-        }
-        
-        if expiration_date:
-            data["expires_at"] = expiration_date
-        
-        # Note: This method requires basic authentication, which GitHub is gradually phasing out
-        # For production use, consider GitHub's web application flow for OAuth Apps
-        response = requests.post(
-            f"{self.BASE_URL}/authorizations",
-            headers=headers,
-            auth=auth,
-            json=data
-        )
-        
-        if response.status_code == 201:
-            result = response.json()
-            logger.info(f"Successfully created GitHub token: {name}")
-            return result["token"]
-        else:
-            logger.error(f"Failed to create GitHub token: {response.text}")
-            raise Exception(f"GitHub token creation failed: {response.status_code} - {response.text}")
-            
-    def list_scopes(self) -> List[str]:
-        """List available GitHub token scopes."""
-        return [
-            "repo", "repo:status", "repo_deployment", "public_repo", "repo:invite", 
-            "security_events", "admin:repo_hook", "write:repo_hook", "read:repo_hook",
-            "admin:org", "write:org", "read:org", "admin:public_key", "write:public_key",
-            "read:public_key", "admin:org_hook", "gist", "notifications", "user", 
-            "read:user", "user:email", "user:follow", "delete_repo", "write:discussion",
-            "read:discussion", "admin:gpg_key", "write:gpg_key", "read:gpg_key",
-            "workflow", "packages", "admin:packages", "write:packages", "read:packages"
-        ]
-
-
-class GitLabTokenGenerator:
-    """Generate GitLab personal access tokens."""
-    
-    def __init__(self, base_url: str = "https://gitlab.com", access_token: Optional[str] = None):
-        """Initialize with GitLab instance URL and optional token for auth."""
-        self.base_url = base_url
-        self.access_token = access_token
-    
-    def _authenticate(self) -> None:
-        """Authenticate with GitLab."""
-        if not self.access_token:
-            self.access_token = getpass.getpass("GitLab Access Token for authentication: ")
-    
-    def generate_token(self, name: str, scopes: List[str], expiration: int = 30) -> str:
-        """
-        Generate a new GitLab personal access token.
-        
-        Args:
-            name: Name of the token
-            scopes: List of permission scopes
-            expiration: Days until expiration (0 for no expiration)
-            
-        Returns:
-            The generated token
-        """
-        self._authenticate()
-        
-        expiration_date = None
-        if expiration > 0:
-            expiration_date = (datetime.now() + timedelta(days=expiration)).strftime("%Y-%m-%d")
-        
-        headers = {"PRIVATE-TOKEN": self.access_token}
-        data = {
-            "name": name,
-            "scopes": scopes
-        }
-        
-        if expiration_date:
-            data["expires_at"] = expiration_date
-        
-        response = requests.post(
-            f"{self.base_url}/api/v4/personal_access_tokens",
-            headers=headers,
-            json=data
-        )
-        
-        if response.status_code == 201:
-            result = response.json()
-            logger.info(f"Successfully created GitLab token: {name}")
-            return result["token"]
-        else:
-            logger.error(f"Failed to create GitLab token: {response.text}")
-            raise Exception(f"GitLab token creation failed: {response.status_code} - {response.text}")
-    
-    def list_scopes(self) -> List[str]:
-        """List available GitLab token scopes."""
-        return [
-            "api", "read_user", "read_api", "read_repository", "write_repository",
-            "read_registry", "write_registry", "sudo"
-        ]
-
-
-class BitbucketTokenGenerator:
-    """Generate Bitbucket access tokens."""
-    
-    BASE_URL = "https://bitbucket.org/site/oauth2/access_token"
-    
-    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
-                client_id: Optional[str] = None, client_secret: Optional[str] = None):
-        """Initialize with Bitbucket credentials or OAuth app credentials."""
-        self.username = username
-        self.password = password
-        self.client_id = client_id
-        self.client_secret = client_secret
-    
-    def _authenticate(self) -> None:
-        """Authenticate with Bitbucket."""
-        # If using client credentials (OAuth app)
-        if not self.client_id:
-            self.client_id = input("Bitbucket OAuth Client ID: ")
-        
-        if not self.client_secret:
-            self.client_secret = getpass.getpass("Bitbucket OAuth Client Secret: ")
-        
-        # If using username/password
-        if not self.client_id and not self.client_secret:
-            if not self.username:
-                self.username = input("Bitbucket Username: ")
-            
-            if not self.password:
-                self.password = getpass.getpass("Bitbucket Password: ")
-    
-    def generate_token(self, name: str, scopes: List[str], expiration: int = 30) -> str:
-        """
-        Generate a new Bitbucket access token using OAuth.
-        
-        Args:
-            name: Name of the token (for reference only)
-            scopes: List of permission scopes
-            expiration: Days until expiration (not directly supported by Bitbucket)
-            
-        Returns:
-            The generated token
-        """
-        self._authenticate()
-        
-        # Bitbucket uses OAuth2 for token generation
-        auth = None
-        data = {"grant_type": "client_credentials"}
-        
-        if self.client_id and self.client_secret:
-            auth = (self.client_id, self.client_secret)
-        else:
-            auth = (self.username, self.password)
-            data["grant_type"] = "password"
-        
-        if scopes:
-            data["scope"] = " ".join(scopes)
-        
-        response = requests.post(
-            self.BASE_URL,
-            auth=auth,
-            data=data
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            logger.info(f"Successfully created Bitbucket token: {name}")
-            # We store the access token, not the refresh token
-            return result["access_token"]
-        else:
-            logger.error(f"Failed to create Bitbucket token: {response.text}")
-            raise Exception(f"Bitbucket token creation failed: {response.status_code} - {response.text}")
-    
-    def list_scopes(self) -> List[str]:
-        """List available Bitbucket token scopes."""
-        return [
-            "account", "account:write", "team", "team:write", "repository", 
-            "repository:write", "repository:admin", "pullrequest", "pullrequest:write",
-            "snippet", "snippet:write", "issue", "issue:write", "wiki", "wiki:write", 
-            "webhook", "webhook:write", "project", "project:write"
-        ]
+def get_console():
+    """Return the shared rich console, importing rich on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
 
 
 def display_tokens(tokens: Dict[str, List[Dict[str, Any]]]) -> None:
     """Display tokens in a formatted table."""
+    from rich.table import Table
+
     for platform, platform_tokens in tokens.items():
         if not platform_tokens:
-            console.print(f"No tokens found for {platform}")
+            get_console().print(f"No tokens found for {platform}")
             continue
             
+        with_hosts = any(token.get("host") for token in platform_tokens)
         table = Table(title=f"{platform} Tokens")
         table.add_column("Name")
+        if with_hosts:
+            table.add_column("Host")
         table.add_column("Scopes")
         table.add_column("Created")
         table.add_column("Expires")
@@ -380,131 +71,814 @@ def display_tokens(tokens: Dict[str, List[Dict[str, Any]]]) -> None:
             scopes = ", ".join(token.get("scopes", []))
             created = token.get("created_at", "Unknown")
             expires = token.get("expires_at", "Never")
+            host = [token.get("host") or ""] if with_hosts else []
             
-            table.add_row(token["name"], scopes, created, expires)
+            table.add_row(token["name"], *host, scopes, created, expires)
         
-        console.print(table)
+        get_console().print(table)
+
+
+def expiry_timestamp(expiration: int) -> Optional[str]:
+    """Return the expiry timestamp stored with a token, or None if it never expires."""
+    if not expiration:
+        return None
+    return (datetime.now() + timedelta(days=expiration)).isoformat()
+
+
+def token_metadata(token_id: Optional[Any] = None, base_url: Optional[str] = None,
+                   host: Optional[str] = None, secret_env: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extra vault fields needed to rotate or revoke a token later.
+
+    These are its provider ID and API URL, if known, and for a fanned-out token
+    its host and the variable holding that host's credential.
+    """
+    metadata = {}
+    if token_id is not None:
+        metadata["token_id"] = token_id
+    if base_url:
+        metadata["base_url"] = base_url
+    if host:
+        metadata["host"] = host
+    if secret_env:
+        metadata["secret_env"] = secret_env
+    return metadata
+
+
+def load_manifest(path: Path) -> List[Dict[str, Any]]:
+    """
+    Load and validate a batch manifest.
+
+    The manifest is YAML or JSON, either a list of entries or a mapping with a
+    "tokens" list and an optional "defaults" mapping merged into every entry:
+
+        defaults:
+          expiration: 30
+        tokens:
+          - platform: github
+            name: ci-deploy
+            scopes: [repo]
+          - platform: gitlab
+            name: ci-deploy
+            base_url: https://gitlab.example.com
+          - platform: gitlab
+            name: svc-mirror
+            hosts:
+              - https://gitlab-eu.example.com GITLAB_EU_TOKEN
+              - https://gitlab-us.example.com GITLAB_US_TOKEN
+
+    An entry with "hosts" is generated on every one of them (see fanout.py).
+
+    Args:
+        path: Manifest file (.json is parsed as JSON, anything else as YAML)
+
+    Returns:
+        The entries, each with platform, name, scopes, expiration and base_url,
+        plus host and secret_env for the ones fanned out to several hosts
+    """
+    with open(path, "r") as f:
+        if path.suffix == ".json":
+            data = json.load(f)
+        else:
+            import yaml
+            data = yaml.safe_load(f)
+
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults") or {}
+        data = data.get("tokens")
+    if not isinstance(data, list):
+        raise ValueError("Manifest must be a list of tokens or a mapping with a 'tokens' list")
+
+    entries = []
+    seen = set()
+    for position, item in enumerate(data, 1):
+        entry = {**defaults, **(item or {})}
+        hosts = entry.get("hosts")
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        platform = entry.get("platform")
+        try:
+            get_provider(str(platform))
+        except ValueError:
+            raise ValueError(f"Manifest entry {position}: unsupported platform {platform!r}")
+        if not entry.get("name"):
+            raise ValueError(f"Manifest entry {position}: missing name")
+
+        if hosts and entry.get("base_url"):
+            raise ValueError(f"Manifest entry {position}: give either base_url or hosts, not both")
+
+        scopes = entry.get("scopes") or load_provider(platform).DEFAULT_SCOPES
+        expanded = [{
+            "platform": platform,
+            "name": str(entry["name"]),
+            "scopes": [scopes] if isinstance(scopes, str) else list(scopes),
+            "expiration": int(entry.get("expiration", 30)),
+            "base_url": entry.get("base_url"),
+        }]
+        if hosts:
+            try:
+                expanded = fanout_entries(expanded, [parse_host(host) for host in hosts])
+            except ValueError as e:
+                raise ValueError(f"Manifest entry {position}: {e}")
+
+        for item in expanded:
+            key = (platform, item["base_url"], item["name"])
+            if key in seen:
+                where = f" on {item['host']}" if item.get("host") else ""
+                raise ValueError(f"Manifest entry {position}: duplicate {platform} token {item['name']!r}{where}")
+            seen.add(key)
+        entries.extend(expanded)
+    return entries
+
+
+def generate_batch(entries: List[Dict[str, Any]], token_manager: TokenManager,
+                   credentials: Dict[str, Optional[str]],
+                   executor: Optional[BoundedExecutor] = None,
+                   client: Optional[HttpClient] = None,
+                   generators: Optional[Dict[Tuple[str, Optional[str]], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Generate every token in a manifest and store the successful ones in one write.
+
+    One generator is created and authenticated per (platform, base_url) up front,
+    so credentials are prompted for at most once per instance and never from a
+    worker thread. The provider calls then run concurrently on the executor, so
+    the batch takes about as long as its slowest request per concurrency slot
+    rather than the sum of all of them. A failed entry is reported and does not
+    stop the rest of the batch.
+
+    An entry may carry a "replaces" vault entry (as from rotation.rotation_entries),
+    which is removed in the same write once its replacement is stored. An entry
+    with a "host" (as from fanout.fanout_entries) is capped by its host in the
+    executor rather than by its platform, and stored with that host.
+
+    Args:
+        entries: Entries as returned by load_manifest
+        token_manager: Vault to store the generated tokens in
+        credentials: Authentication options passed to create_generator
+        executor: Concurrency limits to run the provider calls under
+            (defaults to BoundedExecutor())
+        client: Pooled HTTP client shared by every generator in the batch
+            (defaults to one sized to the executor)
+        generators: Authenticated generators by (platform, base_url), reused and
+            filled in across calls so credentials are only asked for once
+
+    Returns:
+        One result per entry with either a "token" or an "error", plus "elapsed" seconds
+    """
+    executor = executor or BoundedExecutor()
+    client = client or HttpClient(pool_size=executor.max_workers)
+    generators = {} if generators is None else generators
+    for entry in entries:
+        key = (entry["platform"], entry["base_url"])
+        if key not in generators:
+            generator = create_generator(entry["platform"], entry["base_url"], client=client, **credentials)
+            generator._authenticate()
+            generators[key] = generator
+
+    jobs = []
+    for entry in entries:
+        generator = generators[(entry["platform"], entry["base_url"])]
+        jobs.append((
+            entry.get("host") or entry["platform"],
+            lambda generator=generator, entry=entry: generator.create_token(
+                entry["name"], entry["scopes"], entry["expiration"]
+            ),
+        ))
+
+    results = []
+    for entry, (created, error, elapsed) in zip(entries, executor.run(jobs)):
+        result = dict(entry, elapsed=elapsed)
+        if error is None:
+            result["token"] = created["token"]
+            result["token_id"] = created["id"]
+        else:
+            # The generator has already logged the provider's response
+            result["error"] = str(error)
+        results.append(result)
+
+    # Commit every generated token to the vault in a single write
+    with token_manager.transaction():
+        replaced = {}
+        for result in results:
+            if "token" in result and result.get("replaces"):
+                replaced.setdefault(result["platform"], []).append(result["replaces"])
+        if replaced:
+            token_manager.remove_tokens(replaced)
+        for result in results:
+            if "token" in result:
+                token_manager.save_token(
+                    result["platform"],
+                    result["token"],
+                    result["name"],
+                    result["scopes"],
+                    expiry_timestamp(result["expiration"]),
+                    token_metadata(result["token_id"], result["base_url"], result.get("host"),
+                                   result.get("secret_env"))
+                )
+    return results
+
+
+def display_batch_results(results: List[Dict[str, Any]]) -> None:
+    """Display the outcome of a batch run."""
+    from rich.table import Table
+
+    with_hosts = any(result.get("host") for result in results)
+    table = Table(title="Batch Results")
+    table.add_column("Platform")
+    if with_hosts:
+        table.add_column("Host")
+    table.add_column("Name")
+    table.add_column("Scopes")
+    table.add_column("Status")
+    table.add_column("Time", justify="right")
+
+    for result in results:
+        status = f"[red]failed: {result['error']}[/red]" if "error" in result else "[green]created[/green]"
+        host = [result.get("host") or ""] if with_hosts else []
+        table.add_row(result["platform"], *host, result["name"], ", ".join(result["scopes"]), status,
+                      f"{result['elapsed']:.2f}s")
+
+    get_console().print(table)
+
+
+def display_host_summary(rows: List[Dict[str, Any]]) -> None:
+    """Display the per-host outcome and timing of a fan-out."""
+    from rich.table import Table
+
+    table = Table(title="Per Host")
+    table.add_column("Host")
+    table.add_column("Platform")
+    table.add_column("Created", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Slowest", justify="right")
+    table.add_column("Requests", justify="right")
+    table.add_column("p95", justify="right")
+
+    for row in rows:
+        failed = f"[red]{row['failed']}[/red]" if row["failed"] else "0"
+        table.add_row(row["host"], row["platform"], str(row["created"]), failed, f"{row['slowest']:.2f}s",
+                      str(row["requests"]), f"{row['p95_ms']:.1f}ms")
+
+    get_console().print(table)
+
+
+def display_due_tokens(due: List[Tuple[str, Dict[str, Any]]], within_days: int) -> None:
+    """Display tokens that are due for rotation, soonest first."""
+    from rich.table import Table
+
+    if not due:
+        get_console().print(f"No tokens expire within {within_days} days.")
+        return
+
+    table = Table(title="Due for Rotation")
+    table.add_column("Platform")
+    table.add_column("Name")
+    table.add_column("Scopes")
+    table.add_column("Expires")
+
+    for platform, entry in due:
+        table.add_row(platform, entry["name"], ", ".join(entry.get("scopes", [])), entry["expires_at"])
+
+    get_console().print(table)
+
+
+def display_verify_results(results: List[Dict[str, Any]]) -> None:
+    """Display the tokens a verify sweep found not to be valid (the valid ones are only counted)."""
+    from rich.table import Table
+
+    problems = [result for result in results if result.get("status") != "valid"]
+    if not problems:
+        return
+
+    table = Table(title="Tokens Needing Attention")
+    table.add_column("Platform")
+    table.add_column("Name")
+    table.add_column("Status")
+    table.add_column("Expires")
+
+    for result in problems:
+        entry = result["entry"]
+        if "error" in result:
+            status = f"[yellow]unchecked: {result['error']}[/yellow]"
+        else:
+            status = f"[red]{result['status']}[/red]"
+        table.add_row(result["platform"], entry["name"], status, result.get("expires_at") or entry.get("expires_at")
+                      or "Never")
+
+    get_console().print(table)
+
+
+def display_quarantined(bad: Dict[str, List[Dict[str, Any]]], title: str) -> None:
+    """Display entries that could not be decrypted, with the reason."""
+    from rich.table import Table
+
+    table = Table(title=title)
+    table.add_column("Platform")
+    table.add_column("Name")
+    table.add_column("Created")
+    table.add_column("Error")
+
+    for platform, entries in bad.items():
+        for entry in entries:
+            table.add_row(platform, entry.get("name", "?"), entry.get("created_at") or "Unknown", entry["error"])
+
+    get_console().print(table)
+
+
+def add_scope_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the scope validation options shared by the generate commands."""
+    parser.add_argument("--refresh-scopes", action="store_true",
+                        help="Fetch each provider's scopes first if the cached ones are stale")
+    parser.add_argument("--allow-unknown-scopes", action="store_true",
+                        help="Send scopes the scope catalog doesn't know instead of rejecting them")
+
+
+def check_scopes(entries: List[Dict[str, Any]], args: argparse.Namespace, client: HttpClient,
+                 generators: Dict[Tuple[str, Optional[str]], Any]) -> List[str]:
+    """
+    Check the requested scopes against the scope catalog before any token is minted.
+
+    With --refresh-scopes, stale scopes are fetched first, through generators
+    created and authenticated here and left in generators for the batch to reuse;
+    a failed fetch falls back to the scopes already known.
+
+    Args:
+        entries: Entries as returned by load_manifest
+        args: Parsed generate options
+        client: Pooled HTTP client for the fetches
+        generators: Authenticated generators by (platform, base_url), filled in as needed
+
+    Returns:
+        One message per unknown scope (none with --allow-unknown-scopes)
+    """
+    if args.allow_unknown_scopes:
+        return []
+
+    catalog = ScopeCatalog()
+    if args.refresh_scopes:
+        for key in dict.fromkeys((entry["platform"], entry["base_url"]) for entry in entries):
+            if not catalog.is_stale(*key):
+                continue
+            if key not in generators:
+                generator = create_generator(key[0], key[1], client=client, **auth_credentials(args))
+                generator._authenticate()
+                generators[key] = generator
+            try:
+                catalog.refresh(*key, generators[key].fetch_scopes)
+            except Exception as e:
+                logger.warning(f"Could not refresh {key[0]} scopes, using the known ones: {e}")
+    return catalog.check_entries(entries)
+
+
+def report_unknown_scopes(problems: List[str]) -> None:
+    """Log every unknown scope and exit before anything is sent."""
+    for problem in problems:
+        logger.error(problem)
+    logger.error("Nothing was generated; fix the scopes, or pass --allow-unknown-scopes to send them anyway")
+    sys.exit(1)
+
+
+def add_concurrency_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the concurrency options shared by the batch and fan-out commands."""
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Provider requests in flight across all platforms (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--platform-limit", action="append", metavar="PLATFORM=N",
+                        help=f"Cap requests in flight for one platform (default: {DEFAULT_KEY_LIMIT} each)")
+    parser.add_argument("--host-limit", type=int, default=DEFAULT_HOST_LIMIT, metavar="N",
+                        help=f"Cap requests in flight, and pooled connections, per fan-out host "
+                             f"(default: {DEFAULT_HOST_LIMIT})")
+
+
+def run_batch(entries: List[Dict[str, Any]], args: argparse.Namespace, token_manager: TokenManager) -> None:
+    """
+    Generate a batch or fan-out from the command line options, report it, and exit non-zero if any token failed.
+
+    Entries without a host share one pooled client and are capped per platform;
+    each fan-out host gets its own client and --host-limit cap.
+    """
+    try:
+        limits = parse_limits(args.platform_limit)
+    except ValueError as e:
+        logger.error(f"Invalid --platform-limit: {e}")
+        sys.exit(1)
+    hosts = list(dict.fromkeys(entry["host"] for entry in entries if entry.get("host")))
+    limits.update({host: args.host_limit for host in hosts})
+    executor = BoundedExecutor(args.concurrency, limits)
+    
+    client = create_client(args, pool_size=args.concurrency)
+    clients = HostClients(lambda: create_client(args, pool_size=args.host_limit))
+    generators = {}
+    try:
+        host_generators(entries, auth_credentials(args), clients, generators)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    # Every scope is checked before the first request, so a typo can't leave the batch half-minted
+    problems = check_scopes(entries, args, client, generators)
+    if problems:
+        report_unknown_scopes(problems)
+    
+    results = generate_batch(entries, token_manager, auth_credentials(args), executor, client, generators)
+    client.close()
+    clients.close()
+    display_batch_results(results)
+    if hosts:
+        display_host_summary(host_summary(results, clients))
+    if any(not entry.get("host") for entry in entries):
+        get_console().print(format_latency_summary(client.latency_summary()))
+    
+    failed = sum(1 for result in results if "error" in result)
+    where = f" on {len(hosts)} hosts" if hosts else ""
+    get_console().print(f"Generated {len(results) - failed} of {len(results)} tokens{where}.",
+                        style="red" if failed else "green")
+    if failed:
+        sys.exit(1)
 
 
 def main():
     """Main entry point for the script."""
     parser = argparse.ArgumentParser(description="Generate tokens for Git platforms")
+    parser.add_argument("--storage", choices=STORAGE_BACKENDS,
+                       help="Vault storage backend (default: $GIT_TOKEN_STORAGE or json)")
+    parser.add_argument("--key-source", metavar="SOURCE",
+                       help="Where the vault key comes from: file[:PATH], env[:VAR], keyring[:SERVICE] or "
+                            "command:CMD (default: $GIT_TOKEN_KEY_SOURCE or file)")
+    tracing.add_tracing_arguments(parser)
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
     
     # Generate command
     gen_parser = subparsers.add_parser("generate", help="Generate a new token")
-    gen_parser.add_argument("platform", choices=["github", "gitlab", "bitbucket"], 
-                           help="Git platform to generate token for")
+    add_platform_argument(gen_parser, "platform", help="Git platform to generate token for")
     gen_parser.add_argument("--name", required=True, help="Name for the token")
     gen_parser.add_argument("--scopes", nargs="+", help="Scopes for the token")
     gen_parser.add_argument("--expiration", type=int, default=30, 
                            help="Days until token expires (0 for no expiration)")
-    gen_parser.add_argument("--username", help="Username for authentication")
-    gen_parser.add_argument("--password", help="Password for authentication")
-    gen_parser.add_argument("--client-id", help="OAuth client ID (Bitbucket)")
-    gen_parser.add_argument("--client-secret", help="OAuth client secret (Bitbucket)")
-    gen_parser.add_argument("--base-url", help="Base URL for GitLab instance")
-    gen_parser.add_argument("--access-token", help="Access token for authentication (GitLab)")
+    add_auth_arguments(gen_parser)
+    add_http_arguments(gen_parser)
+    add_scope_arguments(gen_parser)
+    instance_group = gen_parser.add_mutually_exclusive_group()
+    instance_group.add_argument("--base-url",
+                                help="API URL of the instance (default: the platform's own; "
+                                     "required for github-enterprise)")
+    instance_group.add_argument("--hosts", nargs="+", metavar="URL",
+                                help="Generate the token on each of these instances in parallel")
+    instance_group.add_argument("--hosts-file", type=Path,
+                                help="Read the instances from a file, one 'URL [ENV_VAR]' per line, where "
+                                     "ENV_VAR holds that host's access token or password")
+    add_concurrency_arguments(gen_parser)
+    
+    # Generate batch command
+    batch_parser = subparsers.add_parser("generate-batch", help="Generate many tokens from a manifest")
+    batch_parser.add_argument("manifest", type=Path, help="YAML or JSON manifest of tokens to generate")
+    add_concurrency_arguments(batch_parser)
+    add_auth_arguments(batch_parser)
+    add_http_arguments(batch_parser)
+    add_scope_arguments(batch_parser)
     
     # List command
     list_parser = subparsers.add_parser("list", help="List existing tokens")
-    list_parser.add_argument("--platform", choices=["github", "gitlab", "bitbucket"], 
-                            help="Filter tokens by platform")
+    add_platform_argument(list_parser, "--platform", help="Filter tokens by platform")
+    list_parser.add_argument("--name", help="Filter tokens by name (a glob with --glob)")
+    add_query_arguments(list_parser)
+    add_output_arguments(list_parser)
+    
+    # Rotate command
+    rotate_parser = subparsers.add_parser("rotate", help="Re-mint tokens that are about to expire")
+    rotate_parser.add_argument("--within", type=int, default=DEFAULT_WINDOW_DAYS, metavar="DAYS",
+                              help=f"Rotate tokens expiring within this many days (default: {DEFAULT_WINDOW_DAYS})")
+    add_platform_argument(rotate_parser, "--platform", help="Only rotate tokens for this platform")
+    rotate_parser.add_argument("--expiration", type=int, metavar="DAYS",
+                              help="Lifetime of the new tokens (default: each token's original lifetime)")
+    rotate_parser.add_argument("--dry-run", action="store_true", help="Only show which tokens are due")
+    rotate_parser.add_argument("--schedule", action="store_true",
+                              help="Keep running, rotating tokens as they come due")
+    rotate_parser.add_argument("--max-sleep", type=float, default=DEFAULT_MAX_SLEEP, metavar="SECONDS",
+                              help="With --schedule, re-check the vault at least this often "
+                                   f"(default: {DEFAULT_MAX_SLEEP // 3600} hours)")
+    rotate_parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                              help=f"Provider requests in flight across all platforms (default: {DEFAULT_CONCURRENCY})")
+    rotate_parser.add_argument("--platform-limit", action="append", metavar="PLATFORM=N",
+                              help=f"Cap requests in flight for one platform (default: {DEFAULT_KEY_LIMIT} each)")
+    add_auth_arguments(rotate_parser)
+    add_http_arguments(rotate_parser)
+    
+    # Verify command
+    verify_parser = subparsers.add_parser("verify", help="Check that stored tokens still work at their providers")
+    add_platform_argument(verify_parser, "--platform", help="Only check tokens for this platform")
+    verify_parser.add_argument("--name", help="Only check tokens with this name (a glob with --glob)")
+    add_query_arguments(verify_parser)
+    verify_parser.add_argument("--concurrency", type=int, default=DEFAULT_VERIFY_CONCURRENCY,
+                              help=f"Provider requests in flight (default: {DEFAULT_VERIFY_CONCURRENCY})")
+    verify_parser.add_argument("--platform-limit", action="append", metavar="PLATFORM=N",
+                              help="Cap requests in flight for one platform (default: no cap below --concurrency)")
+    verify_parser.add_argument("--workers", type=int,
+                              help="Processes used to decrypt large vaults (default: CPU count)")
+    add_http_arguments(verify_parser)
+    
+    # Compact command
+    subparsers.add_parser("compact", help="Fold the token journal into tokens.json")
+    
+    # Quarantine command
+    quarantine_parser = subparsers.add_parser("quarantine",
+                                              help="Move tokens that cannot be decrypted out of the vault")
+    add_platform_argument(quarantine_parser, "--platform", help="Only check tokens for this platform")
+    quarantine_parser.add_argument("--dry-run", action="store_true",
+                                   help="Only list the tokens that would be moved")
+    quarantine_parser.add_argument("--force", action="store_true",
+                                   help="Move them even if no token at all can be decrypted (usually a wrong key)")
+    quarantine_parser.add_argument("--workers", type=int,
+                                   help="Processes used to decrypt large vaults (default: CPU count)")
+    
+    # Rekey command
+    rekey_parser = subparsers.add_parser("rekey", help="Re-encrypt every token under a new key")
+    rekey_parser.add_argument("--chunk-size", type=int, metavar="N",
+                              help="Tokens re-encrypted per vault write "
+                                   "(default: 1000, or a tenth of the vault on the JSON backends)")
+    rekey_parser.add_argument("--workers", type=int,
+                              help="Processes used for the final check of large vaults (default: CPU count)")
+    
+    # Migrate command
+    migrate_parser = subparsers.add_parser("migrate", help="Copy all tokens to another storage backend")
+    migrate_parser.add_argument("--to", required=True, choices=STORAGE_BACKENDS, dest="target",
+                               help="Backend to copy tokens into (its contents are replaced)")
     
     # List scopes command
     scopes_parser = subparsers.add_parser("list-scopes", help="List available token scopes")
-    scopes_parser.add_argument("platform", choices=["github", "gitlab", "bitbucket"], 
-                              help="Platform to list scopes for")
+    add_platform_argument(scopes_parser, "platform", help="Platform to list scopes for")
+    scopes_parser.add_argument("--base-url", help="API URL of the instance (default: the platform's own)")
+    scopes_parser.add_argument("--refresh", action="store_true",
+                              help="Fetch the scopes from the provider and update the scope cache")
+    add_auth_arguments(scopes_parser)
+    
+    # Git credential helper
+    cred_parser = subparsers.add_parser("credential", help="Act as a git credential helper")
+    cred_parser.add_argument("action", help="Action requested by git: get, store or erase")
+    cred_parser.add_argument("--cache", action="store_true",
+                            help="Keep decrypted credentials in a background cache daemon")
+    cred_parser.add_argument("--cache-ttl", type=float, metavar="SECONDS",
+                            help="Seconds the cache keeps a credential (implies --cache; default: 15 minutes)")
+    
+    # Credential cache daemon
+    cache_parser = subparsers.add_parser("credential-cache", help="Run the credential cache daemon")
+    cache_parser.add_argument("--ttl", type=float, help="Seconds a credential is kept (default: 15 minutes)")
+    cache_parser.add_argument("--socket", type=Path, help="Unix socket to listen on")
+    cache_parser.add_argument("--exit", action="store_true", help="Stop a running daemon")
     
     args = parser.parse_args()
+    tracing.start(args, f"git_token_generator.py {args.command}")
+    
+    # list-scopes needs neither the environment nor the vault
+    if args.command == "list-scopes":
+        catalog = ScopeCatalog()
+        if args.refresh:
+            configure_logging(rich=False)
+            generator = create_generator(args.platform, args.base_url, **auth_credentials(args))
+            try:
+                scopes = catalog.refresh(args.platform, args.base_url, generator.fetch_scopes, force=True)
+            except Exception as e:
+                logger.error(f"Error fetching scopes: {e}")
+                sys.exit(1)
+        else:
+            try:
+                scopes = catalog.scopes(args.platform, args.base_url)
+            except ValueError as e:
+                configure_logging(rich=False)
+                logger.error(str(e))
+                sys.exit(1)
+            
+        print(f"Available scopes for {args.platform}:")
+        for scope in scopes:
+            print(f"  - {scope}")
+        return
+    
+    # git runs the credential helper on every fetch and push, so it starts as light as list-scopes
+    if args.command == "credential":
+        from credential_helper import DEFAULT_CACHE_TTL, run_helper
+        cache_ttl = args.cache_ttl or (DEFAULT_CACHE_TTL if args.cache else None)
+        run_helper(args.action, args.storage, cache_ttl, key_source=args.key_source)
+        return
+    
+    if args.command == "credential-cache":
+        from credential_helper import CACHE_SOCKET, DEFAULT_CACHE_TTL, query_cache, serve_cache
+        socket_path = args.socket or CACHE_SOCKET
+        if args.exit:
+            query_cache({"action": "exit"}, socket_path)
+        else:
+            serve_cache(socket_path, args.ttl or DEFAULT_CACHE_TTL)
+        return
+    
+    if args.command is None:
+        parser.print_help()
+        return
+    
+    # Rich logging is only worth its import for commands that talk to providers
+    with tracing.span("import"):
+        configure_logging(rich=args.command != "list")
+        from dotenv import load_dotenv
     
     # Load environment variables from .env file if it exists
     load_dotenv()
     
-    # Initialize token manager
-    token_manager = TokenManager()
+    # Initialize token manager (opening the store reads nothing until a command asks)
+    try:
+        token_manager = TokenManager(args.storage, args.key_source)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
     
-    if args.command == "generate":
+    if args.command == "generate" and (args.hosts or args.hosts_file):
         try:
-            if args.platform == "github":
-                generator = GitHubTokenGenerator(args.username, args.password)
-                
-                # If no scopes provided, use some sensible defaults
-                scopes = args.scopes or ["repo", "read:user", "user:email"]
-                
-                token = generator.generate_token(args.name, scopes, args.expiration)
-                token_manager.save_token(
-                    "github", 
-                    token, 
-                    args.name, 
-                    scopes,
-                    (datetime.now() + timedelta(days=args.expiration)).isoformat() if args.expiration else None
-                )
-                console.print(f"Generated GitHub token: {token}", style="green")
-                
-            elif args.platform == "gitlab":
-                base_url = args.base_url or "https://gitlab.com"
-                generator = GitLabTokenGenerator(base_url, args.access_token)
-                
-                # If no scopes provided, use some sensible defaults
-                scopes = args.scopes or ["api", "read_repository"]
-                
-                token = generator.generate_token(args.name, scopes, args.expiration)
-                token_manager.save_token(
-                    "gitlab", 
-                    token, 
-                    args.name, 
-                    scopes,
-                    (datetime.now() + timedelta(days=args.expiration)).isoformat() if args.expiration else None
-                )
-                console.print(f"Generated GitLab token: {token}", style="green")
-                
-            elif args.platform == "bitbucket":
-                generator = BitbucketTokenGenerator(
-                    args.username, 
-                    args.password,
-                    args.client_id,
-                    args.client_secret
-                )
-                
-                # If no scopes provided, use some sensible defaults
-                scopes = args.scopes or ["repository", "pullrequest"]
-                
-                token = generator.generate_token(args.name, scopes, args.expiration)
-                token_manager.save_token(
-                    "bitbucket", 
-                    token, 
-                    args.name, 
-                    scopes,
-                    (datetime.now() + timedelta(days=args.expiration)).isoformat() if args.expiration else None
-                )
-                console.print(f"Generated Bitbucket token: {token}", style="green")
-                
+            hosts = read_hosts(args.hosts_file) if args.hosts_file else [parse_host(url) for url in args.hosts]
+            entry = {"platform": args.platform, "name": args.name, "expiration": args.expiration, "base_url": None,
+                     "scopes": args.scopes or load_provider(args.platform).DEFAULT_SCOPES}
+            entries = fanout_entries([entry], hosts)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading hosts: {e}")
+            sys.exit(1)
+        run_batch(entries, args, token_manager)
+        
+    elif args.command == "generate":
+        client = create_client(args)
+        generators = {}
+        if args.scopes:
+            requested = {"platform": args.platform, "name": args.name, "scopes": args.scopes,
+                         "base_url": args.base_url}
+            problems = check_scopes([requested], args, client, generators)
+            if problems:
+                report_unknown_scopes(problems)
+        
+        try:
+            generator = (generators.get((args.platform, args.base_url))
+                         or create_generator(args.platform, args.base_url, client=client, **auth_credentials(args)))
+            
+            # If no scopes provided, use the provider's sensible defaults
+            scopes = args.scopes or generator.DEFAULT_SCOPES
+            
+            created = generator.create_token(args.name, scopes, args.expiration)
+            token = created["token"]
+            token_manager.save_token(
+                args.platform, 
+                token, 
+                args.name, 
+                scopes,
+                expiry_timestamp(args.expiration),
+                token_metadata(created["id"], args.base_url)
+            )
+            get_console().print(f"Generated {generator.TITLE} token: {token}", style="green")
+            
         except Exception as e:
             logger.error(f"Error generating token: {e}")
             sys.exit(1)
             
+    elif args.command == "generate-batch":
+        try:
+            entries = load_manifest(args.manifest)
+        except Exception as e:
+            logger.error(f"Error loading manifest: {e}")
+            sys.exit(1)
+        run_batch(entries, args, token_manager)
+            
     elif args.command == "list":
-        tokens = token_manager.list_tokens(args.platform)
+        rows = token_manager.iter_tokens(query_from_args(args), **iter_arguments(args))
+        if args.format != "table":
+            stream_tokens(rows, args.format)
+            return
+        tokens = {args.platform: []} if args.platform else {}
+        for platform, token in rows:
+            tokens.setdefault(platform, []).append(token)
         display_tokens(tokens)
         
-    elif args.command == "list-scopes":
-        if args.platform == "github":
-            generator = GitHubTokenGenerator()
-            scopes = generator.list_scopes()
-        elif args.platform == "gitlab":
-            generator = GitLabTokenGenerator()
-            scopes = generator.list_scopes()
-        elif args.platform == "bitbucket":
-            generator = BitbucketTokenGenerator()
-            scopes = generator.list_scopes()
-            
-        console.print(f"Available scopes for {args.platform}:")
-        for scope in scopes:
-            console.print(f"  - {scope}")
-    
-    else:
-        parser.print_help()
+    elif args.command == "rotate":
+        within = timedelta(days=args.within)
+        if args.dry_run:
+            display_due_tokens(due_tokens(token_manager.store, within, args.platform), args.within)
+            return
+        
+        try:
+            executor = BoundedExecutor(args.concurrency, parse_limits(args.platform_limit))
+        except ValueError as e:
+            logger.error(f"Invalid --platform-limit: {e}")
+            sys.exit(1)
+        
+        credentials = auth_credentials(args)
+        client = create_client(args, pool_size=args.concurrency)
+        clients = HostClients(lambda: create_client(args, pool_size=DEFAULT_HOST_LIMIT))
+        generators = {}
+        
+        def rotate(due):
+            entries = rotation_entries(due, within, args.expiration)
+            try:
+                # Fanned-out tokens are re-minted on their own host, with its own credential
+                host_generators(entries, credentials, clients, generators)
+            except ValueError as e:
+                logger.error(str(e))
+                return [dict(entry, error=str(e), elapsed=0.0) for entry in entries]
+            results = generate_batch(entries, token_manager, credentials, executor, client, generators)
+            display_batch_results(results)
+            return results
+        
+        if args.schedule:
+            try:
+                run_schedule(token_manager.store, within, rotate, args.platform, args.max_sleep)
+            except KeyboardInterrupt:
+                pass
+            return
+        
+        due = due_tokens(token_manager.store, within, args.platform)
+        if not due:
+            display_due_tokens(due, args.within)
+            return
+        results = rotate(due)
+        failed = sum(1 for result in results if "error" in result)
+        get_console().print(f"Rotated {len(results) - failed} of {len(results)} tokens.",
+                            style="red" if failed else "green")
+        if failed:
+            sys.exit(1)
+        
+    elif args.command == "compact":
+        count = token_manager.compact()
+        get_console().print(f"Compacted {count} journal records.", style="green")
+        
+    elif args.command == "verify":
+        try:
+            executor = BoundedExecutor(args.concurrency, parse_limits(args.platform_limit),
+                                       default_limit=args.concurrency)
+        except ValueError as e:
+            logger.error(f"Invalid --platform-limit: {e}")
+            sys.exit(1)
+        
+        client = create_client(args, pool_size=args.concurrency)
+        
+        def generator_for(platform, base_url):
+            return create_generator(platform, base_url, client=client)
+        
+        start = datetime.now()
+        try:
+            results = verify_tokens(token_manager, generator_for, query_from_args(args), executor, args.workers)
+        finally:
+            client.close()
+        elapsed = (datetime.now() - start).total_seconds()
+        record_results(token_manager, results, start)
+        
+        display_verify_results(results)
+        get_console().print(format_latency_summary(client.latency_summary()))
+        counts = {status: 0 for status in VERIFY_STATUSES}
+        for result in results:
+            if "error" not in result:
+                counts[result["status"]] += 1
+        failed = sum(1 for result in results if "error" in result)
+        summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+        get_console().print(f"Checked {len(results)} tokens in {elapsed:.1f}s: {summary}, {failed} unchecked.",
+                            style="green" if counts["valid"] == len(results) else "red")
+        if counts["valid"] != len(results):
+            sys.exit(1)
+        
+    elif args.command == "quarantine":
+        selection = TokenQuery(platform=args.platform)
+        bad, checked = token_manager.quarantine(selection, args.dry_run, args.force, args.workers)
+        count = sum(len(entries) for entries in bad.values())
+        if not count:
+            get_console().print(f"All {checked} tokens can be decrypted.", style="green")
+            return
+        
+        if count == checked and not args.force:
+            get_console().print(f"None of the {checked} tokens can be decrypted with {token_manager.keys}; the key is "
+                                "probably wrong. Nothing was moved (use --force to move them anyway).", style="red")
+            sys.exit(1)
+        
+        display_quarantined(bad, "Undecryptable Tokens")
+        if args.dry_run:
+            get_console().print(f"{count} of {checked} tokens would be moved to {QUARANTINE_FILE}.", style="yellow")
+        else:
+            get_console().print(f"Moved {count} of {checked} tokens to {QUARANTINE_FILE}.", style="yellow")
+        
+    elif args.command == "rekey":
+        from rich.progress import Progress
+        from rekey import rekey
+        
+        try:
+            with Progress(console=get_console(), transient=True) as progress:
+                task = progress.add_task("Re-encrypting", total=None)
+                result = rekey(token_manager, args.chunk_size, args.workers,
+                               lambda done, total: progress.update(task, completed=done, total=total))
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        unreadable = result["unreadable"]
+        get_console().print(f"Re-encrypted {result['total'] - unreadable} tokens under a new key in "
+                            f"{token_manager.keys}.",
+                            style="green")
+        if unreadable:
+            get_console().print(f"{unreadable} tokens could not be decrypted with any key and were left as they "
+                                "are; see the quarantine command.", style="yellow")
+        
+    elif args.command == "migrate":
+        target = open_store(args.target)
+        count = migrate(token_manager.store, target)
+        target.close()
+        get_console().print(f"Copied {count} tokens from {token_manager.store.name} to {target.name}.",
+                            style="green")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+HTTP Client - Pooled, keep-alive HTTP sessions shared by the token generators.
+
+A single HttpClient owns one requests.Session whose adapter keeps a pool of
+connections per host, so repeated calls to a provider reuse the TCP+TLS
+connection instead of handshaking every time. Requests are paced and retried
+per host by a RequestScheduler (see rate_limit.py). Every attempt is timed, and
+the latencies can be summarized after a run. requests is only imported when the
+first request is sent, so commands that never reach a provider don't load it.
+"""
+
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+import tracing
+from rate_limit import IDEMPOTENT_METHODS, RequestScheduler
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("git_token_generator")
+
+# Connections kept open per host, and (connect, read) timeouts in seconds
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (10.0, 30.0)
+
+
+class HttpClient:
+    """A pooled requests.Session with default timeouts and per-request latency tracking."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+                 keep_alive: bool = True, scheduler: Optional[RequestScheduler] = None):
+        """
+        Initialize the client.
+
+        Args:
+            pool_size: Connections kept per host; match it to the expected concurrency
+            timeout: Default timeout in seconds, or a (connect, read) tuple
+            keep_alive: Reuse connections between requests; when off, every request
+                gets a fresh session, like calling requests.post directly
+            scheduler: Pacing and retry policy (defaults to RequestScheduler())
+        """
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.scheduler = scheduler or RequestScheduler()
+        self._latencies = []
+        self._lock = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session, created on first use."""
+        with self._lock:
+            if self._session is None:
+                with tracing.span("import"):
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def request(self, method: str, url: str, **kwargs) -> "requests.Response":
+        """Send a request through the pooled session, paced and retried per host (POSTs more cautiously)."""
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        if self.keep_alive and self._session is None:
+            # Created (importing requests) up front, so the import is never timed as a request
+            self.session
+        return self.scheduler.send(host, lambda: self._send(method, url, **kwargs),
+                                   idempotent=method.upper() in IDEMPOTENT_METHODS)
+
+    def _send(self, method: str, url: str, **kwargs) -> "requests.Response":
+        """Make a single attempt, recording how long it took."""
+        import requests
+
+        start = time.perf_counter()
+        try:
+            with tracing.span("provider.request"):
+                if self.keep_alive:
+                    response = self.session.request(method, url, **kwargs)
+                else:
+                    with requests.Session() as session:
+                        response = session.request(method, url, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._latencies.append(elapsed)
+        logger.debug(f"{method} {url} -> {response.status_code} in {elapsed * 1000:.1f}ms")
+        return response
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        """Send a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> "requests.Response":
+        """Send a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> "requests.Response":
+        """Send a DELETE request."""
+        return self.request("DELETE", url, **kwargs)
+
+    @property
+    def latencies(self) -> List[float]:
+        """Seconds taken by each request sent so far."""
+        with self._lock:
+            return list(self._latencies)
+
+    def latency_summary(self) -> Dict[str, float]:
+        """Summarize request latencies (count, and mean/p50/p95/max in milliseconds)."""
+        samples = sorted(self.latencies)
+        if not samples:
+            return {"count": 0}
+
+        def percentile(fraction: float) -> float:
+            return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+
+        return {
+            "count": len(samples),
+            "mean_ms": sum(samples) / len(samples) * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": samples[-1] * 1000,
+        }
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        if self._session is not None:
+            self._session.close()
+
+
+def format_latency_summary(summary: Dict[str, float]) -> str:
+    """Render a latency summary as a single line."""
+    if not summary.get("count"):
+        return "No requests sent."
+    return (f"{summary['count']} requests: mean {summary['mean_ms']:.1f}ms, "
+            f"p50 {summary['p50_ms']:.1f}ms, p95 {summary['p95_ms']:.1f}ms, "
+            f"max {summary['max_ms']:.1f}ms")
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client() -> HttpClient:
+    """Return the process-wide client used by generators created without one."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
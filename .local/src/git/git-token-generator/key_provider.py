@@ -0,0 +1,331 @@
+"""
+Key Provider - Load the vault keys once per process, from a pluggable source.
+
+A key source is named by a spec, from --key-source or $GIT_TOKEN_KEY_SOURCE:
+
+- file[:PATH]: key.key in the config directory (default), one key per line.
+  Created on first use, and the only source rekey can write to.
+- env[:VAR]: keys in an environment variable ($GIT_TOKEN_KEY by default),
+  separated by whitespace or commas
+- keyring[:SERVICE]: the "vault-key" secret of SERVICE (git-token-generator by
+  default) in the OS keyring, through the optional keyring package
+- command:CMD: keys printed by a command, e.g. `command:pass show git-token-key`
+
+In every source the first key encrypts and any key decrypts (see rekey.py).
+
+Providers are shared per process: the first use reads the keys and builds the
+cipher, and every later encryption or decryption reuses them, so batch runs and
+long-lived processes don't go back to the source per token. Before encrypting,
+sources that can change cheaply (the key file's inode, size and mtime, or the
+environment variable) are checked so a new key from a concurrent rekey is never
+missed; decryption relies on TokenManager retrying after a refresh() instead.
+"""
+
+import os
+import shlex
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+import tracing
+from decryption import build_cipher
+
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet, MultiFernet
+
+KEY_SOURCES = ["file", "env", "keyring", "command"]
+
+DEFAULT_KEY_ENV = "GIT_TOKEN_KEY"
+DEFAULT_KEYRING_SERVICE = "git-token-generator"
+KEYRING_USERNAME = "vault-key"
+# Seconds a key command may take
+COMMAND_TIMEOUT = 30
+
+
+def parse_keys(text: Union[str, bytes]) -> List[bytes]:
+    """Split keys separated by newlines, spaces or commas, keeping their order."""
+    if isinstance(text, str):
+        text = text.encode()
+    return text.replace(b",", b" ").split()
+
+
+def read_keys(key_file: Path) -> List[bytes]:
+    """Read the Fernet keys in a key file, one per line, the encrypting key first."""
+    with open(key_file, "rb") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def write_keys(keys: List[bytes], key_file: Path) -> None:
+    """Replace the key file atomically (write to temp, fsync, rename), readable only by the owner."""
+    fd, tmp_name = tempfile.mkstemp(dir=key_file.parent, prefix=".key-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"".join(key + b"\n" for key in keys))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, 0o600)
+        os.replace(tmp_name, key_file)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+class KeyProvider:
+    """A source of vault keys, loaded once and cached together with their cipher."""
+
+    # Whether rekey can store new keys in this source
+    writable = False
+
+    def __init__(self, spec: str):
+        """Initialize the provider; nothing is read until the keys are needed."""
+        self.spec = spec
+        self._lock = threading.Lock()
+        self._keys = None
+        self._cipher = None
+        self._stamp = None
+
+    def __str__(self) -> str:
+        """Describe the source in messages."""
+        return self.spec
+
+    def _load(self) -> List[bytes]:
+        """Read the keys from the source."""
+        raise NotImplementedError
+
+    def _current_stamp(self) -> Any:
+        """A cheap value that changes when the source does (always None if it can't be checked)."""
+        return None
+
+    def exists(self) -> bool:
+        """Whether the source has any keys yet."""
+        return True
+
+    def create(self) -> None:
+        """Create a first key if the source has none (only the key file can)."""
+
+    def save(self, keys: List[bytes]) -> None:
+        """Replace the keys in the source."""
+        raise RuntimeError(f"Key source {self} is read-only; rekey needs a key file")
+
+    def _reload(self) -> bool:
+        """Read the keys again; the caller holds the lock. Returns whether they changed."""
+        stamp = self._current_stamp()
+        keys = self._load()
+        if not keys:
+            raise RuntimeError(f"No encryption key in {self}")
+        changed = keys != self._keys
+        if changed:
+            self._keys, self._cipher = keys, None
+        self._stamp = stamp
+        return changed
+
+    def _first_load(self) -> None:
+        """Create the key if needed and read it; the caller holds the lock."""
+        with tracing.span("key.load"):
+            self.create()
+            self._reload()
+
+    def keys(self) -> List[bytes]:
+        """Return the keys, the encrypting key first, reading (or creating) them on first use."""
+        with self._lock:
+            if self._keys is None:
+                self._first_load()
+            return self._keys
+
+    def cipher(self, check: bool = False) -> Union["Fernet", "MultiFernet"]:
+        """
+        Return the cached cipher for the keys.
+
+        Args:
+            check: Reload first if the source has changed since the keys were read
+                (a stat of the key file); used before encrypting
+        """
+        with self._lock:
+            if self._keys is None:
+                self._first_load()
+            elif check and self._current_stamp() != self._stamp:
+                self._reload()
+            if self._cipher is None:
+                with tracing.span("key.cipher"):
+                    self._cipher = build_cipher(self._keys)
+            return self._cipher
+
+    def refresh(self) -> bool:
+        """Reload the keys if the source has changed; returns whether they did."""
+        with self._lock:
+            if self._keys is None:
+                self._first_load()
+                return True
+            if self._current_stamp() == self._stamp:
+                return False
+            return self._reload()
+
+
+class FileKeyProvider(KeyProvider):
+    """Keys in a file, one per line; created with a single key on first use."""
+
+    writable = True
+
+    def __init__(self, spec: str, key_file: Path):
+        """Initialize the provider for a key file."""
+        super().__init__(spec)
+        self.key_file = key_file
+
+    def __str__(self) -> str:
+        """Describe the source in messages."""
+        return str(self.key_file)
+
+    def _load(self) -> List[bytes]:
+        """Read the key file."""
+        return read_keys(self.key_file)
+
+    def _current_stamp(self) -> Any:
+        """The key file's inode, size and mtime; a rename or rewrite changes them."""
+        try:
+            stat = os.stat(self.key_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def exists(self) -> bool:
+        """Whether the key file exists."""
+        return self.key_file.exists()
+
+    def create(self) -> None:
+        """Create the key file with a new key, unless it exists already."""
+        if self.key_file.exists():
+            return
+        from cryptography.fernet import Fernet
+
+        self.key_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.key_file.parent, prefix=".key-")
+        try:
+            with os.fdopen(fd, "wb") as key_file:
+                key_file.write(Fernet.generate_key())
+                key_file.flush()
+                os.fsync(key_file.fileno())
+            # Set restrictive permissions
+            os.chmod(tmp_name, 0o600)
+            # link() fails if another process created the key first, so exactly one key wins
+            os.link(tmp_name, self.key_file)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_name)
+
+    def save(self, keys: List[bytes]) -> None:
+        """Replace the key file atomically and cache the new keys."""
+        write_keys(keys, self.key_file)
+        with self._lock:
+            self._reload()
+
+
+class EnvKeyProvider(KeyProvider):
+    """Keys in an environment variable."""
+
+    def __init__(self, spec: str, variable: str):
+        """Initialize the provider for an environment variable."""
+        super().__init__(spec)
+        self.variable = variable
+
+    def __str__(self) -> str:
+        """Describe the source in messages."""
+        return f"${self.variable}"
+
+    def _load(self) -> List[bytes]:
+        """Read the variable."""
+        return parse_keys(os.environ.get(self.variable, ""))
+
+    def _current_stamp(self) -> Any:
+        """The variable's value."""
+        return os.environ.get(self.variable, "")
+
+    def exists(self) -> bool:
+        """Whether the variable holds any keys."""
+        return bool(self._load())
+
+
+class KeyringKeyProvider(KeyProvider):
+    """Keys stored as a secret in the OS keyring (macOS Keychain, Secret Service, Windows Credential Locker)."""
+
+    def __init__(self, spec: str, service: str):
+        """Initialize the provider for a keyring service."""
+        super().__init__(spec)
+        self.service = service
+
+    def __str__(self) -> str:
+        """Describe the source in messages."""
+        return f"the {self.service} keyring entry"
+
+    def _load(self) -> List[bytes]:
+        """Read the secret through the keyring package."""
+        try:
+            import keyring
+        except ImportError:
+            raise RuntimeError("The keyring key source needs the keyring package (pip install keyring)")
+        return parse_keys(keyring.get_password(self.service, KEYRING_USERNAME) or "")
+
+    def exists(self) -> bool:
+        """Whether the keyring has the secret."""
+        return bool(self._load())
+
+
+class CommandKeyProvider(KeyProvider):
+    """Keys printed by a command, such as a password manager's CLI."""
+
+    def __init__(self, spec: str, command: str):
+        """Initialize the provider for a command (run without a shell)."""
+        super().__init__(spec)
+        self.command = command
+
+    def __str__(self) -> str:
+        """Describe the source in messages."""
+        return f"the output of `{self.command}`"
+
+    def _load(self) -> List[bytes]:
+        """Run the command and read the keys from its output."""
+        try:
+            result = subprocess.run(shlex.split(self.command), capture_output=True, timeout=COMMAND_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise RuntimeError(f"Key command `{self.command}` failed: {e}")
+        if result.returncode != 0:
+            stderr = result.stderr.decode(errors="replace").strip()
+            raise RuntimeError(f"Key command `{self.command}` exited with {result.returncode}"
+                               + (f": {stderr}" if stderr else ""))
+        return parse_keys(result.stdout)
+
+
+_providers: Dict[Tuple[str, Path], KeyProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def open_key_provider(spec: Optional[str], key_file: Path) -> KeyProvider:
+    """
+    Return the process-wide provider for a key source spec.
+
+    Args:
+        spec: Key source spec (defaults to $GIT_TOKEN_KEY_SOURCE, then file)
+        key_file: Key file used by a plain "file" spec
+
+    Returns:
+        The provider, shared with every other caller asking for the same source
+    """
+    spec = spec or os.environ.get("GIT_TOKEN_KEY_SOURCE") or "file"
+    with _providers_lock:
+        provider = _providers.get((spec, key_file))
+        if provider is None:
+            kind, _, argument = spec.partition(":")
+            if kind == "file":
+                provider = FileKeyProvider(spec, Path(argument).expanduser() if argument else key_file)
+            elif kind == "env":
+                provider = EnvKeyProvider(spec, argument or DEFAULT_KEY_ENV)
+            elif kind == "keyring":
+                provider = KeyringKeyProvider(spec, argument or DEFAULT_KEYRING_SERVICE)
+            elif kind == "command" and argument:
+                provider = CommandKeyProvider(spec, argument)
+            else:
+                raise ValueError(f"Unknown key source: {spec} (expected one of {', '.join(KEY_SOURCES)})")
+            _providers[(spec, key_file)] = provider
+        return provider
@@ -0,0 +1,121 @@
+"""
+Output - Stream token listings as JSON Lines, CSV or aligned plain text.
+
+Rows are written as they come out of the store (TokenManager.iter_tokens), so
+piping a large vault into jq or grep runs in constant memory. Only the "table"
+format collects rows first, since rich measures every cell before printing.
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from typing import Any, Callable, Dict, Iterable, Optional, TextIO, Tuple
+
+OUTPUT_FORMATS = ["table", "jsonl", "csv", "plain"]
+
+# --sort choices and the entry fields they order by
+SORT_KEYS = {
+    "platform": "platform",
+    "name": "name",
+    "created": "created_at",
+    "expires": "expires_at",
+}
+
+# Columns written by the csv and plain formats, before the token value
+COLUMNS = ["platform", "name", "created_at", "expires_at", "scopes"]
+
+Row = Tuple[str, Dict[str, Any]]
+
+
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the format, sorting and paging options shared by the listing commands."""
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="table",
+                        help="Output format; everything but table is streamed row by row (default: table)")
+    parser.add_argument("--sort", choices=list(SORT_KEYS),
+                        help="Sort by this field (default: storage order)")
+    parser.add_argument("--reverse", action="store_true", help="Reverse the order")
+    parser.add_argument("--limit", type=int, metavar="N", help="Show at most N tokens")
+    parser.add_argument("--offset", type=int, default=0, metavar="N", help="Skip the first N tokens")
+
+
+def iter_arguments(args: argparse.Namespace) -> Dict[str, Any]:
+    """Collect the sorting and paging options into keyword arguments for TokenManager.iter_tokens."""
+    return {
+        "sort": SORT_KEYS.get(args.sort),
+        "reverse": args.reverse,
+        "offset": max(0, args.offset),
+        "limit": args.limit,
+    }
+
+
+def write_jsonl(rows: Iterable[Row], stream: TextIO, show_values: bool) -> int:
+    """Write one JSON object per token, with every stored field except the value unless shown."""
+    count = 0
+    for platform, token in rows:
+        record = {"platform": platform, **token}
+        if not show_values:
+            record.pop("token", None)
+        stream.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[Row], stream: TextIO, show_values: bool) -> int:
+    """Write a header and one CSV line per token; scopes are space-separated."""
+    writer = csv.writer(stream)
+    writer.writerow(COLUMNS + (["token"] if show_values else []))
+    count = 0
+    for platform, token in rows:
+        line = [platform, token["name"], token.get("created_at") or "", token.get("expires_at") or "",
+                " ".join(token.get("scopes") or [])]
+        if show_values:
+            line.append(token.get("token", ""))
+        writer.writerow(line)
+        count += 1
+    return count
+
+
+def write_plain(rows: Iterable[Row], stream: TextIO, show_values: bool) -> int:
+    """Write one line per token in fixed-width columns, so nothing has to be measured up front."""
+    count = 0
+    for platform, token in rows:
+        line = (f"{platform:<10} {token['name']:<32} {token.get('created_at') or 'Unknown':<26} "
+                f"{token.get('expires_at') or 'Never':<26} {','.join(token.get('scopes') or []) or '-'}")
+        if show_values:
+            line += f" {token.get('token', '')}"
+        stream.write(line + "\n")
+        count += 1
+    return count
+
+
+WRITERS: Dict[str, Callable[[Iterable[Row], TextIO, bool], int]] = {
+    "jsonl": write_jsonl,
+    "csv": write_csv,
+    "plain": write_plain,
+}
+
+
+def stream_tokens(rows: Iterable[Row], output_format: str, show_values: bool = False,
+                  stream: Optional[TextIO] = None) -> int:
+    """
+    Write tokens as they are produced.
+
+    Args:
+        rows: (platform, token) pairs, e.g. from TokenManager.iter_tokens
+        output_format: jsonl, csv or plain
+        show_values: Include decrypted token values
+        stream: Where to write (default: stdout)
+
+    Returns:
+        The number of tokens written
+    """
+    stream = stream or sys.stdout
+    try:
+        return WRITERS[output_format](rows, stream, show_values)
+    except BrokenPipeError:
+        # The reader (e.g. head) has gone away; stop quietly instead of failing at exit
+        if stream is sys.stdout:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
@@ -0,0 +1,169 @@
+"""
+Providers - Registry of the forges tokens can be generated for.
+
+Each provider is a TokenGenerator subclass (see providers/base.py), in its own
+module. The registry records where each one lives plus what the quick commands
+need without it (the public hosts the credential helper serves, and the
+username git pairs with a token), so a command imports only the providers it
+actually uses, and startup stays flat as providers are added.
+
+Built in: github, github-enterprise, gitlab, bitbucket, gitea and forgejo.
+Other providers are plugins, registered by an installed package under the
+"git_token_generator.providers" entry point group, or listed in
+$GIT_TOKEN_PROVIDERS as comma-separated NAME=MODULE:CLASS items (MODULE must be
+importable, e.g. through $PYTHONPATH). Plugins are only looked up for a name
+that isn't built in, or when every provider is listed.
+"""
+
+import os
+import logging
+import argparse
+import importlib
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    from http_client import HttpClient
+    from providers.base import TokenGenerator
+
+logger = logging.getLogger("git_token_generator")
+
+ENTRY_POINT_GROUP = "git_token_generator.providers"
+PLUGIN_ENV = "GIT_TOKEN_PROVIDERS"
+
+
+class ProviderInfo:
+    """Where a provider's generator class lives, and what is known about it without importing it."""
+
+    def __init__(self, name: str, target: str, hosts: Optional[Tuple[str, ...]] = None,
+                 token_username: Optional[str] = None):
+        """
+        Initialize the entry.
+
+        Args:
+            name: Platform name, as stored in the vault
+            target: MODULE:CLASS of the generator
+            hosts: Public hosts served by default (None to read HOSTS from the class)
+            token_username: Username paired with a token (None to read TOKEN_USERNAME from the class)
+        """
+        self.name = name
+        self.target = target
+        self._hosts = hosts
+        self._token_username = token_username
+        self._class = None
+
+    def load(self) -> Type["TokenGenerator"]:
+        """Import the generator class on first use."""
+        if self._class is None:
+            module_name, _, class_name = self.target.partition(":")
+            try:
+                self._class = getattr(importlib.import_module(module_name), class_name)
+            except (ImportError, AttributeError) as e:
+                raise ValueError(f"Cannot load provider {self.name} from {self.target}: {e}")
+        return self._class
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        """Public hosts whose tokens this provider generates."""
+        return self._hosts if self._hosts is not None else tuple(self.load().HOSTS)
+
+    @property
+    def token_username(self) -> str:
+        """Username git sends alongside one of this provider's tokens."""
+        return self._token_username or self.load().TOKEN_USERNAME
+
+
+# Kept in step with each class's HOSTS and TOKEN_USERNAME, so finding a provider imports nothing
+BUILTIN_PROVIDERS: Dict[str, ProviderInfo] = {info.name: info for info in [
+    ProviderInfo("github", "providers.github:GitHubTokenGenerator", ("github.com",), "x-access-token"),
+    ProviderInfo("github-enterprise", "providers.github:GitHubEnterpriseTokenGenerator", (), "x-access-token"),
+    ProviderInfo("gitlab", "providers.gitlab:GitLabTokenGenerator", ("gitlab.com",), "oauth2"),
+    ProviderInfo("bitbucket", "providers.bitbucket:BitbucketTokenGenerator", ("bitbucket.org",), "x-token-auth"),
+    ProviderInfo("gitea", "providers.gitea:GiteaTokenGenerator", ("gitea.com",), "oauth2"),
+    ProviderInfo("forgejo", "providers.gitea:ForgejoTokenGenerator", ("codeberg.org",), "oauth2"),
+]}
+
+_plugins: Optional[Dict[str, ProviderInfo]] = None
+
+
+def plugin_providers() -> Dict[str, ProviderInfo]:
+    """Find plugin providers ($GIT_TOKEN_PROVIDERS first, then entry points), once per process."""
+    global _plugins
+    if _plugins is None:
+        found = {}
+        for item in os.environ.get(PLUGIN_ENV, "").split(","):
+            name, _, target = item.strip().partition("=")
+            if name and target:
+                found.setdefault(name, ProviderInfo(name, target))
+
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            found.setdefault(entry_point.name, ProviderInfo(entry_point.name, entry_point.value))
+
+        for name in found.keys() & BUILTIN_PROVIDERS.keys():
+            logger.warning(f"Ignoring plugin provider {name}: the name is taken by a built-in provider")
+        _plugins = {name: info for name, info in found.items() if name not in BUILTIN_PROVIDERS}
+    return _plugins
+
+
+def provider_names() -> List[str]:
+    """Names of every provider, built-in ones first."""
+    return list(BUILTIN_PROVIDERS) + sorted(plugin_providers())
+
+
+def get_provider(name: str) -> ProviderInfo:
+    """Look up a provider by platform name, raising ValueError for an unknown one."""
+    info = BUILTIN_PROVIDERS.get(name)
+    if info is None:
+        info = plugin_providers().get(name)
+    if info is None:
+        raise ValueError(f"Unsupported platform: {name} (known: {', '.join(provider_names())})")
+    return info
+
+
+def load_provider(name: str) -> Type["TokenGenerator"]:
+    """Import and return the generator class of a provider."""
+    return get_provider(name).load()
+
+
+def create_generator(platform: str, base_url: Optional[str] = None, username: Optional[str] = None,
+                     password: Optional[str] = None, client_id: Optional[str] = None,
+                     client_secret: Optional[str] = None, access_token: Optional[str] = None,
+                     client: Optional["HttpClient"] = None) -> "TokenGenerator":
+    """Create the token generator for a platform from whichever credentials apply to it."""
+    return load_provider(platform).from_options(
+        base_url, client, username=username, password=password, client_id=client_id,
+        client_secret=client_secret, access_token=access_token,
+    )
+
+
+def platform_for_host(host: str) -> Optional[str]:
+    """The provider serving a public host by default (port ignored), or None."""
+    host = host.split(":")[0]
+    for providers in (BUILTIN_PROVIDERS, None):
+        for name, info in (providers or plugin_providers()).items():
+            if host in info.hosts:
+                return name
+    return None
+
+
+def token_username(platform: str) -> str:
+    """Username git sends alongside a platform's token ("token" for unknown platforms)."""
+    try:
+        return get_provider(platform).token_username
+    except ValueError:
+        return "token"
+
+
+def platform_type(value: str) -> str:
+    """argparse type for a platform name, checked against the registry."""
+    try:
+        get_provider(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def add_platform_argument(parser: argparse.ArgumentParser, *flags: str, help: str) -> None:
+    """Add a platform option (or positional argument) that accepts any registered provider."""
+    parser.add_argument(*flags, type=platform_type, metavar="PLATFORM",
+                        help=f"{help} ({', '.join(BUILTIN_PROVIDERS)} or a plugin)")
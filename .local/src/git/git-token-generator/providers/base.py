@@ -0,0 +1,123 @@
+"""
+Token Generator - The interface every provider implements.
+
+A provider is a TokenGenerator subclass describing one forge: its name in the
+vault, default API URL, scopes, and which of the shared authentication options
+(--username, --password, --client-id, --client-secret, --access-token) it
+takes. The commands only ever call the methods below, so batch generation,
+rotation, revocation and verification dispatch to any registered provider.
+lapsed_status() and provider_expiry() help implement verify_token.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from http_client import HttpClient
+
+
+def lapsed_status(metadata: Dict[str, Any], now: Optional[datetime] = None) -> str:
+    """Status of a token the provider refused: expired if its stored expiry has passed, otherwise revoked."""
+    expires_at = metadata.get("expires_at")
+    if expires_at and datetime.fromisoformat(expires_at) <= (now or datetime.now()):
+        return "expired"
+    return "revoked"
+
+
+def provider_expiry(value: Optional[str]) -> Optional[str]:
+    """
+    Convert an expiry reported by a provider into the vault's format (local time, ISO).
+
+    Args:
+        value: A date ("2026-01-31", expiring at the start of that day, UTC) or a
+            timestamp with a zone ("2026-01-31 09:00:00 UTC", "... +0200")
+
+    Returns:
+        The expiry as a naive local ISO timestamp, or None if there is none
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith(" UTC"):
+        value = value[:-4] + " +0000"
+    for layout in ("%Y-%m-%d %H:%M:%S %z", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%d"):
+        try:
+            parsed = datetime.strptime(value, layout)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Unrecognized expiry: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone().replace(tzinfo=None).isoformat()
+
+
+class TokenGenerator:
+    """Generate, revoke and check tokens at one provider."""
+
+    # Platform name stored in the vault, and the name shown in messages
+    NAME = ""
+    TITLE = ""
+    # Default API URL (None if every instance is self-hosted and needs --base-url)
+    BASE_URL: Optional[str] = None
+    # Public hosts the credential helper serves this provider's tokens for
+    HOSTS: Tuple[str, ...] = ()
+    # Username git sends alongside a token used as a password
+    TOKEN_USERNAME = "token"
+    # Every scope the provider accepts, and the ones used when none are requested
+    SCOPES: List[str] = []
+    DEFAULT_SCOPES: List[str] = []
+    # Authentication options the constructor takes, by keyword
+    CREDENTIALS: Tuple[str, ...] = ()
+    # Whether revoke_token needs the credentials _authenticate asks for
+    REVOKE_NEEDS_CREDENTIALS = False
+
+    @classmethod
+    def from_options(cls, base_url: Optional[str] = None, client: Optional[HttpClient] = None,
+                     **credentials: Optional[str]) -> "TokenGenerator":
+        """
+        Create a generator from the shared command-line options.
+
+        Args:
+            base_url: API URL of the instance (None for BASE_URL)
+            client: Pooled HTTP client to send requests through
+            credentials: Every authentication option; only the ones in CREDENTIALS are used
+        """
+        return cls(base_url=base_url, client=client, **{key: credentials.get(key) for key in cls.CREDENTIALS})
+
+    def _authenticate(self) -> None:
+        """Ask for any credentials that weren't given (the default needs none)."""
+
+    def generate_token(self, name: str, scopes: List[str], expiration: int = 30) -> str:
+        """
+        Generate a new token.
+
+        Args:
+            name: Name of the token
+            scopes: List of permission scopes
+            expiration: Days until expiration (0 for no expiration)
+
+        Returns:
+            The generated token
+        """
+        return self.create_token(name, scopes, expiration)["token"]
+
+    def create_token(self, name: str, scopes: List[str], expiration: int = 30) -> Dict[str, Any]:
+        """Generate a token and return it with its provider-side ID ("token" and "id", None if there is none)."""
+        raise NotImplementedError
+
+    def revoke_token(self, token: str, metadata: Dict[str, Any]) -> None:
+        """Revoke a token; one that no longer exists counts as revoked."""
+        raise NotImplementedError
+
+    def verify_token(self, token: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Check that a token still works; returns its "status" and the "expires_at" the provider reports."""
+        raise NotImplementedError
+
+    def list_scopes(self) -> List[str]:
+        """List the provider's token scopes."""
+        return list(self.SCOPES)
+
+    def fetch_scopes(self) -> List[str]:
+        """Ask the provider which scopes it accepts (the default publishes nothing beyond SCOPES)."""
+        return self.list_scopes()
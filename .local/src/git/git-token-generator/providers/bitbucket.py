@@ -0,0 +1,139 @@
+"""
+Bitbucket - OAuth access tokens from a Bitbucket Cloud OAuth consumer.
+"""
+
+import getpass
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from http_client import HttpClient, default_client
+from providers.base import TokenGenerator
+
+logger = logging.getLogger("git_token_generator")
+
+
+class BitbucketTokenGenerator(TokenGenerator):
+    """Generate Bitbucket access tokens."""
+    
+    NAME = "bitbucket"
+    TITLE = "Bitbucket"
+    BASE_URL = "https://bitbucket.org/site/oauth2/access_token"
+    API_URL = "https://api.bitbucket.org"
+    HOSTS = ("bitbucket.org",)
+    TOKEN_USERNAME = "x-token-auth"
+    SCOPES = [
+        "account", "account:write", "team", "team:write", "repository",
+        "repository:write", "repository:admin", "pullrequest", "pullrequest:write",
+        "snippet", "snippet:write", "issue", "issue:write", "wiki", "wiki:write",
+        "webhook", "webhook:write", "project", "project:write"
+    ]
+    DEFAULT_SCOPES = ["repository", "pullrequest"]
+    CREDENTIALS = ("username", "password", "client_id", "client_secret")
+    TOKEN_LIFETIME = timedelta(hours=2)
+    REVOKE_NEEDS_CREDENTIALS = False
+    
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                client_id: Optional[str] = None, client_secret: Optional[str] = None,
+                base_url: Optional[str] = None, client: Optional[HttpClient] = None):
+        """Initialize with Bitbucket credentials or OAuth app credentials."""
+        self.username = username
+        self.password = password
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url or self.BASE_URL
+        # A custom token endpoint (e.g. a mock server) serves the REST API from the same root
+        self.api_url = self.API_URL if self.base_url == self.BASE_URL else self.base_url.split("/site/oauth2/")[0]
+        self.client = client or default_client()
+    
+    def _authenticate(self) -> None:
+        """Authenticate with Bitbucket."""
+        # If using client credentials (OAuth app)
+        if not self.client_id:
+            self.client_id = input("Bitbucket OAuth Client ID: ")
+        
+        if not self.client_secret:
+            self.client_secret = getpass.getpass("Bitbucket OAuth Client Secret: ")
+        
+        # If using username/password
+        if not self.client_id and not self.client_secret:
+            if not self.username:
+                self.username = input("Bitbucket Username: ")
+            
+            if not self.password:
+                self.password = getpass.getpass("Bitbucket Password: ")
+    
+    def create_token(self, name: str, scopes: List[str], expiration: int = 30) -> Dict[str, Any]:
+        """Generate a token and return it as "token" (Bitbucket access tokens have no "id")."""
+        self._authenticate()
+        
+        # Bitbucket uses OAuth2 for token generation
+        auth = None
+        data = {"grant_type": "client_credentials"}
+        
+        if self.client_id and self.client_secret:
+            auth = (self.client_id, self.client_secret)
+        else:
+            auth = (self.username, self.password)
+            data["grant_type"] = "password"
+        
+        if scopes:
+            data["scope"] = " ".join(scopes)
+        
+        response = self.client.post(
+            self.base_url,
+            auth=auth,
+            data=data
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            logger.info(f"Successfully created Bitbucket token: {name}")
+            # We store the access token, not the refresh token
+            return {"token": result["access_token"], "id": None}
+        else:
+            logger.error(f"Failed to create Bitbucket token: {response.text}")
+            raise Exception(f"Bitbucket token creation failed: {response.status_code} - {response.text}")
+    
+    def revoke_token(self, token: str, metadata: Dict[str, Any]) -> None:
+        """
+        Revoke an access token.
+        
+        Bitbucket has no API to revoke OAuth access tokens; they stop working
+        TOKEN_LIFETIME after they are issued. Tokens past that age count as
+        revoked, younger ones raise so they stay in the vault.
+        
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "created_at" and "name")
+        """
+        issued = datetime.fromisoformat(metadata["created_at"])
+        if datetime.now() - issued >= self.TOKEN_LIFETIME:
+            logger.info(f"Bitbucket token {metadata['name']} has already expired")
+            return
+        raise Exception(f"Bitbucket access tokens can't be revoked; this one expires at "
+                        f"{(issued + self.TOKEN_LIFETIME).isoformat(timespec='seconds')} "
+                        f"(rotate the OAuth consumer secret to cut it off sooner)")
+    
+    def verify_token(self, token: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Check that an access token still works by fetching its user.
+        
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "created_at")
+            
+        Returns:
+            "status" (valid, expired or revoked) and "expires_at", TOKEN_LIFETIME
+            after the token was issued
+        """
+        issued = datetime.fromisoformat(metadata["created_at"])
+        expires_at = issued + self.TOKEN_LIFETIME
+        headers = {"Authorization": f"Bearer {token}"}
+        response = self.client.get(f"{self.api_url}/2.0/user", headers=headers)
+        if response.status_code == 200:
+            return {"status": "valid", "expires_at": expires_at.isoformat()}
+        if response.status_code == 401:
+            status = "expired" if datetime.now() >= expires_at else "revoked"
+            return {"status": status, "expires_at": expires_at.isoformat()}
+        raise Exception(f"Bitbucket token check failed: {response.status_code} - {response.text}")
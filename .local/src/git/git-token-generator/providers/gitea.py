@@ -0,0 +1,119 @@
+"""
+Gitea - Access tokens on Gitea and Forgejo instances.
+
+Forgejo is a Gitea fork with the same token API, so the forgejo provider only
+differs in its default instance (codeberg.org). Tokens are created for the
+authenticating user with basic auth, and never expire at the provider: the
+expiry stored in the vault only decides when rotate re-mints them.
+"""
+
+import getpass
+import logging
+from typing import Any, Dict, List, Optional
+
+from http_client import HttpClient, default_client
+from providers.base import TokenGenerator, lapsed_status
+
+logger = logging.getLogger("git_token_generator")
+
+
+class GiteaTokenGenerator(TokenGenerator):
+    """Generate Gitea access tokens."""
+
+    NAME = "gitea"
+    TITLE = "Gitea"
+    BASE_URL = "https://gitea.com"
+    HOSTS = ("gitea.com",)
+    TOKEN_USERNAME = "oauth2"
+    # Scoped tokens, Gitea 1.19 and later
+    SCOPES = [
+        "read:activitypub", "write:activitypub", "read:admin", "write:admin",
+        "read:issue", "write:issue", "read:misc", "write:misc",
+        "read:notification", "write:notification", "read:organization", "write:organization",
+        "read:package", "write:package", "read:repository", "write:repository",
+        "read:user", "write:user"
+    ]
+    DEFAULT_SCOPES = ["write:repository", "read:user"]
+    CREDENTIALS = ("username", "password")
+    REVOKE_NEEDS_CREDENTIALS = True
+
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                 base_url: Optional[str] = None, client: Optional[HttpClient] = None):
+        """Initialize with the instance's credentials and URL."""
+        self.username = username
+        self.password = password
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.client = client or default_client()
+
+    def _authenticate(self) -> None:
+        """Ask for the username and password tokens are created with."""
+        if not self.username:
+            self.username = input(f"{self.TITLE} Username: ")
+
+        if not self.password:
+            self.password = getpass.getpass(f"{self.TITLE} Password: ")
+
+    def create_token(self, name: str, scopes: List[str], expiration: int = 30) -> Dict[str, Any]:
+        """Generate a token and return it with its ID ("token" and "id")."""
+        self._authenticate()
+
+        response = self.client.post(
+            f"{self.base_url}/api/v1/users/{self.username}/tokens",
+            auth=(self.username, self.password),
+            json={"name": name, "scopes": scopes}
+        )
+
+        if response.status_code == 201:
+            result = response.json()
+            logger.info(f"Successfully created {self.TITLE} token: {name}")
+            return {"token": result["sha1"], "id": result.get("id")}
+        logger.error(f"Failed to create {self.TITLE} token: {response.text}")
+        raise Exception(f"{self.TITLE} token creation failed: {response.status_code} - {response.text}")
+
+    def revoke_token(self, token: str, metadata: Dict[str, Any]) -> None:
+        """
+        Delete a token, by ID or else by name.
+
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "token_id" and "name")
+        """
+        self._authenticate()
+        token_id = metadata.get("token_id")
+        target = token_id if token_id is not None else metadata["name"]
+        response = self.client.delete(
+            f"{self.base_url}/api/v1/users/{self.username}/tokens/{target}",
+            auth=(self.username, self.password)
+        )
+        if response.status_code in (204, 404):
+            logger.info(f"Revoked {self.TITLE} token: {metadata['name']}")
+        else:
+            raise Exception(f"{self.TITLE} token revocation failed: {response.status_code} - {response.text}")
+
+    def verify_token(self, token: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Check that a token still works by fetching its user.
+
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "expires_at")
+
+        Returns:
+            "status" (valid, expired or revoked), and "expires_at" None since
+            Gitea tokens don't expire
+        """
+        response = self.client.get(f"{self.base_url}/api/v1/user", headers={"Authorization": f"token {token}"})
+        if response.status_code == 200:
+            return {"status": "valid", "expires_at": None}
+        if response.status_code == 401:
+            return {"status": lapsed_status(metadata), "expires_at": None}
+        raise Exception(f"{self.TITLE} token check failed: {response.status_code} - {response.text}")
+
+
+class ForgejoTokenGenerator(GiteaTokenGenerator):
+    """Generate Forgejo access tokens."""
+
+    NAME = "forgejo"
+    TITLE = "Forgejo"
+    BASE_URL = "https://codeberg.org"
+    HOSTS = ("codeberg.org",)
@@ -0,0 +1,173 @@
+"""
+GitHub - Personal access tokens on github.com and GitHub Enterprise Server.
+
+GitHub Enterprise hosts serve the same REST API under /api/v3, so the
+github-enterprise provider only differs in needing --base-url.
+"""
+
+import getpass
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from http_client import HttpClient, default_client
+from providers.base import TokenGenerator, lapsed_status, provider_expiry
+
+logger = logging.getLogger("git_token_generator")
+
+
+class GitHubTokenGenerator(TokenGenerator):
+    """Generate GitHub personal access tokens."""
+    
+    NAME = "github"
+    TITLE = "GitHub"
+    BASE_URL = "https://api.github.com"
+    HOSTS = ("github.com",)
+    TOKEN_USERNAME = "x-access-token"
+    SCOPES = [
+        "repo", "repo:status", "repo_deployment", "public_repo", "repo:invite",
+        "security_events", "admin:repo_hook", "write:repo_hook", "read:repo_hook",
+        "admin:org", "write:org", "read:org", "admin:public_key", "write:public_key",
+        "read:public_key", "admin:org_hook", "gist", "notifications", "user",
+        "read:user", "user:email", "user:follow", "delete_repo", "write:discussion",
+        "read:discussion", "admin:gpg_key", "write:gpg_key", "read:gpg_key",
+        "workflow", "packages", "admin:packages", "write:packages", "read:packages"
+    ]
+    DEFAULT_SCOPES = ["repo", "read:user", "user:email"]
+    CREDENTIALS = ("username", "password")
+    REVOKE_NEEDS_CREDENTIALS = True
+    
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                 base_url: Optional[str] = None, client: Optional[HttpClient] = None):
+        """Initialize with GitHub credentials and an optional API URL (e.g. a mock server)."""
+        self.username = username
+        self.password = password
+        self.base_url = base_url or self.BASE_URL
+        self.client = client or default_client()
+    
+    def _authenticate(self) -> None:
+        """Authenticate with GitHub."""
+        if not self.username:
+            self.username = input(f"{self.TITLE} Username: ")
+        
+        if not self.password:
+            self.password = getpass.getpass(f"{self.TITLE} Password: ")
+    
+    def create_token(self, name: str, scopes: List[str], expiration: int = 30) -> Dict[str, Any]:
+        """Generate a token and return it with its authorization ID ("token" and "id")."""
+        self._authenticate()
+        
+        expiration_date = None
+        if expiration > 0:
+            expiration_date = (datetime.now() + timedelta(days=expiration)).strftime("%Y-%m-%d")
+        
+        # Create the authorization
+        headers = {"Accept": "application/vnd.github+json"}
+        auth = (self.username, self.password)
+        data = {
+            "note": name,
+            "scopes": scopes
+        }
+        
+        if expiration_date:
+            data["expires_at"] = expiration_date
+        
+        # Note: This method requires basic authentication, which GitHub is gradually phasing out
+        # For production use, consider GitHub's web application flow for OAuth Apps
+        response = self.client.post(
+            f"{self.base_url}/authorizations",
+            headers=headers,
+            auth=auth,
+            json=data
+        )
+        
+        if response.status_code == 201:
+            result = response.json()
+            logger.info(f"Successfully created {self.TITLE} token: {name}")
+            return {"token": result["token"], "id": result.get("id")}
+        else:
+            logger.error(f"Failed to create {self.TITLE} token: {response.text}")
+            raise Exception(f"{self.TITLE} token creation failed: {response.status_code} - {response.text}")
+    
+    def revoke_token(self, token: str, metadata: Dict[str, Any]) -> None:
+        """
+        Revoke a token by deleting its authorization.
+        
+        Tokens stored before authorization IDs were recorded are found by name.
+        A token that no longer exists counts as revoked.
+        
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "token_id" and "name")
+        """
+        self._authenticate()
+        auth = (self.username, self.password)
+        headers = {"Accept": "application/vnd.github+json"}
+        
+        token_id = metadata.get("token_id")
+        if token_id is None:
+            response = self.client.get(f"{self.base_url}/authorizations", headers=headers, auth=auth)
+            if response.status_code != 200:
+                raise Exception(f"{self.TITLE} authorization lookup failed: {response.status_code} - {response.text}")
+            matches = [a["id"] for a in response.json() if a.get("note") == metadata["name"]]
+            if not matches:
+                logger.info(f"{self.TITLE} token {metadata['name']} no longer exists")
+                return
+            token_id = matches[0]
+        
+        response = self.client.delete(f"{self.base_url}/authorizations/{token_id}", headers=headers, auth=auth)
+        if response.status_code in (204, 404):
+            logger.info(f"Revoked {self.TITLE} token: {metadata['name']}")
+        else:
+            raise Exception(f"{self.TITLE} token revocation failed: {response.status_code} - {response.text}")
+    
+    def verify_token(self, token: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Check that a token still works by fetching its user.
+        
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "expires_at")
+            
+        Returns:
+            "status" (valid, expired or revoked) and "expires_at" from GitHub's
+            token expiration header (None if the token never expires or was refused)
+        """
+        headers = {"Accept": "application/vnd.github+json", "Authorization": f"token {token}"}
+        response = self.client.get(f"{self.base_url}/user", headers=headers)
+        if response.status_code == 200:
+            expiry = response.headers.get("GitHub-Authentication-Token-Expiration")
+            return {"status": "valid", "expires_at": provider_expiry(expiry)}
+        if response.status_code == 401:
+            return {"status": lapsed_status(metadata), "expires_at": None}
+        raise Exception(f"{self.TITLE} token check failed: {response.status_code} - {response.text}")
+            
+    def fetch_scopes(self) -> List[str]:
+        """Ask GitHub for the scopes of the authenticated credentials (its X-OAuth-Scopes header)."""
+        self._authenticate()
+        
+        headers = {"Accept": "application/vnd.github+json"}
+        response = self.client.get(f"{self.base_url}/user", headers=headers, auth=(self.username, self.password))
+        if response.status_code != 200:
+            raise Exception(f"{self.TITLE} scope lookup failed: {response.status_code} - {response.text}")
+        header = response.headers.get("X-OAuth-Scopes", "")
+        return [scope.strip() for scope in header.split(",") if scope.strip()]
+
+
+class GitHubEnterpriseTokenGenerator(GitHubTokenGenerator):
+    """Generate personal access tokens on a GitHub Enterprise Server host."""
+    
+    NAME = "github-enterprise"
+    TITLE = "GitHub Enterprise"
+    BASE_URL = None
+    HOSTS = ()
+    
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                 base_url: Optional[str] = None, client: Optional[HttpClient] = None):
+        """Initialize with credentials and the host's URL; its API lives under /api/v3."""
+        if not base_url:
+            raise ValueError("GitHub Enterprise needs --base-url, e.g. https://github.example.com")
+        base_url = base_url.rstrip("/")
+        if not base_url.endswith("/api/v3"):
+            base_url += "/api/v3"
+        super().__init__(username, password, base_url, client)
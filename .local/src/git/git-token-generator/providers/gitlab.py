@@ -0,0 +1,160 @@
+"""
+GitLab - Personal access tokens on gitlab.com and self-managed instances.
+"""
+
+import re
+import getpass
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from http_client import HttpClient, default_client
+from providers.base import TokenGenerator, lapsed_status, provider_expiry
+
+logger = logging.getLogger("git_token_generator")
+
+# GitLab scopes newer than GitLabTokenGenerator.SCOPES, with the version that introduced each
+GITLAB_VERSION_SCOPES = [
+    ((15, 8), "admin_mode"),
+    ((15, 10), "create_runner"),
+    ((16, 0), "ai_features"),
+    ((16, 4), "k8s_proxy"),
+    ((17, 1), "read_service_ping"),
+    ((17, 1), "manage_runner"),
+]
+
+
+def gitlab_scopes(version: str) -> List[str]:
+    """
+    Return the scopes a GitLab instance of this version accepts.
+
+    Args:
+        version: Version as reported by /api/v4/version (e.g. "16.4.1-ee")
+    """
+    match = re.match(r"(\d+)\.(\d+)", version or "")
+    if not match:
+        raise ValueError(f"Unrecognized GitLab version: {version!r}")
+    release = (int(match.group(1)), int(match.group(2)))
+    return GitLabTokenGenerator.SCOPES + [scope for since, scope in GITLAB_VERSION_SCOPES if release >= since]
+
+
+class GitLabTokenGenerator(TokenGenerator):
+    """Generate GitLab personal access tokens."""
+    
+    NAME = "gitlab"
+    TITLE = "GitLab"
+    BASE_URL = "https://gitlab.com"
+    HOSTS = ("gitlab.com",)
+    TOKEN_USERNAME = "oauth2"
+    SCOPES = [
+        "api", "read_user", "read_api", "read_repository", "write_repository",
+        "read_registry", "write_registry", "sudo"
+    ]
+    DEFAULT_SCOPES = ["api", "read_repository"]
+    CREDENTIALS = ("access_token",)
+    REVOKE_NEEDS_CREDENTIALS = False
+    
+    def __init__(self, base_url: Optional[str] = None, access_token: Optional[str] = None,
+                 client: Optional[HttpClient] = None):
+        """Initialize with GitLab instance URL and optional token for auth."""
+        self.base_url = base_url or self.BASE_URL
+        self.access_token = access_token
+        self.client = client or default_client()
+    
+    def _authenticate(self) -> None:
+        """Authenticate with GitLab."""
+        if not self.access_token:
+            self.access_token = getpass.getpass("GitLab Access Token for authentication: ")
+    
+    def create_token(self, name: str, scopes: List[str], expiration: int = 30) -> Dict[str, Any]:
+        """Generate a token and return it with its personal access token ID ("token" and "id")."""
+        self._authenticate()
+        
+        expiration_date = None
+        if expiration > 0:
+            expiration_date = (datetime.now() + timedelta(days=expiration)).strftime("%Y-%m-%d")
+        
+        headers = {"PRIVATE-TOKEN": self.access_token}
+        data = {
+            "name": name,
+            "scopes": scopes
+        }
+        
+        if expiration_date:
+            data["expires_at"] = expiration_date
+        
+        response = self.client.post(
+            f"{self.base_url}/api/v4/personal_access_tokens",
+            headers=headers,
+            json=data
+        )
+        
+        if response.status_code == 201:
+            result = response.json()
+            logger.info(f"Successfully created GitLab token: {name}")
+            return {"token": result["token"], "id": result.get("id")}
+        else:
+            logger.error(f"Failed to create GitLab token: {response.text}")
+            raise Exception(f"GitLab token creation failed: {response.status_code} - {response.text}")
+    
+    def revoke_token(self, token: str, metadata: Dict[str, Any]) -> None:
+        """
+        Revoke a personal access token.
+        
+        With an access token and a stored ID, the token is revoked by ID;
+        otherwise it revokes itself, which needs no other credentials. A token
+        that no longer exists counts as revoked.
+        
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "token_id" and "name")
+        """
+        token_id = metadata.get("token_id")
+        if token_id is not None and self.access_token:
+            url = f"{self.base_url}/api/v4/personal_access_tokens/{token_id}"
+            headers = {"PRIVATE-TOKEN": self.access_token}
+        else:
+            url = f"{self.base_url}/api/v4/personal_access_tokens/self"
+            headers = {"PRIVATE-TOKEN": token}
+        
+        response = self.client.delete(url, headers=headers)
+        # Revoking "self" with a token that is already revoked fails authentication
+        if response.status_code in (204, 404) or (response.status_code == 401 and url.endswith("/self")):
+            logger.info(f"Revoked GitLab token: {metadata['name']}")
+        else:
+            raise Exception(f"GitLab token revocation failed: {response.status_code} - {response.text}")
+    
+    def verify_token(self, token: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Check that a token still works by asking GitLab about the token itself.
+        
+        Args:
+            token: The token value
+            metadata: The token's vault entry (uses "expires_at")
+            
+        Returns:
+            "status" (valid, expired or revoked) and "expires_at" as GitLab reports it
+            (None if the token never expires or was refused)
+        """
+        headers = {"PRIVATE-TOKEN": token}
+        response = self.client.get(f"{self.base_url}/api/v4/personal_access_tokens/self", headers=headers)
+        if response.status_code == 200:
+            info = response.json()
+            if info.get("active"):
+                status = "valid"
+            else:
+                status = "revoked" if info.get("revoked") else "expired"
+            return {"status": status, "expires_at": provider_expiry(info.get("expires_at"))}
+        if response.status_code == 401:
+            return {"status": lapsed_status(metadata), "expires_at": None}
+        raise Exception(f"GitLab token check failed: {response.status_code} - {response.text}")
+    
+    def fetch_scopes(self) -> List[str]:
+        """Ask the instance for its version and return the scopes that version accepts."""
+        self._authenticate()
+        
+        headers = {"PRIVATE-TOKEN": self.access_token}
+        response = self.client.get(f"{self.base_url}/api/v4/version", headers=headers)
+        if response.status_code != 200:
+            raise Exception(f"GitLab scope lookup failed: {response.status_code} - {response.text}")
+        return gitlab_scopes(response.json().get("version"))
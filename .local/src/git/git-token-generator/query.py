@@ -0,0 +1,168 @@
+"""
+Query - Select vault entries by platform, name, host, scopes and date ranges.
+
+A TokenQuery is evaluated on metadata only, so selecting tokens never decrypts
+anything. Each storage backend runs it the fastest way it can: SQLite as a
+WHERE clause over its indexed columns (TokenQuery.sql), the JSON backends by
+narrowing to the smallest matching range of an in-memory index before
+checking the remaining conditions (TokenQuery.matches).
+
+Timestamps are ISO strings and compared as strings. "after" bounds are
+inclusive and "before" bounds exclusive, so --created-after 2026-11-01
+--created-before 2026-12-01 selects exactly November. Tokens that never
+expire match no expiry bound.
+"""
+
+import re
+import fnmatch
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def parse_timestamp(value: str) -> str:
+    """Normalize a date or ISO timestamp from the command line (argparse type)."""
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date or timestamp: {value!r}")
+
+
+def glob_prefix(pattern: str) -> str:
+    """The literal text a glob starts with, before its first wildcard."""
+    match = re.search(r"[*?\[]", pattern)
+    return pattern[:match.start()] if match else pattern
+
+
+class TokenQuery:
+    """Conditions on vault metadata; an entry matches when it meets all of them."""
+
+    def __init__(self, platform: Optional[str] = None, name: Optional[str] = None, pattern: Optional[str] = None,
+                 scopes: Optional[List[str]] = None, expires_after: Optional[str] = None,
+                 expires_before: Optional[str] = None, created_after: Optional[str] = None,
+                 created_before: Optional[str] = None, host: Optional[str] = None):
+        """
+        Initialize the query.
+
+        Args:
+            platform: Exact platform
+            name: Exact name
+            pattern: Shell-style glob the name must match (case-sensitive)
+            scopes: Scopes the token must all have
+            expires_after: Expires at or after this ISO timestamp
+            expires_before: Expires before this ISO timestamp
+            created_after: Created at or after this ISO timestamp
+            created_before: Created before this ISO timestamp
+            host: Exact host the token was generated on (see fanout.py)
+        """
+        self.platform = platform
+        self.name = name
+        self.pattern = pattern
+        self.scopes = list(scopes or [])
+        self.expires_after = expires_after
+        self.expires_before = expires_before
+        self.created_after = created_after
+        self.created_before = created_before
+        self.host = host
+        self._pattern_match = re.compile(fnmatch.translate(pattern)).match if pattern is not None else None
+
+    def ranges(self) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """The (field, after, before) bounds set on timestamp fields."""
+        return [
+            (field, after, before)
+            for field, after, before in (
+                ("expires_at", self.expires_after, self.expires_before),
+                ("created_at", self.created_after, self.created_before),
+            )
+            if after is not None or before is not None
+        ]
+
+    def is_empty(self) -> bool:
+        """Whether the query matches every entry."""
+        return not (self.platform or self.name is not None or self.pattern is not None or self.scopes
+                    or self.host or self.ranges())
+
+    def matches(self, platform: str, entry: Dict[str, Any]) -> bool:
+        """Whether a vault entry meets every condition."""
+        if self.platform and platform != self.platform:
+            return False
+        if self.name is not None and entry["name"] != self.name:
+            return False
+        if self._pattern_match is not None and not self._pattern_match(entry["name"]):
+            return False
+        if self.host and entry.get("host") != self.host:
+            return False
+        if self.scopes:
+            scopes = entry.get("scopes") or ()
+            if any(scope not in scopes for scope in self.scopes):
+                return False
+        for field, after, before in self.ranges():
+            value = entry.get(field)
+            if not value or (after is not None and value < after) or (before is not None and value >= before):
+                return False
+        return True
+
+    def sql(self) -> Tuple[str, List[Any]]:
+        """Build a WHERE clause (empty if nothing is set) and its parameters for the tokens table."""
+        clauses, params = [], []
+        if self.platform:
+            clauses.append("platform = ?")
+            params.append(self.platform)
+        if self.name is not None:
+            clauses.append("name = ?")
+            params.append(self.name)
+        if self.pattern is not None:
+            # SQLite negates a character class with ^ where fnmatch uses !
+            clauses.append("name GLOB ?")
+            params.append(self.pattern.replace("[!", "[^"))
+        if self.host:
+            # Uncommon fields like host live in the extra JSON column
+            clauses.append("json_extract(extra, '$.host') = ?")
+            params.append(self.host)
+        for scope in self.scopes:
+            clauses.append("EXISTS (SELECT 1 FROM json_each(tokens.scopes) WHERE json_each.value = ?)")
+            params.append(scope)
+        for field, after, before in self.ranges():
+            # Leaves out NULL and empty timestamps, like matches()
+            clauses.append(f"{field} > ''")
+            if after is not None:
+                clauses.append(f"{field} >= ?")
+                params.append(after)
+            if before is not None:
+                clauses.append(f"{field} < ?")
+                params.append(before)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def add_query_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the glob, host, scope and date filters shared by the listing and delete commands."""
+    parser.add_argument("--glob", action="store_true",
+                        help="Match --name as a shell-style glob such as 'ci-*' instead of an exact name")
+    parser.add_argument("--host", help="Only tokens generated on this host (e.g. gitlab.example.com)")
+    parser.add_argument("--scope", action="append", metavar="SCOPE",
+                        help="Only tokens with this scope (repeat to require several)")
+    parser.add_argument("--expires-before", type=parse_timestamp, metavar="DATE",
+                        help="Only tokens expiring before this date or ISO timestamp")
+    parser.add_argument("--expires-after", type=parse_timestamp, metavar="DATE",
+                        help="Only tokens expiring at or after this date or ISO timestamp")
+    parser.add_argument("--created-before", type=parse_timestamp, metavar="DATE",
+                        help="Only tokens created before this date or ISO timestamp")
+    parser.add_argument("--created-after", type=parse_timestamp, metavar="DATE",
+                        help="Only tokens created at or after this date or ISO timestamp")
+
+
+def query_from_args(args: argparse.Namespace) -> TokenQuery:
+    """Build a TokenQuery from --platform, --name (a glob with --glob) and the query arguments."""
+    name = getattr(args, "name", None)
+    is_glob = name is not None and args.glob
+    return TokenQuery(
+        platform=getattr(args, "platform", None),
+        name=None if is_glob else name,
+        pattern=name if is_glob else None,
+        scopes=args.scope,
+        expires_after=args.expires_after,
+        expires_before=args.expires_before,
+        created_after=args.created_after,
+        created_before=args.created_before,
+        host=args.host,
+    )
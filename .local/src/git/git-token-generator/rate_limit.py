@@ -0,0 +1,310 @@
+"""
+Rate Limit - Per-host request pacing and retry with backoff for provider APIs.
+
+Each host gets a token bucket, paced by an optional configured rate and by the
+rate-limit headers the provider sends back:
+
+- GitHub: X-RateLimit-Remaining / X-RateLimit-Reset (epoch seconds)
+- GitLab: RateLimit-Remaining / RateLimit-Reset (epoch seconds, or a delta)
+- Any: Retry-After (seconds or an HTTP date)
+
+so a run spends exactly the budget the provider reports and then waits for the
+window to reset, instead of overrunning it and stalling on 429s. Transient failures are
+retried with jittered exponential backoff, honouring Retry-After when the
+provider gives one. Which failures count depends on the request: an idempotent
+one (GET, DELETE) is retried on rate limits (429, GitHub's rate-limit 403s),
+gateway errors (502/503/504) and any connection failure, but a POST, which may
+mint a token, only where the provider cannot have acted on it: rate limits, a
+503 with Retry-After, and a connection that was never made.
+"""
+
+import time
+import random
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Mapping, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("git_token_generator")
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_BURST = 10
+
+# Statuses worth retrying an idempotent request on. A 502/504 from a proxy doesn't show the
+# origin never saw the request, so a POST is only retried on rate limits and a 503 with Retry-After.
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Methods that can be repeated without a second side effect
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def _parse_retry_after(value: str, now: float) -> Optional[float]:
+    """Parse a Retry-After value (seconds or HTTP date) into seconds from now."""
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit(headers: Mapping[str, str], now: Optional[float] = None) -> Dict[str, Optional[float]]:
+    """
+    Read a provider's rate-limit headers.
+
+    Args:
+        headers: Response headers (case-insensitive mapping)
+        now: Current wall-clock time, for converting epoch resets
+
+    Returns:
+        "limit" and "remaining" requests in the window, "reset_in" seconds until it
+        resets, and "retry_after" seconds; each is None if the provider didn't say
+    """
+    now = time.time() if now is None else now
+    info = {"limit": None, "remaining": None, "reset_in": None, "retry_after": None}
+
+    for prefix in ("X-RateLimit-", "RateLimit-"):
+        if headers.get(prefix + "Remaining") is None:
+            continue
+        try:
+            info["remaining"] = int(headers[prefix + "Remaining"])
+            if headers.get(prefix + "Limit"):
+                info["limit"] = int(headers[prefix + "Limit"])
+            reset = float(headers.get(prefix + "Reset", ""))
+            # Large values are epoch timestamps, small ones are deltas (IETF draft style)
+            info["reset_in"] = max(0.0, reset - now) if reset > 1e9 else reset
+        except ValueError:
+            pass
+        break
+
+    if headers.get("Retry-After"):
+        info["retry_after"] = _parse_retry_after(headers["Retry-After"], now)
+    return info
+
+
+class TokenBucket:
+    """
+    Thread-safe request budget for one host.
+
+    Two limits apply. The configured rate is a classic token bucket (rate per
+    second, up to burst back-to-back) for caps the provider doesn't advertise,
+    such as GitHub's secondary limits. On top of that, once the provider reports
+    its window, the bucket holds exactly the requests it says remain (less those
+    already in flight) and stops handing out slots until the window resets, so a
+    long run uses the whole budget without tripping the primary limit. The very
+    first request to a host goes out alone, so that the rest start with the
+    window known rather than as a blind burst.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: int = DEFAULT_BURST):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Requests per second, or None for no cap beyond the provider's window
+            burst: Requests that may go out back-to-back before the rate applies
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._window_limit = None
+        self._window_length = 0.0
+        self._window_remaining = None
+        self._window_reset = 0.0
+        self._probed = False
+        self._lock = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Reserve the next request slot, sleeping until it comes up.
+
+        Every acquire must be followed by observe() once the request completes.
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            while not self._probed and self._in_flight:
+                self._lock.wait()
+
+            now = time.monotonic()
+            start = max(now, self._blocked_until)
+
+            if self._window_remaining is not None:
+                if self._window_remaining <= 0:
+                    start = max(start, self._window_reset)
+                if start >= self._window_reset:
+                    # Assume the next window looks like the last one until a response says otherwise
+                    self._window_reset = start + self._window_length
+                    self._window_remaining = self._window_limit
+                if self._window_remaining is not None:
+                    self._window_remaining -= 1
+
+            if self.rate:
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    start = max(start, now - self._tokens / self.rate)
+
+            self._in_flight += 1
+            wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, info: Optional[Dict[str, Optional[float]]] = None) -> None:
+        """Release a slot and update the budget from what the provider reported."""
+        info = info or {}
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if info and not self._probed:
+                self._probed = True
+            self._lock.notify_all()
+            now = time.monotonic()
+            if info.get("retry_after") is not None:
+                self._blocked_until = max(self._blocked_until, now + info["retry_after"])
+
+            remaining, reset_in = info.get("remaining"), info.get("reset_in")
+            if remaining is None or reset_in is None:
+                return
+            if info.get("limit"):
+                self._window_limit = int(info["limit"])
+            self._window_length = max(self._window_length, reset_in)
+
+            # Requests still in flight were counted by neither the provider nor this response
+            available = remaining - self._in_flight
+            reset = now + reset_in
+            if self._window_remaining is not None and abs(reset - self._window_reset) < 1.0:
+                self._window_remaining = min(self._window_remaining, available)
+            else:
+                self._window_remaining = available
+                self._window_reset = reset
+
+
+class RequestScheduler:
+    """Paces requests per host and retries transient failures with jittered backoff."""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, rate: Optional[float] = None,
+                 burst: int = DEFAULT_BURST, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_retries: Retries after the first attempt (0 disables retrying)
+            rate: Requests per second allowed per host before any headers are seen
+            burst: Back-to-back requests allowed per host
+            base_delay: First backoff step in seconds
+            max_delay: Longest single backoff in seconds
+        """
+        self.max_retries = max(0, max_retries)
+        self.rate = rate
+        self.burst = burst
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        """Return the token bucket for a host, creating it on first use."""
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    @staticmethod
+    def is_retryable(response: "requests.Response", idempotent: bool = True) -> bool:
+        """Whether a response is a transient failure worth retrying (only refusals for a non-idempotent request)."""
+        status = response.status_code
+        if status == 429 or (status == 503 and "Retry-After" in response.headers):
+            return True
+        if idempotent and status in RETRY_STATUSES:
+            return True
+        # GitHub signals primary and secondary rate limits with 403s, refusing the request
+        return status == 403 and (
+            response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+        )
+
+    @staticmethod
+    def never_connected(error: "requests.exceptions.ConnectionError") -> bool:
+        """Whether a connection error happened before the request was sent (refused, unresolved, timed out)."""
+        import requests
+        from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        if isinstance(reason, MaxRetryError):
+            reason = reason.reason
+        return isinstance(reason, NewConnectionError)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def send(self, host: str, send: Callable[[], "requests.Response"],
+             idempotent: bool = True) -> "requests.Response":
+        """
+        Send a request under the host's pace, retrying transient failures.
+
+        A non-idempotent request (a POST that mints a token) is only retried
+        where the provider cannot have acted on it: rate limits, a 503 with
+        Retry-After, and connections that were never made. A gateway error or a
+        connection dropped after the request went out may hide a created token,
+        so those are only retried for idempotent requests.
+
+        Args:
+            host: Host whose pace and retry budget the request counts against
+            send: Makes one attempt
+            idempotent: Whether repeating the request has no further effect (GET, DELETE)
+
+        Returns:
+            The final response, which may still be an error once retries run out
+        """
+        import requests
+
+        bucket = self.bucket(host)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                response = send()
+            except requests.exceptions.ConnectionError as e:
+                bucket.observe()
+                # Read timeouts are not ConnectionErrors, so are never repeated; a dropped
+                # connection is only repeated if the request can't have been sent
+                if attempt >= self.max_retries or not (idempotent or self.never_connected(e)):
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"Connection to {host} failed ({e}), retrying in {delay:.1f}s")
+            except BaseException:
+                bucket.observe()
+                raise
+            else:
+                info = parse_rate_limit(response.headers)
+                bucket.observe(info)
+                if not self.is_retryable(response, idempotent) or attempt >= self.max_retries:
+                    return response
+                delay = self.backoff(attempt, info["retry_after"])
+                logger.warning(f"{host} returned {response.status_code}, retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1} of {self.max_retries})")
+
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,172 @@
+"""
+Rekey - Move the vault to a new encryption key without taking it offline.
+
+key.key holds one Fernet key per line, the first one encrypting (rekey needs
+the file key source; see key_provider.py). A rekey puts a fresh key in front
+of the current ones, so every process decrypts with a MultiFernet and keeps
+reading the vault while entries are converted, and anything saved meanwhile
+is already under the new key. Entries are then
+re-encrypted with MultiFernet.rotate in chunks, each chunk its own vault
+transaction: other writers get the lock between chunks, and memory stays
+bounded by the chunk size (plus the loaded vault on the JSON backends, which
+rewrite the whole snapshot per chunk and so get fewer, larger chunks).
+
+Progress is saved to rekey.json after every chunk. Every step is atomic
+(vault transactions, key and state files replaced by rename) and rotating an
+entry twice is harmless, so a rekey interrupted at any point is finished by
+running it again. The old keys are dropped only at the end, once a single
+locked transaction has checked that every entry decrypts with the new key and
+converted any the chunks missed (entries shifted by concurrent deletes).
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from decryption import decrypt_stream, rotate_value
+from token_store import CONFIG_DIR, JsonTokenStore, TokenManager, file_lock
+
+logger = logging.getLogger("git_token_generator")
+
+REKEY_STATE_FILE = CONFIG_DIR / "rekey.json"
+
+# Entries re-encrypted per transaction
+DEFAULT_CHUNK_SIZE = 1000
+# The JSON backends rewrite the whole vault per chunk, so they split it into at most this many
+JSON_MAX_CHUNKS = 10
+
+Progress = Callable[[int, int], None]
+
+
+def key_fingerprint(key: bytes) -> str:
+    """Identify a key in the state file without storing it."""
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def load_state() -> Optional[Dict[str, Any]]:
+    """Read the progress of an unfinished rekey (None if there is none)."""
+    if not REKEY_STATE_FILE.exists():
+        return None
+    with open(REKEY_STATE_FILE, "r") as f:
+        return json.load(f)
+
+
+def save_state(state: Dict[str, Any]) -> None:
+    """Replace the state file atomically."""
+    fd, tmp_name = tempfile.mkstemp(dir=REKEY_STATE_FILE.parent, prefix=".rekey-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, REKEY_STATE_FILE)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def start_rekey(token_manager: TokenManager) -> Dict[str, Any]:
+    """
+    Put a new key in front of the current ones, or pick up an unfinished rekey.
+
+    The state is saved before the key file is replaced; a state file whose key
+    is not the first in key.key is a rekey that never got its key in, and is
+    started over.
+    """
+    from cryptography.fernet import Fernet
+
+    provider = token_manager.keys
+    provider.refresh()
+    keys = provider.keys()
+    state = load_state()
+    if state is not None and state.get("key") == key_fingerprint(keys[0]):
+        logger.info(f"Resuming rekey at entry {state['position']}")
+        return state
+
+    if state is None and len(keys) > 1:
+        # Keys were added by hand: convert the vault to the first one
+        state = {"key": key_fingerprint(keys[0]), "position": 0, "started_at": datetime.now().isoformat()}
+        save_state(state)
+        return state
+
+    key = Fernet.generate_key()
+    state = {"key": key_fingerprint(key), "position": 0, "started_at": datetime.now().isoformat()}
+    save_state(state)
+    provider.save([key] + keys)
+    logger.info(f"Added a new key to {provider}; {len(keys)} old key(s) kept until the vault is converted")
+    return state
+
+
+def rekey(token_manager: TokenManager, chunk_size: Optional[int] = None, workers: Optional[int] = None,
+          progress: Optional[Progress] = None) -> Dict[str, int]:
+    """
+    Re-encrypt the whole vault under a new key, resuming an interrupted run.
+
+    Args:
+        token_manager: Token manager for the vault
+        chunk_size: Entries per transaction (default: DEFAULT_CHUNK_SIZE, fewer
+            chunks on the JSON backends)
+        workers: Worker processes for the final check of large vaults
+        progress: Called with (entries done, total) after every chunk
+
+    Returns:
+        Counts of "total" entries checked at the end and "unreadable" ones that
+        no key could decrypt (left as they are; see TokenManager.quarantine)
+    """
+    from cryptography.fernet import Fernet, MultiFernet
+
+    store = token_manager.store
+    if not token_manager.keys.writable:
+        raise ValueError(f"Cannot rekey: keys from {token_manager.keys} are read-only; rekey needs a key file")
+    with file_lock(REKEY_STATE_FILE.with_suffix(".lock")):
+        state = start_rekey(token_manager)
+        keys = token_manager.keys.keys()
+        cipher = MultiFernet([Fernet(key) for key in keys])
+        total = store.count()
+        if chunk_size is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+            if isinstance(store, JsonTokenStore):
+                chunk_size = max(chunk_size, -(-total // JSON_MAX_CHUNKS))
+
+        while True:
+            with store.transaction():
+                rows = list(store.iterate(offset=state["position"], limit=chunk_size))
+                converted = {}
+                for plat, entry in rows:
+                    value, error = rotate_value(cipher, entry.get("token"))
+                    # Unreadable entries are reported by the final check
+                    if error is None:
+                        converted.setdefault(plat, []).append(dict(entry, token=value))
+                store.update_tokens(converted)
+            state["position"] += len(rows)
+            save_state(state)
+            if progress:
+                progress(min(state["position"], total), total)
+            if len(rows) < chunk_size:
+                break
+
+        # Nothing may still need an old key once they are gone
+        result = {"total": 0, "unreadable": 0}
+        with store.transaction():
+            missed = {}
+            items = ((row, row[1].get("token")) for row in store.iterate())
+            for (plat, entry), _, error in decrypt_stream(keys[:1], items, workers):
+                result["total"] += 1
+                if error is None:
+                    continue
+                value, error = rotate_value(cipher, entry.get("token"))
+                if error is None:
+                    missed.setdefault(plat, []).append(dict(entry, token=value))
+                else:
+                    logger.warning(f"Cannot re-encrypt {plat} token '{entry.get('name')}': {error}")
+                    token_manager.undecryptable.append((plat, entry, error))
+                    result["unreadable"] += 1
+            store.update_tokens(missed)
+        # Only once the converted vault is committed: until then the old keys must stay readable
+        token_manager.keys.save(keys[:1])
+        REKEY_STATE_FILE.unlink()
+    return result
@@ -0,0 +1,142 @@
+"""
+Rotation - Find tokens nearing expiry and re-mint them before they lapse.
+
+Due tokens come from the store's expiry index (TokenStore.expiring), so finding
+the k tokens expiring within a window costs O(log N + k) instead of a scan that
+parses every timestamp. Rotating re-mints each one through its generator with
+the same name, scopes and lifetime, and replaces the old entry in the same
+vault write (see generate_batch).
+
+The scheduler sleeps until the next token comes due instead of polling, waking
+at least every max_sleep seconds to pick up tokens added by other processes.
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from token_store import TokenStore
+
+logger = logging.getLogger("git_token_generator")
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_MAX_SLEEP = 6 * 3600
+# Delay before retrying a token whose rotation failed
+DEFAULT_RETRY_DELAY = 300
+
+Due = Tuple[str, Dict[str, Any]]
+
+
+def entry_key(platform: str, entry: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """Identify a vault entry across reads."""
+    return platform, entry["name"], entry.get("created_at")
+
+
+def due_tokens(store: TokenStore, within: timedelta, platform: Optional[str] = None,
+               now: Optional[datetime] = None) -> List[Due]:
+    """Return (platform, entry) for every token expiring within the window, soonest first."""
+    cutoff = ((now or datetime.now()) + within).isoformat()
+    due = store.expiring(before=cutoff)
+    if platform:
+        due = [(plat, entry) for plat, entry in due if plat == platform]
+    return due
+
+
+def lifetime_days(entry: Dict[str, Any]) -> int:
+    """The token's original lifetime in whole days (at least 1), from created_at to expires_at."""
+    try:
+        lifetime = datetime.fromisoformat(entry["expires_at"]) - datetime.fromisoformat(entry["created_at"])
+    except (KeyError, TypeError, ValueError):
+        return 30
+    return max(1, round(lifetime.total_seconds() / 86400))
+
+
+def rotation_entries(due: List[Due], within: timedelta, expiration: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Build generate_batch entries that re-mint due tokens.
+
+    Args:
+        due: Tokens to rotate, as returned by due_tokens
+        within: Rotation window; new tokens always outlive it by at least a day,
+            so a rotated token is never immediately due again
+        expiration: Lifetime in days for the new tokens (defaults to each token's original lifetime)
+
+    Returns:
+        Entries with platform, name, scopes, expiration, base_url, host,
+        secret_env and the "replaces" entry to remove once the new token is stored
+    """
+    minimum = within.days + 1
+    entries = []
+    for platform, entry in due:
+        entries.append({
+            "platform": platform,
+            "name": entry["name"],
+            "scopes": list(entry.get("scopes") or []),
+            "expiration": max(minimum, expiration or lifetime_days(entry)),
+            "base_url": entry.get("base_url"),
+            "host": entry.get("host"),
+            "secret_env": entry.get("secret_env"),
+            "replaces": {key: value for key, value in entry.items() if key != "token"},
+        })
+    return entries
+
+
+def run_schedule(store: TokenStore, within: timedelta, rotate: Callable[[List[Due]], List[Dict[str, Any]]],
+                 platform: Optional[str] = None, max_sleep: float = DEFAULT_MAX_SLEEP,
+                 retry_delay: float = DEFAULT_RETRY_DELAY, sleep: Callable[[float], Any] = time.sleep,
+                 iterations: Optional[int] = None) -> None:
+    """
+    Rotate tokens as they come due, sleeping in between.
+
+    Args:
+        store: Vault to watch
+        within: Rotate tokens this long before they expire
+        rotate: Rotates a list of due tokens and returns one result per token
+            ("error" set on failure), e.g. generate_batch over rotation_entries
+        platform: Only rotate this platform's tokens
+        max_sleep: Longest single sleep, bounding how late a newly added token is noticed
+        retry_delay: Seconds to wait before retrying a failed rotation
+        sleep: Sleep function (replaceable for testing)
+        iterations: Stop after this many wake-ups (None runs forever)
+    """
+    retry_at = {}
+    while iterations is None or iterations > 0:
+        if iterations is not None:
+            iterations -= 1
+        store.refresh()
+        now = time.time()
+
+        waiting = set()
+        due = []
+        for plat, entry in due_tokens(store, within, platform):
+            key = entry_key(plat, entry)
+            if retry_at.get(key, 0) > now:
+                waiting.add(key)
+            else:
+                due.append((plat, entry))
+        # Forget failures for tokens that have since been rotated or deleted elsewhere
+        retry_at = {key: at for key, at in retry_at.items() if key in waiting}
+        if due:
+            logger.info(f"Rotating {len(due)} tokens")
+            for (plat, entry), result in zip(due, rotate(due)):
+                key = entry_key(plat, entry)
+                if "error" in result:
+                    retry_at[key] = now + retry_delay
+                else:
+                    retry_at.pop(key, None)
+            store.refresh()
+
+        wake = min([now + max_sleep, *retry_at.values()])
+        # The soonest expiries are first in the index; skip past tokens waiting for a retry
+        for plat, entry in store.expiring(limit=None if platform else len(retry_at) + 1):
+            if (platform and plat != platform) or entry_key(plat, entry) in retry_at:
+                continue
+            due_at = datetime.fromisoformat(entry["expires_at"]) - within
+            wake = min(wake, max(now, due_at.timestamp()))
+            break
+
+        delay = max(0.0, wake - time.time())
+        if iterations is None or iterations > 0:
+            logger.info(f"Next rotation check at {datetime.fromtimestamp(wake).isoformat(timespec='seconds')}")
+            sleep(delay)
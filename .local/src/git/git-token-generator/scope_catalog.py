@@ -0,0 +1,175 @@
+"""
+Scope Catalog - Check requested token scopes locally, before any provider call.
+
+A provider only reports a misspelled scope as a 4xx after a full round trip,
+and in a batch only after every other request ahead of it. The catalog knows
+each platform's scope names, so generate and generate-batch reject an unknown
+scope up front (suggesting the closest known one) and spend no network time on
+a request that can't succeed.
+
+Each provider's SCOPES hold the scopes every instance accepts. Refreshing asks
+the provider for more (see its fetch_scopes): GitHub reports the scopes of the
+authenticated credentials in its X-OAuth-Scopes header, and a GitLab instance's
+version decides which newer scopes it knows (the others publish nothing, so
+their lists are fixed).
+Fetched scopes are cached in scopes.json per platform and API URL and added to
+the built-in list; --refresh-scopes only fetches them again once the cached
+ones are older than the TTL.
+"""
+
+import os
+import json
+import time
+import difflib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from providers import load_provider
+from token_store import CONFIG_DIR
+
+logger = logging.getLogger("git_token_generator")
+
+SCOPE_CACHE_FILE = CONFIG_DIR / "scopes.json"
+
+# Seconds fetched scopes are used before --refresh-scopes fetches them again
+DEFAULT_SCOPE_TTL = 24 * 3600
+
+
+class ScopeCatalog:
+    """Known scopes per platform and instance: the built-in lists plus any fetched from providers."""
+
+    def __init__(self, cache_file: Path = SCOPE_CACHE_FILE, ttl: float = DEFAULT_SCOPE_TTL):
+        """
+        Initialize the catalog; the cache file is read on first use.
+
+        Args:
+            cache_file: JSON cache of fetched scopes
+            ttl: Seconds before fetched scopes are considered stale
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._cache = None
+        # Known scopes by cache key, built once per catalog
+        self._known: Dict[str, FrozenSet[str]] = {}
+
+    @staticmethod
+    def _key(platform: str, base_url: Optional[str]) -> str:
+        """Cache key of a platform instance (the platform alone for its default API)."""
+        return f"{platform} {base_url}" if base_url else platform
+
+    def _entries(self) -> Dict[str, Dict[str, Any]]:
+        """The cached fetches, read from disk on first use; a missing or unreadable cache is empty."""
+        if self._cache is None:
+            self._cache = self._read()
+        return self._cache
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Read the cache file."""
+        try:
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable scope cache {self.cache_file}: {e}")
+            return {}
+
+    def scopes(self, platform: str, base_url: Optional[str] = None) -> List[str]:
+        """
+        List the known scopes of a platform instance.
+
+        Args:
+            platform: Platform name
+            base_url: API URL of the instance (None for the platform's default)
+
+        Returns:
+            The built-in scopes followed by any fetched ones they don't include
+        """
+        scopes = list(load_provider(platform).SCOPES)
+        cached = self._entries().get(self._key(platform, base_url))
+        if cached:
+            builtin = set(scopes)
+            scopes += [scope for scope in cached["scopes"] if scope not in builtin]
+        return scopes
+
+    def is_stale(self, platform: str, base_url: Optional[str] = None) -> bool:
+        """Whether the instance's scopes were never fetched, or were fetched longer than the TTL ago."""
+        cached = self._entries().get(self._key(platform, base_url))
+        return cached is None or time.time() - cached["fetched_at"] >= self.ttl
+
+    def store(self, platform: str, base_url: Optional[str], scopes: List[str]) -> None:
+        """Cache fetched scopes, replacing the cache file atomically (write to temp, rename)."""
+        key = self._key(platform, base_url)
+        # Re-read so fetches cached by other processes meanwhile are kept
+        self._cache = self._read()
+        self._cache[key] = {"fetched_at": time.time(), "scopes": list(scopes)}
+        self._known.pop(key, None)
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_file.parent, prefix=".scopes-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._cache, f, indent=2)
+            os.replace(tmp_name, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def refresh(self, platform: str, base_url: Optional[str], fetch: Callable[[], List[str]],
+                force: bool = False) -> List[str]:
+        """
+        Fetch an instance's scopes if the cached ones are stale, and return the known scopes.
+
+        Args:
+            platform: Platform name
+            base_url: API URL of the instance (None for the platform's default)
+            fetch: Asks the provider for its scopes (a generator's fetch_scopes)
+            force: Fetch even if the cached scopes are fresh
+        """
+        if force or self.is_stale(platform, base_url):
+            self.store(platform, base_url, fetch())
+        return self.scopes(platform, base_url)
+
+    def check(self, platform: str, scopes: List[str], base_url: Optional[str] = None) -> List[str]:
+        """
+        Check requested scopes against the known ones.
+
+        Args:
+            platform: Platform name
+            scopes: Requested scopes
+            base_url: API URL of the instance (None for the platform's default)
+
+        Returns:
+            One message per unknown scope, with the closest known scope if there is one
+        """
+        key = self._key(platform, base_url)
+        known = self._known.get(key)
+        if known is None:
+            known = self._known[key] = frozenset(self.scopes(platform, base_url))
+
+        problems = []
+        for scope in scopes:
+            if scope in known:
+                continue
+            close = difflib.get_close_matches(scope, sorted(known), n=1)
+            hint = f" (did you mean {close[0]!r}?)" if close else ""
+            problems.append(f"unknown scope {scope!r}{hint}")
+        return problems
+
+    def check_entries(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Check the scopes of every manifest entry.
+
+        Args:
+            entries: Entries as returned by load_manifest
+
+        Returns:
+            One message per unknown scope, naming the token it was requested for
+        """
+        problems = []
+        for entry in entries:
+            for problem in self.check(entry["platform"], entry["scopes"], entry.get("base_url")):
+                problems.append(f"{entry['platform']} token {entry['name']!r}: {problem}")
+        return problems
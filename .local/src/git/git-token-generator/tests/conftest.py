@@ -0,0 +1,58 @@
+"""
+Shared fixtures for the git-token-generator tests.
+
+The tool's modules read GIT_TOKEN_CONFIG_DIR when they are imported, so it is
+pointed at a throwaway directory before any of them is; every test then keeps
+its own vault and key under tmp_path.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOL_DIR))
+sys.path.insert(0, str(TOOL_DIR / "benchmarks"))
+
+os.environ["GIT_TOKEN_CONFIG_DIR"] = tempfile.mkdtemp(prefix="git-token-tests-")
+for variable in ("GIT_TOKEN_STORAGE", "GIT_TOKEN_KEY_SOURCE", "GIT_TOKEN_METRICS"):
+    os.environ.pop(variable, None)
+
+BACKENDS = ["json", "journal", "sqlite", "binary"]
+
+
+def open_test_store(backend: str, directory: Path):
+    """Open a storage backend with its files in directory."""
+    import token_store
+
+    if backend == "sqlite":
+        return token_store.SqliteTokenStore(directory / "tokens.db")
+    if backend == "binary":
+        return token_store.BinaryTokenStore(directory / "tokens.vault")
+    return token_store.JsonTokenStore(directory / "tokens.json", journal=backend == "journal")
+
+
+def open_test_manager(backend: str, directory: Path):
+    """Open a TokenManager whose vault and key live in directory."""
+    from token_store import TokenManager
+
+    token_manager = TokenManager(backend, key_source=f"file:{directory / 'key.key'}")
+    token_manager.store = open_test_store(backend, directory)
+    return token_manager
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request) -> str:
+    """Each storage backend in turn."""
+    return request.param
+
+
+@pytest.fixture
+def token_manager(backend, tmp_path):
+    """A TokenManager on an empty vault of the backend under test."""
+    token_manager = open_test_manager(backend, tmp_path)
+    yield token_manager
+    token_manager.store.close()
@@ -0,0 +1,108 @@
+"""Tests for the git credential helper: choosing a token, the per-user cache, and starting one daemon."""
+
+import io
+import threading
+import time
+
+from conftest import open_test_manager
+from credential_helper import (CredentialCache, erase_credential, lookup, query_cache, run_helper, serve_cache,
+                               store_credential)
+
+
+def test_lookup_prefers_the_host_then_the_newest_unexpired(token_manager):
+    token_manager.save_token("github", "ghp_old", "old", ["repo"])
+    token_manager.save_token("github", "ghp_new", "new", ["repo"])
+    token_manager.save_token("github", "ghp_expired", "expired", ["repo"], expires_at="2000-01-01T00:00:00")
+    token_manager.save_token("gitlab", "glpat_self_hosted", "ci", ["api"], extra={"host": "git.example.com"})
+    token_manager.save_token("gitlab", "glpat_other", "ci", ["api"], extra={"host": "other.example.com"})
+
+    assert lookup(token_manager, "github.com") == {"username": "x-access-token", "password": "ghp_new"}
+    assert lookup(token_manager, "git.example.com")["password"] == "glpat_self_hosted"
+    assert lookup(token_manager, "unknown.example.com") is None
+
+
+def test_lookup_uses_indexed_queries(token_manager, backend):
+    token_manager.save_token("github", "ghp_one", "one", ["repo"])
+    token_manager.save_token("gitlab", "glpat_two", "two", ["api"], extra={"host": "git.example.com"})
+
+    def full_scan(*args, **kwargs):
+        raise AssertionError("lookup read the whole vault")
+
+    token_manager.store.refresh()
+    token_manager.store.query = full_scan
+    assert lookup(token_manager, "github.com")["password"] == "ghp_one"
+    assert lookup(token_manager, "git.example.com")["password"] == "glpat_two"
+    if backend == "binary":
+        # Both answered from tokens.vault's indexes, without loading it
+        assert token_manager.store._data is None
+
+
+def test_stored_credentials_are_kept_per_user(token_manager):
+    for username, password in (("alice", "pw-alice"), ("bob", "pw-bob")):
+        assert store_credential(token_manager, {"host": "github.com", "username": username, "password": password})
+    assert not store_credential(token_manager, {"host": "github.com", "username": "bob", "password": "pw-bob"})
+
+    assert lookup(token_manager, "github.com", "alice") == {"username": "alice", "password": "pw-alice"}
+    assert lookup(token_manager, "github.com", "bob") == {"username": "bob", "password": "pw-bob"}
+
+    assert erase_credential(token_manager, {"host": "github.com", "username": "alice", "password": "wrong"}) == 0
+    assert erase_credential(token_manager, {"host": "github.com", "username": "alice"}) == 1
+    assert lookup(token_manager, "github.com", "alice") is None
+    assert lookup(token_manager, "github.com", "bob")["password"] == "pw-bob"
+
+
+def test_cache_is_keyed_by_protocol_host_and_username():
+    cache = CredentialCache(ttl=60)
+    cache.put(("https", "github.com", "alice"), {"username": "alice", "password": "a"})
+    cache.put(("https", "github.com", "bob"), {"username": "bob", "password": "b"})
+    assert cache.get(("https", "github.com", "bob"))["password"] == "b"
+    assert cache.get(("https", "github.com", "")) is None
+    assert cache.get(("http", "github.com", "alice")) is None
+
+    cache.erase(("https", "github.com", "alice"))
+    assert cache.get(("https", "github.com", "alice")) is None
+    assert cache.sweep() == 1
+    cache.erase(("https", "github.com", ""))
+    assert cache.sweep() == 0
+
+
+def start_daemon(socket_path):
+    """Run serve_cache on a thread and wait until it answers."""
+    thread = threading.Thread(target=serve_cache, args=(socket_path, 60.0), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while query_cache({"action": "ping"}, socket_path) is None:
+        assert time.monotonic() < deadline, "cache daemon did not start"
+        time.sleep(0.01)
+    return thread
+
+
+def test_a_second_daemon_leaves_the_first_one_serving(tmp_path):
+    socket_path = tmp_path / "cache" / "socket"
+    first = start_daemon(socket_path)
+    try:
+        query_cache({"action": "store", "protocol": "https", "host": "github.com", "username": "alice",
+                     "credential": {"username": "alice", "password": "a"}}, socket_path)
+        # Returns at once instead of replacing the live daemon's socket
+        serve_cache(socket_path, 60.0)
+        reply = query_cache({"action": "get", "protocol": "https", "host": "github.com", "username": "alice"},
+                            socket_path)
+        assert reply["credential"]["password"] == "a"
+        reply = query_cache({"action": "get", "protocol": "https", "host": "github.com", "username": "bob"},
+                            socket_path)
+        assert reply["credential"] is None
+    finally:
+        query_cache({"action": "exit"}, socket_path)
+        first.join(5)
+    assert not first.is_alive()
+    assert not socket_path.exists()
+
+
+def test_helper_answers_git(tmp_path, monkeypatch):
+    token_manager = open_test_manager("json", tmp_path)
+    token_manager.save_token("github", "ghp_value", "ci", ["repo"])
+    monkeypatch.setattr("credential_helper.TokenManager", lambda *args: open_test_manager("json", tmp_path))
+
+    stdout = io.StringIO()
+    run_helper("get", stdin=io.StringIO("protocol=https\nhost=github.com\n\n"), stdout=stdout)
+    assert stdout.getvalue() == "username=x-access-token\npassword=ghp_value\n"
@@ -0,0 +1,140 @@
+"""Tests for BoundedExecutor and generate_batch, driven against the mock provider."""
+
+import logging
+import threading
+import time
+
+import pytest
+
+from conftest import open_test_manager
+from executor import BoundedExecutor, parse_limits
+from http_client import HttpClient
+from mock_provider import start_mock_server
+
+CREDENTIALS = {
+    "username": "test",
+    "password": "test",
+    "client_id": "test",
+    "client_secret": "test",
+    "access_token": "test",
+}
+
+
+@pytest.fixture
+def mock_server():
+    """Start a mock provider with a little latency, so concurrent requests overlap."""
+    logging.disable(logging.INFO)
+    servers = []
+
+    def start(**options):
+        server, base_urls = start_mock_server(options.pop("latency", 0.05), **options)
+        servers.append(server)
+        return server.RequestHandlerClass, base_urls
+
+    yield start
+    for server in servers:
+        server.shutdown()
+    logging.disable(logging.NOTSET)
+
+
+def batch_entries(base_urls, names, platforms=("github", "gitlab")):
+    """Manifest entries for names, alternating between platforms."""
+    return [{"platform": platforms[i % len(platforms)], "name": name, "scopes": ["repo"], "expiration": 30,
+             "base_url": base_urls[platforms[i % len(platforms)]]} for i, name in enumerate(names)]
+
+
+def run_batch(entries, tmp_path, executor):
+    """Run generate_batch into a fresh JSON vault; returns the results and the vault."""
+    import git_token_generator
+
+    token_manager = open_test_manager("json", tmp_path)
+    client = HttpClient(pool_size=executor.max_workers)
+    try:
+        results = git_token_generator.generate_batch(entries, token_manager, CREDENTIALS, executor, client)
+    finally:
+        client.close()
+    return results, token_manager
+
+
+def test_interleave_round_robins_keys():
+    jobs = [(key, None) for key in ["a", "a", "a", "b", "c", "c"]]
+    assert BoundedExecutor._interleave(jobs) == [0, 3, 4, 1, 5, 2]
+
+
+def test_run_caps_each_key_and_keeps_job_order():
+    in_flight, peaks = {}, {}
+    lock = threading.Lock()
+
+    def job(key, i):
+        with lock:
+            in_flight[key] = in_flight.get(key, 0) + 1
+            peaks[key] = max(peaks.get(key, 0), in_flight[key])
+        time.sleep(0.02)
+        with lock:
+            in_flight[key] -= 1
+        if i == 3:
+            raise RuntimeError("boom")
+        return i
+
+    keys = ["slow"] * 8 + ["fast"] * 8
+    outcomes = BoundedExecutor(16, {"slow": 2}, default_limit=4).run(
+        [(key, lambda key=key, i=i: job(key, i)) for i, key in enumerate(keys)])
+    assert peaks == {"slow": 2, "fast": 4}
+    assert [result for result, _, _ in outcomes] == [None if i == 3 else i for i in range(16)]
+    assert str(outcomes[3][1]) == "boom"
+    assert all(error is None for i, (_, error, _) in enumerate(outcomes) if i != 3)
+
+
+def test_parse_limits():
+    assert parse_limits(["github=2", "gitlab.example.com=8"]) == {"github": 2, "gitlab.example.com": 8}
+    assert parse_limits(None) == {}
+    for value in ("github", "github=0", "github=x"):
+        with pytest.raises(ValueError):
+            parse_limits([value])
+
+
+def test_generate_batch_isolates_failures_and_keeps_order(mock_server, tmp_path):
+    _, base_urls = mock_server()
+    names = [f"ci-{i}" if i % 5 else f"fail-{i}" for i in range(20)]
+    # Bitbucket never sees the name, so only it would mint the "fail" tokens
+    entries = batch_entries(base_urls, names, ["github", "gitlab", "gitea"])
+
+    results, token_manager = run_batch(entries, tmp_path, BoundedExecutor(8))
+    assert [result["name"] for result in results] == names
+    failed = [result["name"] for result in results if "error" in result]
+    assert failed == [name for name in names if name.startswith("fail")]
+    assert all(result["token"] for result in results if "error" not in result)
+
+    stored = {(platform, entry["name"]) for platform, entry in token_manager.store.iterate()}
+    assert stored == {(entry["platform"], entry["name"]) for entry in entries if "fail" not in entry["name"]}
+    for result in results[1:4]:
+        assert token_manager.get_token(result["platform"], result["name"]) == result["token"]
+
+
+def test_generate_batch_caps_concurrency_per_platform(mock_server, tmp_path):
+    handler, base_urls = mock_server()
+    entries = batch_entries(base_urls, [f"ci-{i}" for i in range(24)])
+
+    results, _ = run_batch(entries, tmp_path, BoundedExecutor(16, {"github": 2}, default_limit=5))
+    assert not [result for result in results if "error" in result]
+    assert handler.peaks["github"] == 2
+    assert 1 < handler.peaks["gitlab"] <= 5
+
+
+def test_generate_batch_caps_concurrency_per_host(mock_server, tmp_path):
+    first, first_urls = mock_server()
+    second, second_urls = mock_server()
+    entries = []
+    for i in range(12):
+        host, base_urls = ("one.example.com", first_urls) if i % 2 else ("two.example.com", second_urls)
+        entries.append({"platform": "gitlab", "name": "ci", "scopes": ["api"], "expiration": 30,
+                        "base_url": base_urls["gitlab"], "host": host})
+
+    results, token_manager = run_batch(entries, tmp_path,
+                                       BoundedExecutor(16, {"one.example.com": 1, "two.example.com": 3}))
+    assert not [result for result in results if "error" in result]
+    assert first.peaks["gitlab"] == 1
+    assert 1 < second.peaks["gitlab"] <= 3
+    # Each token is stored with the host it was minted on
+    assert sorted(entry["host"] for _, entry in token_manager.store.iterate()) == ["one.example.com"] * 6 + \
+        ["two.example.com"] * 6
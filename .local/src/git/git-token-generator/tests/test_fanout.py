@@ -0,0 +1,105 @@
+"""Tests for fanned-out tokens: each host's credential is kept in the vault and used to rotate and revoke them."""
+
+import logging
+import sys
+from datetime import timedelta
+
+import pytest
+
+import delete_tokens
+import git_token_generator
+from conftest import open_test_manager
+from fanout import HostClients, fanout_entries, host_generators
+from http_client import HttpClient
+from mock_provider import start_mock_server
+from providers.gitlab import GitLabTokenGenerator
+from rotation import rotation_entries
+
+
+@pytest.fixture
+def base_url():
+    """Start a mock provider; returns its GitLab API URL."""
+    logging.disable(logging.INFO)
+    server, base_urls = start_mock_server()
+    yield base_urls["gitlab"]
+    server.shutdown()
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def seen_tokens(monkeypatch):
+    """Record the access token every GitLab generator creates and revokes tokens with."""
+    seen = []
+    create_token, revoke_token = GitLabTokenGenerator.create_token, GitLabTokenGenerator.revoke_token
+
+    def recording_create(self, *args):
+        seen.append(("create", self.access_token))
+        return create_token(self, *args)
+
+    def recording_revoke(self, *args):
+        seen.append(("revoke", self.access_token))
+        return revoke_token(self, *args)
+
+    monkeypatch.setattr(GitLabTokenGenerator, "create_token", recording_create)
+    monkeypatch.setattr(GitLabTokenGenerator, "revoke_token", recording_revoke)
+    return seen
+
+
+def fan_out(base_url, tmp_path, monkeypatch):
+    """Generate one GitLab token on the mock's host, whose credential is in $HOST_TOKEN."""
+    monkeypatch.setenv("HOST_TOKEN", "host-secret")
+    entries = fanout_entries([{"platform": "gitlab", "name": "ci", "scopes": ["api"], "expiration": 30}],
+                             [(base_url, "HOST_TOKEN")])
+    token_manager = open_test_manager("json", tmp_path)
+    clients = HostClients(HttpClient)
+    generators = host_generators(entries, {}, clients)
+    results = git_token_generator.generate_batch(entries, token_manager, {}, generators=generators)
+    clients.close()
+    assert "error" not in results[0]
+    return token_manager
+
+
+def test_vault_keeps_secret_env(base_url, tmp_path, monkeypatch):
+    token_manager = fan_out(base_url, tmp_path, monkeypatch)
+    [(platform, entry)] = list(token_manager.iter_tokens())
+    assert entry["secret_env"] == "HOST_TOKEN"
+
+    [rotation] = rotation_entries([(platform, entry)], timedelta(days=7))
+    assert (rotation["host"], rotation["secret_env"]) == (entry["host"], "HOST_TOKEN")
+
+
+def test_rotate_uses_host_credential(base_url, tmp_path, monkeypatch, seen_tokens):
+    token_manager = fan_out(base_url, tmp_path, monkeypatch)
+    [(_, old)] = list(token_manager.iter_tokens())
+    seen_tokens.clear()
+
+    monkeypatch.setattr(git_token_generator, "TokenManager", lambda *args: token_manager)
+    monkeypatch.setattr(sys, "argv", ["git_token_generator.py", "rotate", "--within", "60"])
+    git_token_generator.main()
+
+    assert seen_tokens == [("create", "host-secret")]
+    [(_, new)] = list(token_manager.iter_tokens())
+    assert new["created_at"] != old["created_at"]
+    assert (new["host"], new["secret_env"]) == (old["host"], "HOST_TOKEN")
+
+
+def test_revoke_uses_host_credential(base_url, tmp_path, monkeypatch, seen_tokens):
+    token_manager = fan_out(base_url, tmp_path, monkeypatch)
+    tokens = delete_tokens.select_tokens(token_manager, with_values=True)
+    clients = HostClients(HttpClient)
+    shared = HttpClient()
+    results = delete_tokens.revoke_tokens(tokens, {}, client=shared, clients=clients)
+
+    assert "error" not in results[0]
+    assert seen_tokens[-1] == ("revoke", "host-secret")
+    # Revoked on the host's own client
+    assert len(clients.get(results[0]["entry"]["host"]).latencies) == 1
+    assert shared.latencies == []
+
+
+def test_revoke_needs_host_credential(base_url, tmp_path, monkeypatch):
+    token_manager = fan_out(base_url, tmp_path, monkeypatch)
+    monkeypatch.delenv("HOST_TOKEN")
+    tokens = delete_tokens.select_tokens(token_manager, with_values=True)
+    with pytest.raises(ValueError, match="HOST_TOKEN is not set"):
+        delete_tokens.revoke_tokens(tokens, {})
@@ -0,0 +1,39 @@
+"""Tests for building queries from the command line: --name is exact unless --glob is given."""
+
+import argparse
+
+import pytest
+
+from query import add_query_arguments, query_from_args
+from token_store import TokenManager
+
+
+def parse(*argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--platform")
+    parser.add_argument("--name")
+    add_query_arguments(parser)
+    return query_from_args(parser.parse_args(argv))
+
+
+@pytest.mark.parametrize("name", ["ci-*", "build?", "release-[12]"])
+def test_name_with_wildcards_is_exact(name):
+    selection = parse("--name", name)
+    assert (selection.name, selection.pattern) == (name, None)
+
+
+def test_glob_opts_in():
+    selection = parse("--glob", "--name", "ci-*")
+    assert (selection.name, selection.pattern) == (None, "ci-*")
+
+
+def test_selection(token_manager: TokenManager):
+    for name in ["ci-*", "ci-1", "ci-2"]:
+        token_manager.save_token("github", "ghp_value", name, ["repo"])
+
+    def names(*argv):
+        return sorted(entry["name"] for _, entry in token_manager.iter_tokens(parse(*argv)))
+
+    assert names("--name", "ci-*") == ["ci-*"]
+    assert names("--glob", "--name", "ci-*") == ["ci-*", "ci-1", "ci-2"]
+    assert names("--glob", "--name", "ci-[12]") == ["ci-1", "ci-2"]
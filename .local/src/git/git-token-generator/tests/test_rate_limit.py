@@ -0,0 +1,95 @@
+"""Tests for RequestScheduler's retry policy: idempotent requests are retried more freely than POSTs."""
+
+import http.client
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from http_client import HttpClient
+from rate_limit import RequestScheduler, parse_rate_limit
+
+
+def response(status, headers=None):
+    """A bare requests.Response with a status and headers."""
+    result = requests.Response()
+    result.status_code = status
+    result.headers.update(headers or {})
+    return result
+
+
+def refused():
+    """The error requests raises when nothing is listening."""
+    reason = NewConnectionError(None, "Failed to establish a new connection: [Errno 111] Connection refused")
+    return requests.exceptions.ConnectionError(MaxRetryError(None, "/", reason))
+
+
+def dropped():
+    """The error requests raises when the server closes the connection after the request was sent."""
+    reason = ProtocolError("Connection aborted.", http.client.RemoteDisconnected("closed without response"))
+    return requests.exceptions.ConnectionError(reason)
+
+
+def attempts(outcomes, idempotent):
+    """Send through a scheduler whose attempts return or raise outcomes in turn; returns how many were made."""
+    outcomes = list(outcomes)
+    made = []
+
+    def send():
+        made.append(1)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    scheduler = RequestScheduler(max_retries=3, base_delay=0.001)
+    try:
+        scheduler.send("example.com", send, idempotent=idempotent)
+    except requests.exceptions.ConnectionError:
+        pass
+    return len(made)
+
+
+@pytest.mark.parametrize("outcome, get, post", [
+    (response(429, {"Retry-After": "0"}), 2, 2),
+    (response(503, {"Retry-After": "0"}), 2, 2),
+    (response(403, {"X-RateLimit-Remaining": "0"}), 2, 2),
+    (response(503), 2, 1),
+    (response(502), 2, 1),
+    (response(504), 2, 1),
+    (response(500), 1, 1),
+    (response(403), 1, 1),
+    (refused(), 2, 2),
+    (requests.exceptions.ConnectTimeout(), 2, 2),
+    (dropped(), 2, 1),
+])
+def test_retry_policy(outcome, get, post):
+    assert attempts([outcome, response(200)], idempotent=True) == get
+    assert attempts([outcome, response(200)], idempotent=False) == post
+
+
+def test_read_timeout_is_never_retried():
+    # The provider may still be working on it, whatever the method
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        attempts([requests.exceptions.ReadTimeout(), response(200)], idempotent=True)
+
+
+def test_retries_run_out():
+    assert attempts([response(502)] * 5, idempotent=True) == 4
+    assert attempts([refused()] * 5, idempotent=False) == 4
+
+
+def test_client_only_retries_a_post_it_never_sent():
+    # Nothing listens on port 9 of localhost, so every attempt is refused before sending anything
+    client = HttpClient(timeout=1, scheduler=RequestScheduler(max_retries=2, base_delay=0.001))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post("http://127.0.0.1:9/authorizations", json={})
+    assert client.scheduler.retries == 2
+
+
+def test_parse_rate_limit():
+    github = parse_rate_limit({"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "12",
+                               "X-RateLimit-Reset": "1700000060"}, now=1700000000)
+    assert github == {"limit": 5000, "remaining": 12, "reset_in": 60, "retry_after": None}
+    gitlab = parse_rate_limit({"RateLimit-Remaining": "0", "RateLimit-Reset": "30", "Retry-After": "7"})
+    assert gitlab["remaining"] == 0 and gitlab["reset_in"] == 30 and gitlab["retry_after"] == 7
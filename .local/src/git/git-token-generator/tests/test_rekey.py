@@ -0,0 +1,39 @@
+"""Tests for rekey: an interrupted rekey resumes, and leaves every value under the new key alone."""
+
+import pytest
+from cryptography.fernet import Fernet
+
+import rekey
+from key_provider import read_keys
+
+
+class Interrupted(Exception):
+    """Stands in for the process being killed."""
+
+
+def test_rekey_resumes_after_interruption(token_manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(rekey, "REKEY_STATE_FILE", tmp_path / "rekey.json")
+    key_file = tmp_path / "key.key"
+    for i in range(10):
+        token_manager.save_token("github", f"ghp_value{i}", f"ci-{i}", ["repo"])
+    old_key = read_keys(key_file)[0]
+
+    def stop(done, total):
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        rekey.rekey(token_manager, chunk_size=3, progress=stop)
+    # One chunk is committed under the new key; the old key is still needed for the rest
+    assert len(read_keys(key_file)) == 2
+    assert rekey.load_state()["position"] == 3
+
+    result = rekey.rekey(token_manager, chunk_size=3)
+    assert result == {"total": 10, "unreadable": 0}
+    assert not (tmp_path / "rekey.json").exists()
+
+    keys = read_keys(key_file)
+    assert len(keys) == 1 and keys[0] != old_key
+    new_cipher = Fernet(keys[0])
+    values = {entry["name"]: new_cipher.decrypt(entry["token"].encode()).decode()
+              for _, entry in token_manager.store.iterate()}
+    assert values == {f"ci-{i}": f"ghp_value{i}" for i in range(10)}
@@ -0,0 +1,127 @@
+"""Tests for the storage backends: round trips, journal recovery and concurrent writers."""
+
+import threading
+
+import pytest
+
+import binary_vault
+import stress_writers
+from conftest import BACKENDS, open_test_manager, open_test_store
+from query import TokenQuery
+from token_store import JsonTokenStore, file_lock, journal_path, migrate
+
+
+def test_save_get_delete(token_manager, backend, tmp_path):
+    token_manager.save_token("github", "ghp_one", "ci", ["repo"], expires_at="2030-01-01T00:00:00")
+    token_manager.save_token("gitlab", "glpat_two", "ci", ["api"], extra={"host": "gitlab.example.com"})
+    token_manager.save_token("github", "ghp_three", "deploy", ["repo", "workflow"])
+
+    # A fresh manager reads back what was written, not what was cached
+    reopened = open_test_manager(backend, tmp_path)
+    assert reopened.get_token("github", "ci") == "ghp_one"
+    assert reopened.get_token("gitlab", "ci") == "glpat_two"
+    assert reopened.get_token("github", "missing") is None
+    assert reopened.store.get("gitlab", "ci")["host"] == "gitlab.example.com"
+    assert reopened.store.get("github", "ci")["expires_at"] == "2030-01-01T00:00:00"
+    assert reopened.store.count() == 3
+    listed = reopened.list_tokens("github")
+    assert [entry["name"] for entry in listed["github"]] == ["ci", "deploy"]
+    assert all("token" not in entry for entry in listed["github"])
+    reopened.store.close()
+
+    assert token_manager.delete_tokens("github", "ci") == 1
+    reopened = open_test_manager(backend, tmp_path)
+    assert reopened.get_token("github", "ci") is None
+    assert reopened.get_token("gitlab", "ci") == "glpat_two"
+    assert reopened.delete_matching(TokenQuery(platform="github")) == 1
+    assert reopened.store.count() == 1
+    reopened.store.close()
+
+
+@pytest.mark.parametrize("source", BACKENDS)
+def test_migrate_between_backends(source, backend, tmp_path):
+    token_manager = open_test_manager(source, tmp_path / "source")
+    for i in range(5):
+        token_manager.save_token("github", f"ghp_{i}", f"ci-{i}", ["repo"])
+    token_manager.save_token("github", "ghp_again", "ci-0", ["repo"])
+
+    (tmp_path / "target").mkdir()
+    (tmp_path / "back").mkdir()
+    target = open_test_store(backend, tmp_path / "target")
+    back = open_test_store(source, tmp_path / "back")
+    assert migrate(token_manager.store, target) == 6
+    assert migrate(target, back) == 6
+
+    expected = token_manager.store.query()
+    assert target.query() == expected
+    assert back.query() == expected
+    # Duplicate names keep their storage order, so the first one saved is still found first
+    assert target.get("github", "ci-0")["token"] == expected["github"][0]["token"]
+    for store in (target, back, token_manager.store):
+        store.close()
+
+
+def test_journal_replay_after_torn_tail(tmp_path):
+    token_manager = open_test_manager("journal", tmp_path)
+    token_manager.save_token("github", "ghp_one", "one", ["repo"])
+    token_manager.save_token("github", "ghp_two", "two", ["repo"])
+    journal_file = journal_path(tmp_path / "tokens.json")
+    assert not (tmp_path / "tokens.json").exists()
+
+    # A crash part way through appending a third record
+    with open(journal_file, "a") as f:
+        f.write('{"op": "add", "platform": "github", "entry": {"name": "thr')
+
+    reopened = open_test_manager("journal", tmp_path)
+    assert [entry["name"] for entry in reopened.list_tokens("github")["github"]] == ["one", "two"]
+    assert reopened.get_token("github", "two") == "ghp_two"
+
+    # The next append drops the torn record instead of being glued onto it
+    reopened.save_token("github", "ghp_four", "four", ["repo"])
+    assert journal_file.read_text().count("\n") == 3
+    reopened = open_test_manager("journal", tmp_path)
+    assert [entry["name"] for entry in reopened.list_tokens("github")["github"]] == ["one", "two", "four"]
+
+    # Compaction folds the journal into the snapshot and removes it
+    assert reopened.compact() == 3
+    assert not journal_file.exists()
+    assert JsonTokenStore(tmp_path / "tokens.json").count() == 3
+
+
+def test_journal_torn_record_mid_file_is_an_error(tmp_path):
+    token_manager = open_test_manager("journal", tmp_path)
+    token_manager.save_token("github", "ghp_one", "one", ["repo"])
+    journal_file = journal_path(tmp_path / "tokens.json")
+    journal_file.write_text('{"op": "add", "platform": "gi\n' + journal_file.read_text())
+
+    with pytest.raises(ValueError):
+        JsonTokenStore(tmp_path / "tokens.json", journal=True).count()
+
+
+def test_concurrent_writers_lose_nothing(backend):
+    assert stress_writers.run(backend, writers=4, count=6)
+
+
+def test_binary_and_json_vaults_lock_separately(tmp_path):
+    json_store = open_test_store("json", tmp_path)
+    token_manager = open_test_manager("binary", tmp_path)
+    assert token_manager.store.lock_file != json_store.lock_file
+
+    # A writer holding the tokens.json lock doesn't hold up the binary vault
+    saved = threading.Event()
+    with file_lock(json_store.lock_file):
+        writer = threading.Thread(target=lambda: (token_manager.save_token("github", "ghp_one", "one", ["repo"]),
+                                                  saved.set()), daemon=True)
+        writer.start()
+        assert saved.wait(10)
+
+
+@pytest.mark.parametrize("size", [0, 10])
+def test_binary_lookup_of_short_file_is_an_error(tmp_path, size):
+    vault_file = tmp_path / "tokens.vault"
+    vault_file.write_bytes(b"GTVAULT\0\1\0"[:size])
+
+    with pytest.raises(ValueError, match="too short"):
+        binary_vault.lookup(vault_file, "github", "one")
+    with pytest.raises(ValueError, match="too short"):
+        binary_vault.lookup_host(vault_file, "github.com")
@@ -0,0 +1,31 @@
+"""Tests for verify_tokens: a token whose provider can't be loaded is reported without stopping the sweep."""
+
+import logging
+
+from http_client import HttpClient
+from mock_provider import start_mock_server
+from providers import create_generator
+from token_store import TokenManager
+from verify import verify_tokens
+
+
+def test_unknown_platform_is_reported(token_manager: TokenManager):
+    logging.disable(logging.INFO)
+    server, base_urls = start_mock_server()
+    client = HttpClient()
+    try:
+        token_manager.save_token("github", "ghp_unknown", "ci", ["repo"], extra={"base_url": base_urls["github"]})
+        token_manager.save_token("uninstalled-plugin", "secret", "old", ["repo"])
+
+        def generator_for(platform, base_url):
+            return create_generator(platform, base_url, client=client)
+
+        results = {result["entry"]["name"]: result for result in verify_tokens(token_manager, generator_for)}
+    finally:
+        client.close()
+        server.shutdown()
+        logging.disable(logging.NOTSET)
+
+    assert results["ci"]["status"] == "revoked"
+    assert "Unsupported platform: uninstalled-plugin" in results["old"]["error"]
+    assert "status" not in results["old"]
@@ -0,0 +1,152 @@
+"""
+Token Record - Compact in-memory form of a vault entry.
+
+A loaded JSON vault keeps every entry in memory, so its size is what the JSON
+backends cost. A TokenRecord stores the standard fields in slots instead of a
+per-entry dict, and its scopes as an interned tuple shared by every entry with
+the same scopes (json.load would otherwise allocate a fresh list and fresh
+strings for each one). Uncommon fields (host, token_id, ...) go to an "extra"
+dict that is only created when an entry has any.
+
+The secret is held once, as the Fernet ciphertext in "token"; the plaintext is
+only materialized when TokenManager decrypts a value for a caller, and never
+stored on the record.
+
+Records are Mappings that also take item assignment, so code written against
+entry dicts (entry["name"], entry.get("scopes"), dict(entry, error=...)) works
+unchanged; scopes come back as a tuple. json.dumps(record, default=to_json)
+serializes one without copying the rest of the vault.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# Fields stored in slots, in serialization order
+FIELDS = ("name", "token", "scopes", "created_at", "expires_at")
+_FIELD_SET = frozenset(FIELDS)
+
+_scope_sets: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def intern_scopes(scopes: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Return the shared tuple for a list of scopes, interning each scope."""
+    key = tuple(sys.intern(scope) for scope in scopes or ())
+    return _scope_sets.setdefault(key, key)
+
+
+class TokenRecord(Mapping):
+    """One vault entry: name, ciphertext, scopes, timestamps and any extra metadata."""
+
+    __slots__ = ("name", "token", "scopes", "created_at", "expires_at", "extra")
+
+    def __init__(self, name: str, token: str, scopes: Optional[Iterable[str]] = None,
+                 created_at: Optional[str] = None, expires_at: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the record.
+
+        Args:
+            name: Token name
+            token: Fernet ciphertext of the value
+            scopes: Token scopes
+            created_at: ISO timestamp
+            expires_at: ISO timestamp, None if the token never expires
+            extra: Other metadata fields (None if there are none)
+        """
+        self.name = name
+        self.token = token
+        self.scopes = intern_scopes(scopes)
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "TokenRecord":
+        """Build a record from an entry dict, as read from JSON."""
+        if isinstance(data, cls):
+            return data
+        extra = None
+        if data.keys() - _FIELD_SET:
+            extra = {key: value for key, value in data.items() if key not in _FIELD_SET}
+        return cls(data["name"], data.get("token"), data.get("scopes"), data.get("created_at"),
+                   data.get("expires_at"), extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the entry as a plain dict, as written to JSON."""
+        data = {"name": self.name, "token": self.token, "scopes": list(self.scopes),
+                "created_at": self.created_at, "expires_at": self.expires_at}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __getitem__(self, key: str) -> Any:
+        """Look up a field by name, as on an entry dict."""
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Set a field by name (e.g. a re-encrypted token)."""
+        if key == "scopes":
+            self.scopes = intern_scopes(value)
+        elif key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look up a field by name, without raising for a missing one."""
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        """Whether the entry has this field."""
+        return key in _FIELD_SET or (self.extra is not None and key in self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over field names, standard fields first."""
+        yield from FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        """Number of fields."""
+        return len(FIELDS) + len(self.extra or ())
+
+    def keys(self):
+        """Field names, as dict.keys() would return them."""
+        return self.to_dict().keys()
+
+    def items(self):
+        """(field, value) pairs, built in one go rather than one lookup per field."""
+        return self.to_dict().items()
+
+    def values(self):
+        """Field values."""
+        return self.to_dict().values()
+
+    def __repr__(self) -> str:
+        """Show the metadata, never the ciphertext."""
+        return f"TokenRecord(name={self.name!r}, scopes={list(self.scopes)!r}, created_at={self.created_at!r})"
+
+
+def to_json(value: Any) -> Any:
+    """json.dump default= hook that serializes records (and nothing else)."""
+    if isinstance(value, TokenRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def entry_hook(data: Dict[str, Any]) -> Any:
+    """json.load object_hook that turns vault entries into records as they are parsed."""
+    if "name" in data and "token" in data:
+        return TokenRecord.from_dict(data)
+    return data
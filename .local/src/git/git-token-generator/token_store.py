@@ -0,0 +1,1203 @@
+"""
+Token Store - Storage backends and the token manager shared by the git-token-generator scripts.
+
+Four backends are available:
+
+- json: tokens.json snapshot, rewritten on every change
+- journal: tokens.json snapshot plus an append-only tokens.journal of records
+  written since the last compaction; readers always see snapshot + journal
+- sqlite: tokens.db in WAL mode with indexes on platform, name, host and
+  expires_at, so filters and deletes are indexed queries instead of
+  load-filter-rewrite
+- binary: tokens.vault, a compact indexed format (see binary_vault.py) that
+  looks up tokens by platform and name or by host through mmap without reading
+  the rest of the vault, and is otherwise handled like tokens.json
+
+Every backend can list entries in expiry order (expiring()) and select them
+with a TokenQuery (iterate(), delete()) without decrypting anything: the JSON
+backends keep sorted indexes over the loaded vault's names and timestamps, plus
+a scope index, and SQLite uses its column indexes. Timestamps are compared as
+ISO strings, so no dates are parsed. iterate() yields entries one at a time,
+optionally sorted and paged, for listings that stream their output; on SQLite
+the rows come straight off the cursor.
+
+Entries are always handled in their on-disk form: the "token" field holds the
+Fernet ciphertext and is only decrypted by TokenManager on request, one entry
+at a time (see decryption.py). An entry that cannot be decrypted is skipped and
+reported rather than failing the read, and TokenManager.quarantine() moves such
+entries out of the vault into quarantine.json. The keys come from a
+process-wide KeyProvider (key.key by default, see key_provider.py), read once
+and cached with their cipher.
+
+The JSON backends hold the loaded vault as TokenRecords (see token_record.py),
+a compact slots-based form with interned scopes, and write snapshots one entry
+per line without copying the vault. cryptography and sqlite3 are imported on
+first use, so reading metadata never pays for them.
+
+Every change is a locked read-modify-write: the JSON backends hold an advisory
+lock on tokens.lock (tokens.vault.lock for the binary vault), re-read the
+vault, and replace files atomically via write-to-temp-and-rename; SQLite uses
+BEGIN IMMEDIATE. Several changes can be grouped into one write with
+TokenManager.transaction().
+"""
+
+import os
+import json
+import fcntl
+import heapq
+import bisect
+import logging
+import itertools
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Any, Tuple, Iterator, Union
+
+import tracing
+from binary_vault import lookup, lookup_host, read_vault_file, write_vault_file
+from query import TokenQuery, glob_prefix
+from decryption import Result, decrypt_stream, decrypt_value
+from key_provider import KeyProvider, open_key_provider
+from token_record import TokenRecord, entry_hook, to_json
+
+if TYPE_CHECKING:
+    import sqlite3
+    from cryptography.fernet import Fernet, MultiFernet
+
+logger = logging.getLogger("git_token_generator")
+
+# Token storage configuration
+CONFIG_DIR = Path(os.environ.get("GIT_TOKEN_CONFIG_DIR",
+                                  Path.home() / ".config" / "git-token-generator"))
+TOKENS_FILE = CONFIG_DIR / "tokens.json"
+KEY_FILE = CONFIG_DIR / "key.key"
+DB_FILE = CONFIG_DIR / "tokens.db"
+VAULT_FILE = CONFIG_DIR / "tokens.vault"
+QUARANTINE_FILE = CONFIG_DIR / "quarantine.json"
+
+STORAGE_BACKENDS = ["json", "journal", "sqlite", "binary"]
+
+# Entry fields iterate() can sort by
+SORT_FIELDS = ["platform", "name", "created_at", "expires_at"]
+
+# Compact automatically once the journal holds this many records
+JOURNAL_COMPACT_THRESHOLD = 500
+
+Vault = Dict[str, List[Dict[str, Any]]]
+
+
+def journal_path(tokens_file: Path) -> Path:
+    """Return the journal file that belongs to a snapshot file."""
+    return tokens_file.with_suffix(".journal")
+
+
+def _replay_journal(data: Vault, journal_file: Path) -> int:
+    """
+    Apply journal records to snapshot data in place.
+
+    Records already present in the snapshot (same name and created_at) are skipped,
+    so replaying a journal that survived an interrupted compaction is harmless.
+    A torn final line from a crash mid-append is ignored.
+
+    Returns:
+        The number of records in the journal
+    """
+    with open(journal_file, "r") as f:
+        lines = f.readlines()
+
+    count = 0
+    seen = {}
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line, object_hook=entry_hook)
+        except json.JSONDecodeError:
+            if line_number == len(lines):
+                logger.warning(f"Ignoring incomplete journal record at line {line_number}")
+                continue
+            raise
+
+        count += 1
+        if record.get("op") != "add":
+            raise ValueError(f"Unknown journal operation: {record.get('op')}")
+
+        platform, entry = record["platform"], record["entry"]
+        entries = data.setdefault(platform, [])
+        keys = seen.get(platform)
+        if keys is None:
+            keys = seen[platform] = {(e["name"], e.get("created_at")) for e in entries}
+        key = (entry["name"], entry.get("created_at"))
+        if key in keys:
+            continue
+        keys.add(key)
+        entries.append(entry)
+    return count
+
+
+def read_vault(tokens_file: Path) -> Tuple[Vault, int]:
+    """
+    Read the snapshot and replay any pending journal records.
+
+    Returns:
+        The vault data in on-disk form and the number of journal records replayed
+    """
+    with tracing.span("vault.load"):
+        data = {}
+        if tokens_file.exists():
+            with open(tokens_file, "r") as f:
+                # Entries become TokenRecords as they are parsed, so their dicts never pile up
+                data = json.load(f, object_hook=entry_hook)
+                tracing.count("bytes_read", f.tell())
+
+        journal_file = journal_path(tokens_file)
+        count = 0
+        if journal_file.exists():
+            tracing.count("bytes_read", journal_file.stat().st_size)
+            count = _replay_journal(data, journal_file)
+    return data, count
+
+
+def append_journal(tokens_file: Path, records: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Append (platform, entry) records to the journal with a single write and fsync."""
+    journal_file = journal_path(tokens_file)
+    lines = "".join(
+        json.dumps({"op": "add", "platform": platform, "entry": entry}, default=to_json) + "\n"
+        for platform, entry in records
+    )
+
+    with tracing.span("vault.save"):
+        fd = os.open(journal_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+b") as f:
+            data = lines.encode()
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # A crash mid-append left a torn last record (ignored on replay); drop it, or these
+                    # records would be glued onto it and ignored too. Appends are made under the lock.
+                    f.seek(0)
+                    f.truncate(f.read().rfind(b"\n") + 1)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        tracing.count("bytes_written", len(data))
+
+
+def write_snapshot(tokens_file: Path, data: Vault) -> None:
+    """
+    Write a full snapshot and drop the journal it supersedes.
+
+    The snapshot is written to a temporary file and renamed into place, so a crash
+    leaves either the old snapshot + journal or the new snapshot, never a torn file.
+    Entries are serialized one per line as they are written, so no copy of the
+    vault is built.
+    """
+    with tracing.span("vault.save"):
+        fd, tmp_name = tempfile.mkstemp(dir=tokens_file.parent, prefix=".tokens-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write("{")
+                for i, (platform, entries) in enumerate(data.items()):
+                    f.write(f"{',' if i else ''}\n  {json.dumps(platform)}: [")
+                    for j, entry in enumerate(entries):
+                        f.write(f"{',' if j else ''}\n    {json.dumps(entry, default=to_json)}")
+                    f.write("\n  ]" if entries else "]")
+                f.write("\n}\n")
+                f.flush()
+                os.fsync(f.fileno())
+                tracing.count("bytes_written", f.tell())
+            os.chmod(tmp_name, 0o600)
+            os.replace(tmp_name, tokens_file)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    journal_file = journal_path(tokens_file)
+    if journal_file.exists():
+        journal_file.unlink()
+
+
+def page_rows(rows: Iterable[Tuple[str, Dict[str, Any]]], sort: Optional[str] = None, reverse: bool = False,
+              offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Sort and page (platform, entry) rows for iterate(); a limited sort keeps only offset + limit rows."""
+    end = None if limit is None else offset + limit
+    if sort:
+        def key(row):
+            return (row[0] if sort == "platform" else row[1].get(sort)) or ""
+
+        if end is not None:
+            rows = (heapq.nlargest if reverse else heapq.nsmallest)(end, rows, key=key)
+        else:
+            rows = sorted(rows, key=key, reverse=reverse)
+    elif reverse:
+        rows = reversed(list(rows))
+    return itertools.islice(rows, offset, end)
+
+
+@contextmanager
+def file_lock(lock_file: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory flock on lock_file, exclusive unless shared is set."""
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class TokenStore:
+    """Interface for token storage backends."""
+
+    name = ""
+
+    def exists(self) -> bool:
+        """Whether anything has been stored yet."""
+        raise NotImplementedError
+
+    def query(self, platform: Optional[str] = None, name: Optional[str] = None) -> Vault:
+        """Return entries matching the filters, grouped by platform."""
+        raise NotImplementedError
+
+    def get(self, platform: str, name: str) -> Optional[Dict[str, Any]]:
+        """Return the first entry with this platform and name."""
+        raise NotImplementedError
+
+    def expiring(self, before: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Return (platform, entry) pairs in order of expiry, soonest first.
+
+        Args:
+            before: Only entries whose expires_at is at or before this ISO timestamp
+            limit: Return at most this many entries
+
+        Entries that never expire are left out.
+        """
+        raise NotImplementedError
+
+    def iterate(self, selection: Optional[TokenQuery] = None, sort: Optional[str] = None, reverse: bool = False,
+                offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield (platform, entry) pairs matching a query, one at a time.
+
+        Args:
+            selection: Entries to yield (None for all)
+            sort: Field to order by (one of SORT_FIELDS); None keeps storage order.
+                Missing values sort first.
+            reverse: Reverse the order
+            offset: Skip this many entries
+            limit: Yield at most this many entries
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Return the number of entries."""
+        raise NotImplementedError
+
+    def refresh(self) -> None:
+        """Drop anything cached, so the next read sees changes made by other processes."""
+
+    def add(self, platform: str, entry: Dict[str, Any]) -> None:
+        """Persist a new entry."""
+        raise NotImplementedError
+
+    def delete(self, selection: TokenQuery) -> int:
+        """Delete entries matching a query and return how many were removed."""
+        raise NotImplementedError
+
+    def remove(self, entries: Vault) -> int:
+        """Delete exactly these entries, matched on platform, name and created_at."""
+        raise NotImplementedError
+
+    def update_tokens(self, entries: Vault) -> int:
+        """Overwrite the stored ciphertext of these entries, matched on platform, name and created_at."""
+        raise NotImplementedError
+
+    def update_metadata(self, entries: Vault) -> int:
+        """Overwrite every field but the ciphertext of these entries, matched on platform, name and created_at."""
+        raise NotImplementedError
+
+    def replace_all(self, data: Vault) -> None:
+        """Replace the whole contents of the store."""
+        raise NotImplementedError
+
+    @contextmanager
+    def transaction(self) -> Iterator["TokenStore"]:
+        """
+        Group changes into one locked read-modify-write.
+
+        Inside the block the store reflects the latest on-disk state and other
+        writers are held off; all changes are committed together on exit and
+        discarded if the block raises. Transactions nest.
+        """
+        raise NotImplementedError
+
+    def compact(self) -> int:
+        """Fold pending records into the main store and return how many were folded."""
+        return 0
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class JsonTokenStore(TokenStore):
+    """tokens.json snapshot, optionally with an append-only journal for new entries."""
+
+    def __init__(self, tokens_file: Path = TOKENS_FILE, journal: bool = False):
+        """
+        Initialize the store.
+
+        Args:
+            tokens_file: Snapshot file; the journal and lock file live next to it
+            journal: Append new entries to the journal instead of rewriting the snapshot
+        """
+        self.tokens_file = tokens_file
+        self.lock_file = tokens_file.with_suffix(".lock")
+        self.journal = journal
+        self.name = "journal" if journal else "json"
+        self._data = None
+        self._index = {}
+        # Sorted field indexes and the scope index, built on first use
+        self._indexes = {}
+        self._journal_records = 0
+        self._in_transaction = False
+        self._pending = []
+        self._rewrite = False
+
+    def _read(self) -> None:
+        """Read the snapshot and journal from disk, building the (platform, name) index."""
+        self._data, self._journal_records = read_vault(self.tokens_file)
+        self._indexes = {}
+        self._index = {}
+        for platform, entries in self._data.items():
+            for entry in entries:
+                self._index.setdefault((platform, entry["name"]), entry)
+
+    def _load(self) -> Vault:
+        """Load the vault once, under a shared lock so compaction can't interleave."""
+        if self._data is None:
+            if self.exists():
+                with file_lock(self.lock_file, shared=True):
+                    self._read()
+            else:
+                self._read()
+        return self._data
+
+    def exists(self) -> bool:
+        """Whether a snapshot or journal exists."""
+        return self.tokens_file.exists() or journal_path(self.tokens_file).exists()
+
+    @contextmanager
+    def transaction(self) -> Iterator["JsonTokenStore"]:
+        """Hold the vault lock, re-read the vault, and write all changes once on exit."""
+        if self._in_transaction:
+            yield self
+            return
+
+        with file_lock(self.lock_file):
+            self._read()
+            self._in_transaction = True
+            self._pending = []
+            self._rewrite = False
+            try:
+                yield self
+                self._commit()
+            except BaseException:
+                # Drop the uncommitted in-memory changes
+                self._data = None
+                raise
+            finally:
+                self._in_transaction = False
+
+    def _commit(self) -> None:
+        """Persist the changes made in the current transaction."""
+        if self._rewrite or (self._pending and not self.journal):
+            self._write()
+        elif self._pending:
+            append_journal(self.tokens_file, self._pending)
+            self._journal_records += len(self._pending)
+            if self._journal_records >= JOURNAL_COMPACT_THRESHOLD:
+                self._compact_locked()
+        self._pending = []
+        self._rewrite = False
+
+    def query(self, platform: Optional[str] = None, name: Optional[str] = None) -> Vault:
+        """Return entries matching the filters, grouped by platform."""
+        data = self._load()
+        if platform:
+            return {platform: [e for e in data.get(platform, []) if name is None or e["name"] == name]}
+
+        result = {}
+        for plat, entries in data.items():
+            matches = [e for e in entries if name is None or e["name"] == name]
+            if matches:
+                result[plat] = matches
+        return result
+
+    def get(self, platform: str, name: str) -> Optional[Dict[str, Any]]:
+        """Return the first entry with this platform and name."""
+        self._load()
+        return self._index.get((platform, name))
+
+    def _entries(self) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """Yield (position, platform, entry) for every entry, numbered in storage order."""
+        position = 0
+        for platform, entries in self._load().items():
+            for entry in entries:
+                yield position, platform, entry
+                position += 1
+
+    def _field_index(self, field: str) -> List[Tuple[str, int, str, Dict[str, Any]]]:
+        """Build a (value, position, platform, entry) index over one field on first use, sorted by value."""
+        index = self._indexes.get(field)
+        if index is None:
+            index = self._indexes[field] = sorted(
+                (entry[field], position, platform, entry)
+                for position, platform, entry in self._entries()
+                if entry.get(field)
+            )
+        return index
+
+    def _scope_index(self) -> Dict[str, List[Tuple[int, str, Dict[str, Any]]]]:
+        """Build the scope -> [(position, platform, entry)] index on first use."""
+        index = self._indexes.get("scopes")
+        if index is None:
+            index = self._indexes["scopes"] = {}
+            for position, platform, entry in self._entries():
+                for scope in entry.get("scopes") or ():
+                    index.setdefault(scope, []).append((position, platform, entry))
+        return index
+
+    def _range(self, field: str, low: str, high: Optional[str]) -> Tuple[List[Tuple], int, int]:
+        """Bisect a field index for values at least low and below high (None for no upper bound)."""
+        index = self._field_index(field)
+        start = bisect.bisect_left(index, (low,))
+        end = len(index) if high is None else bisect.bisect_left(index, (high,))
+        return index, start, end
+
+    def _candidates(self, selection: TokenQuery) -> Optional[List[Tuple[int, str, Dict[str, Any]]]]:
+        """
+        Narrow a query to the smallest index range that contains all its matches.
+
+        Returns:
+            (position, platform, entry) candidates in storage order, still to be
+            checked with TokenQuery.matches, or None if no index applies
+        """
+        ranges = []
+        if selection.name is not None:
+            # name + "\0" is the first string after name itself
+            ranges.append(self._range("name", selection.name, selection.name + "\0"))
+        elif selection.pattern is not None and glob_prefix(selection.pattern):
+            prefix = glob_prefix(selection.pattern)
+            ranges.append(self._range("name", prefix, prefix + "\U0010ffff"))
+        if selection.host:
+            ranges.append(self._range("host", selection.host, selection.host + "\0"))
+        for field, after, before in selection.ranges():
+            ranges.append(self._range(field, after or "", before))
+        if not ranges and not selection.scopes:
+            return None
+
+        # Only the narrowest range is copied out of its index
+        narrowest = min(ranges, key=lambda bounds: bounds[2] - bounds[1], default=None)
+        scopes = [self._scope_index().get(scope, []) for scope in selection.scopes]
+        smallest_scope = min(scopes, key=len, default=None)
+        if narrowest is not None and (smallest_scope is None or narrowest[2] - narrowest[1] <= len(smallest_scope)):
+            index, start, end = narrowest
+            return sorted(((position, platform, entry) for _, position, platform, entry in index[start:end]),
+                          key=itemgetter(0))
+        return smallest_scope
+
+    def expiring(self, before: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return entries in order of expiry by bisecting the sorted index."""
+        index = self._field_index("expires_at")
+        # "\uffff" sorts after any suffix, so entries expiring exactly at before are included
+        end = len(index) if before is None else bisect.bisect_right(index, (before + "\uffff",))
+        if limit is not None:
+            end = min(end, limit)
+        return [(platform, entry) for _, _, platform, entry in index[:end]]
+
+    def iterate(self, selection: Optional[TokenQuery] = None, sort: Optional[str] = None, reverse: bool = False,
+                offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield matching entries from the loaded vault; a limited sort keeps only offset + limit entries."""
+        selection = selection or TokenQuery()
+        data = self._load()
+        candidates = self._candidates(selection)
+        if candidates is None:
+            rows = (
+                (plat, entry)
+                for plat, entries in data.items() if not selection.platform or plat == selection.platform
+                for entry in entries if selection.matches(plat, entry)
+            )
+        else:
+            rows = ((plat, entry) for _, plat, entry in candidates if selection.matches(plat, entry))
+        yield from page_rows(rows, sort, reverse, offset, limit)
+
+    def count(self) -> int:
+        """Return the number of entries in the loaded vault."""
+        return sum(len(entries) for entries in self._load().values())
+
+    def refresh(self) -> None:
+        """Re-read the vault on next use (outside a transaction, which always sees fresh data)."""
+        if not self._in_transaction:
+            self._data = None
+
+    def add(self, platform: str, entry: Dict[str, Any]) -> None:
+        """Persist a new entry, appending to the journal in journal mode."""
+        entry = TokenRecord.from_dict(entry)
+        with self.transaction():
+            self._data.setdefault(platform, []).append(entry)
+            self._index.setdefault((platform, entry["name"]), entry)
+            self._pending.append((platform, entry))
+            self._indexes = {}
+
+    def delete(self, selection: TokenQuery) -> int:
+        """Delete entries matching a query and rewrite the snapshot."""
+        with self.transaction():
+            matched = {id(entry) for _, entry in self.iterate(selection)}
+            data = self._data
+            removed = 0
+            for plat in list(data) if matched else []:
+                kept = [e for e in data[plat] if id(e) not in matched]
+                removed += len(data[plat]) - len(kept)
+                if kept:
+                    data[plat] = kept
+                else:
+                    del data[plat]
+
+            if removed:
+                self._reindex()
+                self._rewrite = True
+        return removed
+
+    def remove(self, entries: Vault) -> int:
+        """Delete exactly these entries and rewrite the snapshot."""
+        keys = {(plat, e["name"], e.get("created_at")) for plat, items in entries.items() for e in items}
+        with self.transaction():
+            data = self._data
+            removed = 0
+            for plat in list(data):
+                kept = [e for e in data[plat] if (plat, e["name"], e.get("created_at")) not in keys]
+                removed += len(data[plat]) - len(kept)
+                if kept:
+                    data[plat] = kept
+                else:
+                    del data[plat]
+
+            if removed:
+                self._reindex()
+                self._rewrite = True
+        return removed
+
+    def _matching(self, entries: Vault) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Yield (item, stored entry) for every item of entries found in the vault; the caller holds the lock."""
+        for plat, items in entries.items():
+            by_key = None
+            for item in items:
+                key = (item["name"], item.get("created_at"))
+                entry = self._index.get((plat, item["name"]))
+                if entry is None or entry.get("created_at") != key[1]:
+                    # Not the first entry with this name: fall back to the platform's entries
+                    if by_key is None:
+                        by_key = {(e["name"], e.get("created_at")): e for e in self._data.get(plat, [])}
+                    entry = by_key.get(key)
+                if entry is not None:
+                    yield item, entry
+
+    def update_tokens(self, entries: Vault) -> int:
+        """Overwrite the ciphertext of these entries in place and rewrite the snapshot."""
+        with self.transaction():
+            updated = 0
+            for item, entry in self._matching(entries):
+                entry["token"] = item["token"]
+                updated += 1
+
+            if updated:
+                self._rewrite = True
+        return updated
+
+    def update_metadata(self, entries: Vault) -> int:
+        """Overwrite the metadata of these entries in place and rewrite the snapshot."""
+        with self.transaction():
+            updated = 0
+            for item, entry in self._matching(entries):
+                for key, value in item.items():
+                    if key != "token":
+                        entry[key] = value
+                updated += 1
+
+            if updated:
+                # Expiry and scope indexes are rebuilt on next use; names and created_at never change here
+                self._indexes = {}
+                self._rewrite = True
+        return updated
+
+    def replace_all(self, data: Vault) -> None:
+        """Replace the whole vault with a fresh snapshot."""
+        with self.transaction():
+            self._data = {platform: [TokenRecord.from_dict(entry) for entry in entries]
+                          for platform, entries in data.items()}
+            self._reindex()
+            self._rewrite = True
+
+    def _reindex(self) -> None:
+        """Rebuild the (platform, name) index after entries were removed or replaced."""
+        self._indexes = {}
+        self._index = {}
+        for platform, entries in self._data.items():
+            for entry in entries:
+                self._index.setdefault((platform, entry["name"]), entry)
+
+    def _write(self) -> None:
+        """Write the in-memory vault as a full snapshot, folding in any journal."""
+        write_snapshot(self.tokens_file, self._data)
+        self._journal_records = 0
+
+    def _compact_locked(self) -> int:
+        """Fold the journal into the snapshot; the caller holds the lock."""
+        count = self._journal_records
+        if count:
+            self._write()
+            logger.info(f"Compacted {count} journal records into {self.tokens_file}")
+        return count
+
+    def compact(self) -> int:
+        """Fold the journal into the snapshot."""
+        with self.transaction():
+            return self._compact_locked()
+
+
+class BinaryTokenStore(JsonTokenStore):
+    """tokens.vault in the binary format, where a single token is read without loading the vault."""
+
+    def __init__(self, vault_file: Path = VAULT_FILE):
+        """
+        Initialize the store.
+
+        Args:
+            vault_file: Binary vault file; the lock file lives next to it
+        """
+        super().__init__(vault_file)
+        # tokens.vault.lock, not the tokens.lock of tokens.json, so the two vaults never block each other
+        self.lock_file = vault_file.with_name(vault_file.name + ".lock")
+        self.name = "binary"
+
+    def _read(self) -> None:
+        """Read every record from disk, building the (platform, name) index."""
+        self._data = read_vault_file(self.tokens_file)
+        self._journal_records = 0
+        self._reindex()
+
+    def _write(self) -> None:
+        """Write the in-memory vault as a new binary file."""
+        write_vault_file(self.tokens_file, self._data)
+
+    def exists(self) -> bool:
+        """Whether the vault file exists."""
+        return self.tokens_file.exists()
+
+    def _lookup(self, platform: Optional[str], name: Optional[str] = None,
+                host: Optional[str] = None) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """
+        The (platform, entry) rows with this platform (and name), or else this host, from the file's indexes.
+
+        Returns:
+            The rows in storage order, or None if the vault is already loaded or no
+            index applies, in which case the loaded vault is used instead
+        """
+        if self._data is not None:
+            return None
+        # Writers rename a complete file into place, so the mapped file is always whole without the lock
+        if platform:
+            return [(platform, entry) for entry in lookup(self.tokens_file, platform, name)]
+        if host:
+            return lookup_host(self.tokens_file, host)
+        return None
+
+    def get(self, platform: str, name: str) -> Optional[Dict[str, Any]]:
+        """Return the first entry with this platform and name."""
+        rows = self._lookup(platform, name)
+        if rows is None:
+            return super().get(platform, name)
+        return rows[0][1] if rows else None
+
+    def query(self, platform: Optional[str] = None, name: Optional[str] = None) -> Vault:
+        """Return entries matching the filters, grouped by platform."""
+        rows = self._lookup(platform, name)
+        if rows is None:
+            return super().query(platform, name)
+        return {platform: [entry for _, entry in rows]}
+
+    def iterate(self, selection: Optional[TokenQuery] = None, sort: Optional[str] = None, reverse: bool = False,
+                offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield matching entries, straight from the file's indexes when the query names a platform or host."""
+        selection = selection or TokenQuery()
+        rows = self._lookup(selection.platform, selection.name, selection.host)
+        if rows is None:
+            yield from super().iterate(selection, sort, reverse, offset, limit)
+            return
+        rows = ((platform, entry) for platform, entry in rows if selection.matches(platform, entry))
+        yield from page_rows(rows, sort, reverse, offset, limit)
+
+
+class SqliteTokenStore(TokenStore):
+    """SQLite database in WAL mode with indexed platform, name and expiry columns."""
+
+    name = "sqlite"
+
+    # Columns stored natively; any other entry fields round-trip through "extra"
+    COLUMNS = ("name", "token", "scopes", "created_at", "expires_at")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            platform TEXT NOT NULL,
+            name TEXT NOT NULL,
+            token TEXT NOT NULL,
+            scopes TEXT NOT NULL,
+            created_at TEXT,
+            expires_at TEXT,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_tokens_platform_name ON tokens (platform, name);
+        CREATE INDEX IF NOT EXISTS idx_tokens_name ON tokens (name);
+        CREATE INDEX IF NOT EXISTS idx_tokens_expires_at ON tokens (expires_at);
+        CREATE INDEX IF NOT EXISTS idx_tokens_created_at ON tokens (created_at);
+        CREATE INDEX IF NOT EXISTS idx_tokens_host ON tokens (json_extract(extra, '$.host'));
+    """
+
+    def __init__(self, db_file: Path = DB_FILE):
+        """Initialize the store; the database is opened on first use."""
+        self.db_file = db_file
+        self._conn = None
+        self._in_transaction = False
+
+    @property
+    def conn(self) -> "sqlite3.Connection":
+        """Open the database on first use and make sure the schema exists."""
+        if self._conn is None:
+            import sqlite3
+
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not self.db_file.exists()
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            if is_new:
+                os.chmod(self.db_file, 0o600)
+        return self._conn
+
+    def exists(self) -> bool:
+        """Whether the database file exists."""
+        return self.db_file.exists()
+
+    @classmethod
+    def _to_row(cls, platform: str, entry: Dict[str, Any]) -> Tuple:
+        """Convert an entry into a row tuple for the tokens table."""
+        extra = {k: v for k, v in entry.items() if k not in cls.COLUMNS}
+        return (
+            platform,
+            entry["name"],
+            entry["token"],
+            json.dumps(entry.get("scopes", [])),
+            entry.get("created_at"),
+            entry.get("expires_at"),
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _from_row(row: Tuple) -> Tuple[str, Dict[str, Any]]:
+        """Convert a row tuple back into (platform, entry)."""
+        platform, name, token, scopes, created_at, expires_at, extra = row
+        entry = {
+            "name": name,
+            "token": token,
+            "scopes": json.loads(scopes),
+            "created_at": created_at,
+            "expires_at": expires_at,
+        }
+        if extra:
+            entry.update(json.loads(extra))
+        return platform, entry
+
+    def query(self, platform: Optional[str] = None, name: Optional[str] = None) -> Vault:
+        """Return entries matching the filters, grouped by platform."""
+        where, params = TokenQuery(platform=platform, name=name).sql()
+        rows = self.conn.execute(
+            "SELECT platform, name, token, scopes, created_at, expires_at, extra "
+            f"FROM tokens{where} ORDER BY id",
+            params,
+        )
+        result = {platform: []} if platform else {}
+        for row in rows:
+            plat, entry = self._from_row(row)
+            result.setdefault(plat, []).append(entry)
+        return result
+
+    def get(self, platform: str, name: str) -> Optional[Dict[str, Any]]:
+        """Return the first entry with this platform and name."""
+        row = self.conn.execute(
+            "SELECT platform, name, token, scopes, created_at, expires_at, extra "
+            "FROM tokens WHERE platform = ? AND name = ? ORDER BY id LIMIT 1",
+            (platform, name),
+        ).fetchone()
+        return self._from_row(row)[1] if row else None
+
+    def expiring(self, before: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return entries in order of expiry, walking the expires_at index."""
+        sql = ("SELECT platform, name, token, scopes, created_at, expires_at, extra FROM tokens "
+               "WHERE expires_at IS NOT NULL AND expires_at != ''")
+        params = []
+        if before is not None:
+            sql += " AND expires_at <= ?"
+            params.append(before + "\uffff")
+        sql += " ORDER BY expires_at, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._from_row(row) for row in self.conn.execute(sql, params)]
+
+    def iterate(self, selection: Optional[TokenQuery] = None, sort: Optional[str] = None, reverse: bool = False,
+                offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield matching rows straight off the cursor, filtered, sorted and paged by SQLite."""
+        if sort and sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        where, params = (selection or TokenQuery()).sql()
+        direction = "DESC" if reverse else "ASC"
+        order = f"{sort} {direction}, id" if sort else f"id {direction}"
+        sql = ("SELECT platform, name, token, scopes, created_at, expires_at, extra "
+               f"FROM tokens{where} ORDER BY {order}")
+        if offset or limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        for row in self.conn.execute(sql, params):
+            yield self._from_row(row)
+
+    def count(self) -> int:
+        """Return the number of rows."""
+        return self.conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    @contextmanager
+    def transaction(self) -> Iterator["SqliteTokenStore"]:
+        """Run the block inside BEGIN IMMEDIATE, so writers queue instead of conflicting."""
+        if self._in_transaction:
+            yield self
+            return
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield self
+            with tracing.span("vault.save"):
+                conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._in_transaction = False
+
+    def add(self, platform: str, entry: Dict[str, Any]) -> None:
+        """Insert a new entry."""
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO tokens (platform, name, token, scopes, created_at, expires_at, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._to_row(platform, entry),
+            )
+
+    def delete(self, selection: TokenQuery) -> int:
+        """Delete entries matching a query with a single DELETE."""
+        where, params = selection.sql()
+        with self.transaction():
+            return self.conn.execute(f"DELETE FROM tokens{where}", params).rowcount
+
+    def remove(self, entries: Vault) -> int:
+        """Delete exactly these entries in one transaction."""
+        params = [(plat, e["name"], e.get("created_at")) for plat, items in entries.items() for e in items]
+        with self.transaction():
+            return self.conn.executemany(
+                "DELETE FROM tokens WHERE platform = ? AND name = ? AND created_at IS ?", params
+            ).rowcount
+
+    def update_tokens(self, entries: Vault) -> int:
+        """Overwrite the ciphertext of these entries in one transaction."""
+        params = [(e["token"], plat, e["name"], e.get("created_at")) for plat, items in entries.items() for e in items]
+        with self.transaction():
+            return self.conn.executemany(
+                "UPDATE tokens SET token = ? WHERE platform = ? AND name = ? AND created_at IS ?", params
+            ).rowcount
+
+    def update_metadata(self, entries: Vault) -> int:
+        """Overwrite the metadata columns of these entries in one transaction."""
+        params = []
+        for plat, items in entries.items():
+            for entry in items:
+                _, name, _, scopes, created_at, expires_at, extra = self._to_row(plat, dict(entry, token=None))
+                params.append((scopes, expires_at, extra, plat, name, created_at))
+        with self.transaction():
+            return self.conn.executemany(
+                "UPDATE tokens SET scopes = ?, expires_at = ?, extra = ? "
+                "WHERE platform = ? AND name = ? AND created_at IS ?", params
+            ).rowcount
+
+    def replace_all(self, data: Vault) -> None:
+        """Replace the whole contents of the table in one transaction."""
+        with self.transaction():
+            self.conn.execute("DELETE FROM tokens")
+            self.conn.executemany(
+                "INSERT INTO tokens (platform, name, token, scopes, created_at, expires_at, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._to_row(platform, entry) for platform, entries in data.items() for entry in entries],
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def open_store(backend: Optional[str] = None) -> TokenStore:
+    """
+    Open a storage backend by name.
+
+    Args:
+        backend: One of STORAGE_BACKENDS (defaults to $GIT_TOKEN_STORAGE, then json)
+
+    Returns:
+        The storage backend
+    """
+    backend = backend or os.environ.get("GIT_TOKEN_STORAGE", "json")
+    if backend == "json":
+        return JsonTokenStore(TOKENS_FILE)
+    if backend == "journal":
+        return JsonTokenStore(TOKENS_FILE, journal=True)
+    if backend == "sqlite":
+        return SqliteTokenStore(DB_FILE)
+    if backend == "binary":
+        return BinaryTokenStore(VAULT_FILE)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate(source: TokenStore, target: TokenStore) -> int:
+    """
+    Copy every entry from one backend to another, replacing the target's contents.
+
+    Returns:
+        The number of entries copied
+    """
+    data = source.query()
+    target.replace_all(data)
+    return sum(len(entries) for entries in data.values())
+
+
+class TokenManager:
+    """Manages secure storage and retrieval of tokens."""
+
+    def __init__(self, storage: Optional[str] = None, key_source: Optional[str] = None):
+        """
+        Initialize the token manager.
+
+        Args:
+            storage: Storage backend name, one of STORAGE_BACKENDS
+                (defaults to $GIT_TOKEN_STORAGE, then json)
+            key_source: Key source spec (defaults to $GIT_TOKEN_KEY_SOURCE, then KEY_FILE;
+                see key_provider.py)
+        """
+        self.store = open_store(storage)
+        # Shared with every other TokenManager in the process that uses the same key source
+        self.keys: KeyProvider = open_key_provider(key_source, KEY_FILE)
+        # (platform, entry, error) for every entry skipped because it could not be decrypted
+        self.undecryptable = []
+
+    def _ensure_key_exists(self) -> None:
+        """Ensure encryption key exists, create if it doesn't (once per process)."""
+        self.keys.keys()
+
+    def _get_keys(self) -> List[bytes]:
+        """Get the encryption keys, the encrypting key first."""
+        return self.keys.keys()
+
+    def _get_cipher(self) -> Union["Fernet", "MultiFernet"]:
+        """Get the cached cipher for encryption/decryption, creating the key on first use."""
+        return self.keys.cipher()
+
+    def _decrypt_again(self, ciphertext: Any, error: str) -> Result:
+        """Retry a failed decryption if the keys have changed since they were read (e.g. by a rekey)."""
+        if self.keys.refresh():
+            return decrypt_value(self.keys.cipher(), ciphertext)
+        return None, error
+
+    def save_token(self, platform: str, token: str, name: str, scopes: List[str],
+                   expires_at: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> None:
+        """Save a token securely, with any extra metadata fields (e.g. host) stored alongside it."""
+        # Encrypt the token, under the newest key even if a rekey started after the keys were read
+        cipher = self.keys.cipher(check=True)
+        encrypted_token = cipher.encrypt(token.encode()).decode()
+
+        token_data = {
+            "name": name,
+            "token": encrypted_token,  # Only the ciphertext is kept, in memory and on disk
+            "scopes": scopes,
+            "created_at": datetime.now().isoformat(),
+            "expires_at": expires_at
+        }
+        token_data.update(extra or {})
+        self.store.add(platform, token_data)
+        tracing.count("tokens_saved")
+
+    def list_tokens(self, platform: Optional[str] = None, name: Optional[str] = None,
+                    with_values: bool = False) -> Vault:
+        """
+        List all tokens or tokens matching a platform and/or name.
+
+        Only metadata is returned unless with_values is set, in which case the
+        matching entries (and only those) are decrypted.
+        """
+        if not with_values:
+            return {
+                plat: [{key: value for key, value in entry.items() if key != "token"} for entry in entries]
+                for plat, entries in self.store.query(platform, name).items()
+            }
+
+        result = {platform: []} if platform else {}
+        for plat, item in self.iter_tokens(TokenQuery(platform=platform, name=name), with_values=True):
+            result.setdefault(plat, []).append(item)
+        return result
+
+    def iter_tokens(self, selection: Optional[TokenQuery] = None, with_values: bool = False,
+                    sort: Optional[str] = None, reverse: bool = False, offset: int = 0,
+                    limit: Optional[int] = None, workers: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield (platform, token) pairs one at a time, as list_tokens does but without collecting them.
+
+        The query, sort and paging arguments are passed to TokenStore.iterate.
+        Values are decrypted only if with_values is set, per entry and on up to
+        workers processes for large vaults; entries that cannot be decrypted are
+        skipped with a warning and recorded in self.undecryptable.
+        """
+        rows = self.store.iterate(selection, sort, reverse, offset, limit)
+        if not with_values:
+            for plat, entry in rows:
+                yield plat, {key: value for key, value in entry.items() if key != "token"}
+            return
+
+        self._ensure_key_exists()
+        items = ((row, row[1].get("token")) for row in rows)
+        decrypted = tracing.traced("decrypt", decrypt_stream(self._get_keys(), items, workers))
+        for (plat, entry), value, error in decrypted:
+            if error is not None:
+                value, error = self._decrypt_again(entry.get("token"), error)
+            if error is not None:
+                logger.warning(f"Skipping {plat} token '{entry.get('name')}': {error}")
+                self.undecryptable.append((plat, entry, error))
+                continue
+            item = {key: value for key, value in entry.items() if key != "token"}
+            item["token"] = value
+            tracing.count("tokens_decrypted")
+            yield plat, item
+
+    def get_token(self, platform: str, name: str) -> Optional[str]:
+        """Get a specific token by platform and name, decrypting only that entry (None if it can't be)."""
+        entry = self.store.get(platform, name)
+        if entry is None:
+            return None
+        return self.entry_value(platform, entry)
+
+    def entry_value(self, platform: str, entry: Dict[str, Any]) -> Optional[str]:
+        """Decrypt the value of an entry already read from the store (None if it can't be)."""
+        cipher = self._get_cipher()
+        with tracing.span("decrypt"):
+            value, error = decrypt_value(cipher, entry.get("token"))
+            if error is not None:
+                value, error = self._decrypt_again(entry.get("token"), error)
+        if error is not None:
+            logger.warning(f"Cannot read {platform} token '{entry['name']}': {error}")
+            self.undecryptable.append((platform, entry, error))
+        else:
+            tracing.count("tokens_decrypted")
+        return value
+
+    @contextmanager
+    def transaction(self) -> Iterator["TokenManager"]:
+        """
+        Run several reads and writes as one atomic read-modify-write.
+
+        The vault is locked and re-read on entry, so reads inside the block see
+        every token committed by other processes, and all changes are written
+        once on exit (or discarded if the block raises).
+
+        Example:
+            with token_manager.transaction():
+                if token_manager.get_token("github", "ci") is None:
+                    token_manager.save_token("github", token, "ci", ["repo"])
+        """
+        with self.store.transaction():
+            yield self
+
+    def delete_tokens(self, platform: Optional[str] = None, name: Optional[str] = None) -> int:
+        """Delete tokens matching the filters and return how many were removed."""
+        return self.store.delete(TokenQuery(platform=platform, name=name))
+
+    def delete_matching(self, selection: TokenQuery) -> int:
+        """Delete tokens matching a query, in a single write, and return how many were removed."""
+        return self.store.delete(selection)
+
+    def remove_tokens(self, tokens: Vault) -> int:
+        """Delete exactly the given tokens (as returned by list_tokens) in one write."""
+        return self.store.remove(tokens)
+
+    def update_metadata(self, tokens: Vault) -> int:
+        """Store changed metadata of the given tokens (as returned by list_tokens, values ignored) in one write."""
+        return self.store.update_metadata(tokens)
+
+    def quarantine(self, selection: Optional[TokenQuery] = None, dry_run: bool = False, force: bool = False,
+                   workers: Optional[int] = None) -> Tuple[Vault, int]:
+        """
+        Move entries that cannot be decrypted out of the vault into QUARANTINE_FILE.
+
+        Every matching entry is test-decrypted in one locked transaction. The bad
+        ones are appended to the quarantine file (with the error and the time)
+        before they are removed, so a crash in between leaves them in both
+        places rather than neither.
+
+        Args:
+            selection: Entries to check (None for the whole vault)
+            dry_run: Only report what would be moved
+            force: Move entries even when none of the checked ones could be
+                decrypted, which usually means the key is wrong rather than the vault
+            workers: Worker processes for the test decryption
+
+        Returns:
+            The bad entries grouped by platform, and the number of entries checked
+        """
+        bad = {}
+        checked = 0
+        self._ensure_key_exists()
+        with self.transaction():
+            items = ((row, row[1].get("token")) for row in self.store.iterate(selection))
+            for (plat, entry), _, error in decrypt_stream(self._get_keys(), items, workers):
+                checked += 1
+                if error is not None:
+                    _, error = self._decrypt_again(entry.get("token"), error)
+                if error is not None:
+                    bad.setdefault(plat, []).append(dict(entry, error=error))
+            all_bad = sum(len(entries) for entries in bad.values()) == checked
+            if bad and not dry_run and (force or not all_bad):
+                quarantined_at = datetime.now().isoformat()
+                with file_lock(QUARANTINE_FILE.with_suffix(".lock")):
+                    data, _ = read_vault(QUARANTINE_FILE)
+                    for plat, entries in bad.items():
+                        data.setdefault(plat, []).extend(dict(e, quarantined_at=quarantined_at) for e in entries)
+                    write_snapshot(QUARANTINE_FILE, data)
+                self.store.remove(bad)
+        return bad, checked
+
+    def compact(self) -> int:
+        """Fold any pending journal records into the main store."""
+        return self.store.compact()
@@ -0,0 +1,266 @@
+"""
+Tracing - Time the phases of a command: imports, key loading, vault reads, decryption, provider calls, saves.
+
+Hot paths open a span around each phase:
+
+    import             the script's module-level imports, and rich logging,
+                       dotenv and requests where a command imports them
+    key.load           reading (or first creating) the vault keys
+    key.cipher         building the Fernet cipher
+    vault.load         reading and parsing tokens.json and its journal, or tokens.vault
+    vault.lookup       finding tokens in tokens.vault through its indexes
+    decrypt            decrypting token values
+    provider.request   one HTTP attempt to a provider, on whichever thread sent it
+    provider.batch     the main thread waiting on a batch of concurrent provider calls
+    vault.save         writing the snapshot or journal, or committing to SQLite
+
+Spans nest, and each records its own time as well as its self time (its own
+time less that of the spans inside it), so the self times of the main thread
+add up to the command's wall-clock time; the rest is reported as "(other)".
+cryptography is counted in whichever key phase first imports it. Counters add
+up bytes read and written and tokens saved and decrypted.
+
+Recording is off unless a command is run with --timings (a per-phase table on
+stderr once it exits), --profile (cProfile of the main thread, printed, or
+saved with --profile-output FILE) or --metrics FILE (the same numbers as JSON,
+written atomically so monitoring can scrape it after a batch job;
+$GIT_TOKEN_METRICS sets a default). While it is off, a span costs one
+function call. Only the standard library is imported here, so every
+script can import this module first and have its import phase measured from
+that point.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# When the first script import began (this module is imported first)
+STARTED = time.perf_counter()
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+# Span name -> durations in seconds, and total self time
+_durations: Dict[str, List[float]] = {}
+_self_times: Dict[str, float] = {}
+_counters: Dict[str, int] = {}
+# Self time of spans on the main thread, to find the time spent outside any span
+_main_self = 0.0
+_import_time: Optional[float] = None
+_command = None
+_options = None
+_profiler = None
+
+
+class _NoSpan:
+    """The span handed out while recording is off."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+_DONE = object()
+
+
+class Span:
+    """Times one phase and records it when it ends."""
+
+    __slots__ = ("name", "start", "children")
+
+    def __init__(self, name: str):
+        """Initialize the span; timing starts on entry."""
+        self.name = name
+        self.children = 0.0
+
+    def __enter__(self) -> "Span":
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        if self.name is not None:
+            record(self.name, elapsed, elapsed - self.children)
+
+
+def span(name: str):
+    """Return a context manager timing one phase (a no-op unless recording is on)."""
+    return Span(name) if _enabled else _NO_SPAN
+
+
+def traced(name: str, iterable: Iterable) -> Iterator:
+    """Iterate, counting the time spent producing each item as a span (a plain iterator unless recording is on)."""
+    if not _enabled:
+        return iter(iterable)
+    return _traced(name, iter(iterable))
+
+
+def _traced(name: str, iterator: Iterator) -> Iterator:
+    """Yield from iterator, timing every step that produces an item."""
+    while True:
+        with Span(name) as step:
+            item = next(iterator, _DONE)
+            if item is _DONE:
+                step.name = None
+        if item is _DONE:
+            return
+        yield item
+
+
+def record(name: str, elapsed: float, self_time: Optional[float] = None) -> None:
+    """Record a span that has already been timed."""
+    global _main_self
+    self_time = elapsed if self_time is None else self_time
+    with _lock:
+        _durations.setdefault(name, []).append(elapsed)
+        _self_times[name] = _self_times.get(name, 0.0) + self_time
+        if threading.current_thread() is threading.main_thread():
+            _main_self += self_time
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add to a counter (a no-op unless recording is on)."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def imported() -> None:
+    """Note that the script's module-level imports are done; called once, at the end of them."""
+    global _import_time
+    _import_time = time.perf_counter() - STARTED
+
+
+def add_tracing_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add --timings, --profile and --metrics."""
+    parser.add_argument("--timings", action="store_true",
+                        help="Print how long each phase took (imports, key, vault, decryption, provider calls)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile the command with cProfile and print the top functions on stderr")
+    parser.add_argument("--profile-output", metavar="FILE",
+                        help="Save the full cProfile stats to FILE instead (for pstats or snakeviz)")
+    parser.add_argument("--metrics", metavar="FILE", default=os.environ.get("GIT_TOKEN_METRICS"),
+                        help="Write phase counts and latencies and bytes written to FILE as JSON "
+                             "(default: $GIT_TOKEN_METRICS)")
+
+
+def start(args: argparse.Namespace, command: str) -> None:
+    """Start recording if the command asked for timings, a profile or metrics, and report them at exit."""
+    global _enabled, _command, _options, _profiler
+    if not (args.timings or args.profile or args.profile_output or args.metrics):
+        return
+    _enabled = True
+    _command = command
+    _options = args
+    if _import_time is not None:
+        record("import", _import_time)
+    if args.profile or args.profile_output:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(finish)
+
+
+def summary() -> Dict[str, Any]:
+    """Summarize everything recorded so far."""
+    wall = time.perf_counter() - STARTED
+    with _lock:
+        spans = {}
+        for name, durations in _durations.items():
+            samples = sorted(durations)
+
+            def percentile(fraction: float) -> float:
+                return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+
+            spans[name] = {
+                "count": len(samples),
+                "total_s": sum(samples),
+                "self_s": _self_times[name],
+                "mean_ms": sum(samples) / len(samples) * 1000,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "max_ms": samples[-1] * 1000,
+            }
+        counters = dict(_counters)
+        other = max(0.0, wall - _main_self)
+    return {
+        "command": _command,
+        "finished_at": datetime.now().isoformat(),
+        "wall_s": wall,
+        "other_s": other,
+        "spans": spans,
+        "counters": counters,
+    }
+
+
+def format_timings(metrics: Dict[str, Any]) -> str:
+    """Render a summary as a table, slowest phase first."""
+    lines = [f"{metrics['command']}: {metrics['wall_s'] * 1000:.1f}ms",
+             f"  {'phase':18} {'count':>7} {'self ms':>10} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} "
+             f"{'max ms':>9}"]
+    for name, row in sorted(metrics["spans"].items(), key=lambda item: item[1]["self_s"], reverse=True):
+        lines.append(f"  {name:18} {row['count']:7d} {row['self_s'] * 1000:10.1f} {row['total_s'] * 1000:10.1f} "
+                     f"{row['mean_ms']:9.2f} {row['p95_ms']:9.2f} {row['max_ms']:9.2f}")
+    lines.append(f"  {'(other)':18} {'':7} {metrics['other_s'] * 1000:10.1f}")
+    if metrics["counters"]:
+        lines.append("  " + ", ".join(f"{name} {value}" for name, value in sorted(metrics["counters"].items())))
+    return "\n".join(lines)
+
+
+def write_metrics(path: str, metrics: Dict[str, Any]) -> None:
+    """Write metrics as JSON, replacing the file atomically so a reader never sees half of it."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(metrics, f, indent=2)
+            f.write("\n")
+        # Holds no secrets, and the scraper may run as another user
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def finish() -> None:
+    """Stop the profiler and report timings, profile and metrics as asked (run at exit)."""
+    global _enabled
+    if not _enabled:
+        return
+    if _profiler is not None:
+        _profiler.disable()
+    _enabled = False
+    metrics = summary()
+
+    if _options.timings:
+        print(format_timings(metrics), file=sys.stderr)
+    if _profiler is not None:
+        if _options.profile_output:
+            _profiler.dump_stats(_options.profile_output)
+        else:
+            import pstats
+            pstats.Stats(_profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+    if _options.metrics:
+        try:
+            write_metrics(_options.metrics, metrics)
+        except OSError as e:
+            print(f"Could not write metrics to {_options.metrics}: {e}", file=sys.stderr)
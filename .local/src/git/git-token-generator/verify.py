@@ -0,0 +1,109 @@
+"""
+Verify - Check that stored tokens are still live at their providers.
+
+Each token is sent to a cheap authenticated endpoint of its provider (see the
+generators' verify_token), which answers whether it still works and, where the
+provider says, when it really expires. The calls run on a BoundedExecutor over
+the shared pooled client, so a sweep costs about one round trip per
+concurrency slot rather than one per token; a token authenticates only itself,
+so the per-platform cap defaults to the full concurrency instead of
+DEFAULT_KEY_LIMIT.
+
+The outcome is written back in one vault write: "verify_status" (valid,
+expired or revoked), "verified_at", and "expires_at" when the provider reported
+one. A token whose check failed (network error, 5xx) keeps its previous status.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from executor import BoundedExecutor
+from query import TokenQuery
+from token_store import TokenManager
+
+logger = logging.getLogger("git_token_generator")
+
+VERIFY_STATUSES = ["valid", "expired", "revoked"]
+
+# Provider calls in flight during a sweep
+DEFAULT_VERIFY_CONCURRENCY = 32
+
+
+def verify_tokens(token_manager: TokenManager, generator_for: Callable[[str, Optional[str]], Any],
+                  selection: Optional[TokenQuery] = None, executor: Optional[BoundedExecutor] = None,
+                  workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Check every selected token at its provider concurrently.
+
+    Args:
+        token_manager: Vault to read the tokens from
+        generator_for: Returns the generator for a (platform, base_url); verifying
+            needs no credentials, only the token itself
+        selection: Tokens to check (all of them if None)
+        executor: Concurrency limits to run the provider calls under
+            (defaults to DEFAULT_VERIFY_CONCURRENCY with no per-platform cap)
+        workers: Processes used to decrypt large vaults (default: CPU count)
+
+    Returns:
+        One result per token with its "platform", vault "entry" (without the
+        value) and "elapsed" seconds, plus either "status" and "expires_at"
+        (None if the provider didn't say) or an "error"; tokens whose provider
+        can't be loaded (e.g. an uninstalled plugin) get an "error" without a check
+    """
+    executor = executor or BoundedExecutor(DEFAULT_VERIFY_CONCURRENCY, default_limit=DEFAULT_VERIFY_CONCURRENCY)
+
+    generators: Dict[Tuple[str, Optional[str]], Any] = {}
+    unavailable: Dict[Tuple[str, Optional[str]], str] = {}
+    results = []
+    checked = []
+    jobs = []
+    for platform, entry in token_manager.iter_tokens(selection, with_values=True, workers=workers):
+        key = (platform, entry.get("base_url"))
+        if key not in generators and key not in unavailable:
+            try:
+                generators[key] = generator_for(*key)
+            except ValueError as e:
+                unavailable[key] = str(e)
+        token = entry.pop("token")
+        result = {"platform": platform, "entry": entry}
+        results.append(result)
+        if key in unavailable:
+            result.update(error=unavailable[key], elapsed=0.0)
+            continue
+        checked.append(result)
+        jobs.append((platform, lambda generator=generators[key], token=token, entry=entry:
+                     generator.verify_token(token, entry)))
+
+    for result, (outcome, error, elapsed) in zip(checked, executor.run(jobs)):
+        result["elapsed"] = elapsed
+        if error is None:
+            result.update(outcome)
+        else:
+            result["error"] = str(error)
+    return results
+
+
+def record_results(token_manager: TokenManager, results: List[Dict[str, Any]],
+                   now: Optional[datetime] = None) -> int:
+    """
+    Store the outcome of a sweep in the vault in one write.
+
+    Args:
+        token_manager: Vault the tokens were read from
+        results: Results of verify_tokens; failed checks are skipped
+        now: Time of the sweep (defaults to now)
+
+    Returns:
+        How many entries were updated
+    """
+    verified_at = (now or datetime.now()).isoformat()
+    updates = {}
+    for result in results:
+        if "error" in result:
+            continue
+        entry = dict(result["entry"], verify_status=result["status"], verified_at=verified_at)
+        if result.get("expires_at"):
+            entry["expires_at"] = result["expires_at"]
+        updates.setdefault(result["platform"], []).append(entry)
+    return token_manager.update_metadata(updates) if updates else 0
@@ -1,66 +1,84 @@
 #!/usr/bin/env python3
 """
 View Git Tokens - A tool to view stored tokens from the git-token-generator.
+
+--format jsonl, csv or plain streams tokens as they are read from the vault
+instead of building tables, for piping large vaults into jq or grep. Tokens are
+selected by platform, name glob, scope and date range (see query.py) without
+decrypting anything. With --show-values, an entry that cannot be decrypted is
+skipped and reported instead of failing the whole listing. --timings, --profile
+and --metrics report where the time went (see tracing.py).
 """
 
+import tracing  # First, so the import phase covers every import below
+
 import sys
-import json
 import argparse
-from pathlib import Path
 
 from rich.console import Console
 from rich.table import Table
-from cryptography.fernet import Fernet
 
-# Token storage configuration
-CONFIG_DIR = Path.home() / ".config" / "git-token-generator"
-TOKENS_FILE = CONFIG_DIR / "tokens.json"
-KEY_FILE = CONFIG_DIR / "key.key"
+from output import add_output_arguments, iter_arguments, stream_tokens
+from providers import add_platform_argument
+from query import add_query_arguments, query_from_args
+from token_store import STORAGE_BACKENDS, TokenManager
+
+tracing.imported()
 
 console = Console()
+# Messages go to stderr so they never end up in streamed output
+error_console = Console(stderr=True)
 
 
-def load_key():
-    """Load the encryption key."""
-    if not KEY_FILE.exists():
-        console.print("No encryption key found. No tokens have been generated yet.", style="yellow")
+def open_vault(storage=None, key_source=None):
+    """Open the token manager, or return None if no tokens have been stored yet."""
+    try:
+        token_manager = TokenManager(storage, key_source)
+        has_key = token_manager.keys.exists()
+    except (ValueError, RuntimeError) as e:
+        error_console.print(str(e), style="red")
+        sys.exit(1)
+    if not has_key:
+        error_console.print(f"No encryption key found in {token_manager.keys}. No tokens have been generated yet.",
+                            style="yellow")
         sys.exit(1)
     
-    with open(KEY_FILE, "rb") as key_file:
-        return key_file.read()
+    if not token_manager.store.exists():
+        error_console.print("No tokens file found. No tokens have been generated yet.", style="yellow")
+        return None
+    return token_manager
+
 
+def report_undecryptable(token_manager):
+    """Warn about entries that were skipped because they could not be decrypted."""
+    if token_manager.undecryptable:
+        error_console.print(f"{len(token_manager.undecryptable)} tokens could not be decrypted and were skipped. "
+                            "Run `git_token_generator.py quarantine` to move them out of the vault.",
+                            style="yellow")
 
-def load_tokens():
-    """Load and decrypt tokens from storage."""
-    if not TOKENS_FILE.exists():
-        console.print("No tokens file found. No tokens have been generated yet.", style="yellow")
+
+def load_tokens(selection=None, show_values=False, storage=None, key_source=None, **paging):
+    """
+    Load tokens matching a TokenQuery, decrypting values only if they will be shown.
+    
+    paging takes the sort, reverse, offset, limit and workers arguments of TokenManager.iter_tokens.
+    """
+    token_manager = open_vault(storage, key_source)
+    if token_manager is None:
         return {}
     
+    tokens = {selection.platform: []} if selection and selection.platform else {}
     try:
-        with open(TOKENS_FILE, "r") as f:
-            encrypted_data = json.load(f)
-        
-        # Get the cipher for decryption
-        key = load_key()
-        cipher = Fernet(key)
-        
-        # Decrypt the tokens
-        tokens = {}
-        for platform, entries in encrypted_data.items():
-            tokens[platform] = []
-            for entry in entries:
-                decrypted_token = cipher.decrypt(entry["token"].encode()).decode()
-                entry["token"] = decrypted_token
-                tokens[platform].append(entry)
-        
-        return tokens
-    
+        for plat, token in token_manager.iter_tokens(selection, show_values, **paging):
+            tokens.setdefault(plat, []).append(token)
     except Exception as e:
-        console.print(f"Error loading tokens: {e}", style="red")
+        error_console.print(f"Error loading tokens: {e}", style="red")
         return {}
+    report_undecryptable(token_manager)
+    return tokens
 
 
-def display_tokens(tokens, platform=None, show_values=False, name=None):
+def display_tokens(tokens, platform=None, show_values=False):
     """Display tokens in a formatted table."""
     # Filter by platform if specified
     if platform:
@@ -71,15 +89,11 @@ def display_tokens(tokens, platform=None, show_values=False, name=None):
             console.print(f"No tokens found for {plat}", style="yellow")
             continue
         
-        # Filter by name if specified
-        if name:
-            platform_tokens = [t for t in platform_tokens if t["name"] == name]
-            if not platform_tokens:
-                console.print(f"No token found with name '{name}' for {plat}", style="yellow")
-                continue
-        
+        with_hosts = any(token.get("host") for token in platform_tokens)
         table = Table(title=f"{plat} Tokens")
         table.add_column("Name")
+        if with_hosts:
+            table.add_column("Host")
         table.add_column("Scopes")
         table.add_column("Created")
         table.add_column("Expires")
@@ -87,8 +101,10 @@ def display_tokens(tokens, platform=None, show_values=False, name=None):
             table.add_column("Token Value")
         
         for token in platform_tokens:
-            row = [
-                token["name"],
+            row = [token["name"]]
+            if with_hosts:
+                row.append(token.get("host") or "")
+            row += [
                 ", ".join(token.get("scopes", [])),
                 token.get("created_at", "Unknown"),
                 token.get("expires_at", "Never")
@@ -105,21 +121,46 @@ def display_tokens(tokens, platform=None, show_values=False, name=None):
 def main():
     """Main entry point for the script."""
     parser = argparse.ArgumentParser(description="View stored Git tokens")
-    parser.add_argument("--platform", choices=["github", "gitlab", "bitbucket"], 
-                      help="Filter tokens by platform")
-    parser.add_argument("--name", help="Filter tokens by name")
+    add_platform_argument(parser, "--platform", help="Filter tokens by platform")
+    parser.add_argument("--name", help="Filter tokens by name (a glob with --glob)")
     parser.add_argument("--show-values", action="store_true", 
                       help="Show token values (sensitive information)")
+    parser.add_argument("--workers", type=int,
+                      help="Processes used to decrypt large vaults with --show-values (default: CPU count)")
+    parser.add_argument("--storage", choices=STORAGE_BACKENDS,
+                      help="Vault storage backend (default: $GIT_TOKEN_STORAGE or json)")
+    parser.add_argument("--key-source", metavar="SOURCE",
+                      help="Where the vault key comes from: file[:PATH], env[:VAR], keyring[:SERVICE] or "
+                           "command:CMD (default: $GIT_TOKEN_KEY_SOURCE or file)")
+    add_query_arguments(parser)
+    add_output_arguments(parser)
+    tracing.add_tracing_arguments(parser)
     
     args = parser.parse_args()
+    tracing.start(args, "view_tokens.py")
+    selection = query_from_args(args)
+    
+    if args.format != "table":
+        token_manager = open_vault(args.storage, args.key_source)
+        if token_manager is None:
+            return
+        rows = token_manager.iter_tokens(selection, args.show_values, workers=args.workers, **iter_arguments(args))
+        try:
+            stream_tokens(rows, args.format, args.show_values)
+        except Exception as e:
+            error_console.print(f"Error loading tokens: {e}", style="red")
+            sys.exit(1)
+        report_undecryptable(token_manager)
+        return
     
-    tokens = load_tokens()
+    tokens = load_tokens(selection, args.show_values, args.storage, args.key_source, workers=args.workers,
+                         **iter_arguments(args))
     
     if not tokens:
         console.print("No tokens found.", style="yellow")
         return
     
-    display_tokens(tokens, args.platform, args.show_values, args.name)
+    display_tokens(tokens, args.platform, args.show_values)
 
 
 if __name__ == "__main__":